@@ -5,8 +5,11 @@
 
 import time
 import math
-import numpy as np
+import json
+import sys
 from piper_sdk import *
+from piper_gravity_model import (DHGravityModel, PIPER_DH_PARAMS, PIPER_LINK_MASSES,
+                                 PIPER_LINK_COMS, GRAVITY)
 
 class PiperGravityCompensation:
     def __init__(self, can_port="can0"):
@@ -22,32 +25,20 @@ class PiperGravityCompensation:
         # 等待连接稳定
         time.sleep(0.1)
         
-        # 机械臂DH参数 (根据Piper实际参数设置)
-        # [a, alpha, d, theta_offset] for each joint
-        self.dh_params = [
-            [0, 0, 0.1595, 0],          # Joint 1
-            [0, -math.pi/2, 0, -math.pi/2],  # Joint 2  
-            [0.2105, 0, 0, 0],          # Joint 3
-            [0.0855, 0, 0.1281, 0],     # Joint 4
-            [0, -math.pi/2, 0, 0],      # Joint 5
-            [0, math.pi/2, 0.0605, 0]   # Joint 6
-        ]
+        # 机械臂DH参数 [a, alpha, d, theta_offset] (见 piper_gravity_model.py)
+        self.dh_params = [row[:] for row in PIPER_DH_PARAMS]
         
         # 各连杆质量 (kg) - 需要根据实际机械臂参数调整
-        self.link_masses = [1.5, 2.0, 1.8, 0.8, 0.5, 0.3]
+        self.link_masses = PIPER_LINK_MASSES[:]
         
         # 各连杆质心位置 (相对于该连杆坐标系的位置, m)
-        self.link_coms = [
-            [0, 0, 0.08],    # Link 1 质心
-            [0.105, 0, 0],   # Link 2 质心  
-            [0.1, 0, 0],     # Link 3 质心
-            [0.04, 0, 0],    # Link 4 质心
-            [0, 0, 0.03],    # Link 5 质心
-            [0, 0, 0.02]     # Link 6 质心
-        ]
+        self.link_coms = [com[:] for com in PIPER_LINK_COMS]
         
         # 重力加速度
-        self.g = 9.81  # m/s^2
+        self.g = GRAVITY  # m/s^2
+        
+        # 向量化重力模型 (常量项预先计算，修改质量/质心后需调用 set_link_parameters)
+        self.model = DHGravityModel(self.dh_params, self.link_masses, self.link_coms, self.g)
         
         # 补偿增益 (可调节补偿强度)
         self.compensation_gain = 0.8
@@ -80,6 +71,30 @@ class PiperGravityCompensation:
             return positions
         return [0, 0, 0, 0, 0, 0]
     
+    def set_link_parameters(self, link_masses, link_coms):
+        """
+        更新连杆质量和质心参数
+        
+        Args:
+            link_masses: 各连杆质量 (kg)
+            link_coms: 各连杆质心位置 (m)
+        """
+        self.link_masses = [float(m) for m in link_masses]
+        self.link_coms = [[float(v) for v in com] for com in link_coms]
+        self.model.set_parameters(self.link_masses, self.link_coms)
+    
+    def load_parameters(self, filename):
+        """
+        从JSON文件加载连杆参数 (piper_gravity_identification.py 的辨识结果)
+        
+        Args:
+            filename: 参数文件路径
+        """
+        with open(filename, 'r') as f:
+            config = json.load(f)
+        self.set_link_parameters(config['link_masses'], config['link_coms'])
+        print(f"已从 {filename} 加载连杆参数")
+    
     def forward_kinematics(self, joint_angles):
         """
         计算正向运动学，返回各连杆变换矩阵
@@ -88,26 +103,9 @@ class PiperGravityCompensation:
             joint_angles: 关节角度列表 (弧度)
             
         Returns:
-            transforms: 各连杆相对于基座标系的变换矩阵列表
+            transforms: (6, 4, 4) 各连杆相对于基座标系的变换矩阵
         """
-        transforms = []
-        T = np.eye(4)  # 基座标系变换矩阵
-        
-        for i, (a, alpha, d, theta_offset) in enumerate(self.dh_params):
-            theta = joint_angles[i] + theta_offset
-            
-            # DH变换矩阵
-            T_i = np.array([
-                [math.cos(theta), -math.sin(theta)*math.cos(alpha), math.sin(theta)*math.sin(alpha), a*math.cos(theta)],
-                [math.sin(theta), math.cos(theta)*math.cos(alpha), -math.cos(theta)*math.sin(alpha), a*math.sin(theta)],
-                [0, math.sin(alpha), math.cos(alpha), d],
-                [0, 0, 0, 1]
-            ])
-            
-            T = T @ T_i
-            transforms.append(T.copy())
-        
-        return transforms
+        return self.model.forward_kinematics(joint_angles).copy()
     
     def calculate_gravity_torques(self, joint_angles):
         """
@@ -119,46 +117,19 @@ class PiperGravityCompensation:
         Returns:
             gravity_torques: 各关节的重力补偿力矩 (N·m)
         """
-        # 计算各连杆变换矩阵
-        transforms = self.forward_kinematics(joint_angles)
-        
-        gravity_torques = [0.0] * 6
-        
-        # 重力向量 (基座标系)
-        gravity_vector = np.array([0, 0, -self.g, 0])  # [x, y, z, 1]
+        return self.model.gravity_torques(joint_angles).tolist()
+    
+    def calculate_gravity_torques_batch(self, joint_angles):
+        """
+        批量计算重力补偿力矩 (离线拟合、工作空间扫描、回放数据处理)
         
-        for i in range(6):
-            torque = 0.0
-            
-            # 计算关节i对后续所有连杆的重力力矩贡献
-            for j in range(i, 6):
-                # 连杆j的质心在基座标系中的位置
-                com_local = np.array([*self.link_coms[j], 1])  # 齐次坐标
-                com_global = transforms[j] @ com_local
-                
-                # 关节i的轴向量 (z轴方向)
-                if i == 0:
-                    joint_axis = np.array([0, 0, 1])  # 基座标系z轴
-                    joint_pos = np.array([0, 0, 0])
-                else:
-                    joint_axis = transforms[i-1][:3, 2]  # 关节i-1的z轴
-                    joint_pos = transforms[i-1][:3, 3]   # 关节i-1的位置
-                
-                # 从关节到质心的向量
-                r_vec = com_global[:3] - joint_pos
-                
-                # 重力在连杆j上的力
-                force = self.link_masses[j] * gravity_vector[:3]
-                
-                # 计算力矩: τ = r × F
-                torque_vec = np.cross(r_vec, force)
-                
-                # 投影到关节轴上
-                torque += np.dot(torque_vec, joint_axis)
+        Args:
+            joint_angles: (N, 6) 关节角度数组 (弧度)
             
-            gravity_torques[i] = torque
-        
-        return gravity_torques
+        Returns:
+            np.ndarray: (N, 6) 重力补偿力矩 (N·m)
+        """
+        return self.model.batch_gravity_torques(joint_angles)
     
     def apply_gravity_compensation(self, gravity_torques):
         """
@@ -241,6 +212,10 @@ def main():
     # 创建重力补偿控制器
     gravity_comp = PiperGravityCompensation("can0")
     
+    # 可选: 加载离线辨识得到的连杆参数
+    if len(sys.argv) > 1:
+        gravity_comp.load_parameters(sys.argv[1])
+    
     # 使能机械臂
     gravity_comp.enable_robot()
     
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*-coding:utf8-*-
+# Piper机械臂重力参数离线辨识工具
+# 由记录的 (关节角度, 实测力矩) 样本一次性最小二乘拟合连杆质量和质心，
+# 结果可直接用 PiperGravityCompensation.load_parameters() 加载
+#
+# 用法:
+#   python3 piper_gravity_identification.py record --can_port can0 --duration 120 --output samples.npz
+#   python3 piper_gravity_identification.py fit samples.npz --output gravity_params.json
+#   python3 piper_gravity_identification.py synthetic     # 用合成数据验证辨识流程
+
+import argparse
+import json
+import time
+from datetime import datetime
+import numpy as np
+from piper_gravity_model import (DHGravityModel, PIPER_DH_PARAMS, GRAVITY,
+                                 BATCH_CHUNK_SIZE, simple_gravity_basis)
+
+# 质量低于该值的连杆视为不可辨识，保留先验参数
+MIN_LINK_MASS = 1e-3
+
+
+def load_samples(filename):
+    """
+    加载记录的样本
+
+    Returns:
+        (np.ndarray, np.ndarray): (N, 6) 关节角度 (弧度), (N, 6) 实测力矩 (N·m)
+    """
+    data = np.load(filename)
+    return data['joint_angles'], data['efforts']
+
+
+def save_samples(filename, joint_angles, efforts):
+    """保存样本为压缩npz文件"""
+    np.savez_compressed(filename, joint_angles=np.asarray(joint_angles, dtype=float),
+                        efforts=np.asarray(efforts, dtype=float))
+
+
+def identify_link_parameters(joint_angles, efforts, model=None, prior_weight=1e-3,
+                             joints=None, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    线性最小二乘辨识连杆质量和质心
+
+    重力力矩对参数 [m_j, m_j*c_j] 线性: tau = Y(q) @ pi。
+    分块累加正规方程 Y^T Y / Y^T tau，再加向先验参数的岭正则 (使激励不到的
+    参数方向保持先验值) 后一次求解。
+
+    Args:
+        joint_angles: (N, 6) 关节角度 (弧度)
+        efforts: (N, 6) 实测关节力矩 (N·m)，与模型输出同号
+        model: 作为先验和提供DH参数的 DHGravityModel，默认使用标称参数
+        prior_weight: 岭正则权重 (相对于每个样本)
+        joints: 参与拟合的关节索引 (0起)，默认全部
+        chunk_size: 每块样本数
+
+    Returns:
+        dict: link_masses, link_coms, rms_error, rms_error_prior, num_samples
+    """
+    if model is None:
+        model = DHGravityModel()
+    q = np.asarray(joint_angles, dtype=float).reshape(-1, model.n)
+    tau = np.asarray(efforts, dtype=float).reshape(-1, model.n)
+    if joints is None:
+        joints = list(range(model.n))
+
+    num_params = 4 * model.n
+    normal_matrix = np.zeros((num_params, num_params))
+    normal_rhs = np.zeros(num_params)
+    for start in range(0, len(q), chunk_size):
+        Y = model.batch_regressor(q[start:start + chunk_size])[:, joints, :].reshape(-1, num_params)
+        t = tau[start:start + chunk_size, joints].reshape(-1)
+        normal_matrix += Y.T @ Y
+        normal_rhs += Y.T @ t
+
+    prior = model.parameter_vector()
+    regularization = prior_weight * len(q)
+    normal_matrix[np.diag_indices(num_params)] += regularization
+    normal_rhs += regularization * prior
+    solution = np.linalg.solve(normal_matrix, normal_rhs).reshape(model.n, 4)
+
+    link_masses = model.link_masses.copy()
+    link_coms = model.link_coms.copy()
+    for j, (mass, *first_moment) in enumerate(solution):
+        if mass > MIN_LINK_MASS:
+            link_masses[j] = mass
+            link_coms[j] = np.asarray(first_moment) / mass
+        else:
+            print(f"警告: 连杆{j+1}质量辨识结果 {mass:.4f}kg 不合理，保留先验参数")
+
+    identified = DHGravityModel(np.column_stack([model.a, model.alpha, model.d, model.theta_offset]),
+                                link_masses, link_coms, model.g)
+    residual = identified.batch_gravity_torques(q)[:, joints] - tau[:, joints]
+    residual_prior = model.batch_gravity_torques(q)[:, joints] - tau[:, joints]
+    return {
+        'link_masses': link_masses.tolist(),
+        'link_coms': link_coms.tolist(),
+        'rms_error': np.sqrt(np.mean(residual**2, axis=0)).tolist(),
+        'rms_error_prior': np.sqrt(np.mean(residual_prior**2, axis=0)).tolist(),
+        'num_samples': len(q),
+    }
+
+
+def identify_simple_parameters(joint_angles, efforts):
+    """
+    辨识简化模型 (base_torque/pos_factor) 参数
+
+    简化模型每个关节只有一个系数 base_torque*pos_factor，逐列最小二乘即可。
+    结果以 pos_factor=1.0 的形式给出，可直接用于 RealTimeParameterTuner 等工具。
+
+    Returns:
+        dict: {关节号: {"base_torque": x, "pos_factor": 1.0}}
+    """
+    basis = simple_gravity_basis(joint_angles)
+    tau = np.asarray(efforts, dtype=float)
+    denominator = np.sum(basis**2, axis=0)
+    numerator = np.sum(basis * tau, axis=0)
+    coefficients = np.divide(numerator, denominator, out=np.zeros_like(numerator),
+                             where=denominator > 0)
+    return {joint_id: {"base_torque": float(coefficients[joint_id - 1]), "pos_factor": 1.0}
+            for joint_id in range(1, basis.shape[-1] + 1)}
+
+
+def save_parameters(filename, result, simple_params=None):
+    """保存辨识结果为JSON (PiperGravityCompensation.load_parameters 可直接加载)"""
+    config = {
+        'timestamp': datetime.now().strftime("%Y%m%d_%H%M%S"),
+        'link_masses': result['link_masses'],
+        'link_coms': result['link_coms'],
+        'rms_error': result['rms_error'],
+        'num_samples': result['num_samples'],
+    }
+    if simple_params is not None:
+        config['parameters'] = simple_params
+    with open(filename, 'w') as f:
+        json.dump(config, f, indent=2)
+    print(f"参数已保存到: {filename}")
+
+
+def record_samples(can_port, duration, rate, output):
+    """
+    记录关节角度和实测力矩样本
+
+    记录期间请将机械臂缓慢移动 (或依次停留) 到尽量多样的姿态，
+    覆盖关节2/3/4的工作范围，辨识结果才可靠。
+    """
+    from piper_gravity_compensation import PiperGravityCompensation
+
+    controller = PiperGravityCompensation(can_port)
+    piper = controller.piper
+    samples = int(duration * rate)
+    joint_angles = np.empty((samples, 6))
+    efforts = np.empty((samples, 6))
+
+    print(f"开始记录 {duration}s 的样本 ({rate}Hz)，请缓慢移动机械臂覆盖工作空间...")
+    next_time = time.perf_counter()
+    for k in range(samples):
+        joint_angles[k] = controller.get_joint_positions()
+        high_spd = piper.GetArmHighSpdInfoMsgs()
+        efforts[k] = [getattr(high_spd, f"motor_{i}").effort * 1e-3 for i in range(1, 7)]
+        if k % max(1, int(rate)) == 0:
+            print(f"已记录 {k}/{samples}")
+        next_time += 1.0 / rate
+        time.sleep(max(0.0, next_time - time.perf_counter()))
+
+    save_samples(output, joint_angles, efforts)
+    print(f"样本已保存到: {output}")
+
+
+def synthetic_check(num_samples=20000, noise=0.05, seed=0):
+    """用合成数据验证辨识流程: 扰动后的真值参数生成力矩，再从标称参数出发辨识"""
+    rng = np.random.default_rng(seed)
+    nominal = DHGravityModel()
+    true_masses = nominal.link_masses * rng.uniform(0.7, 1.3, nominal.n)
+    true_coms = nominal.link_coms + rng.normal(0, 0.02, nominal.link_coms.shape)
+    truth = DHGravityModel(PIPER_DH_PARAMS, true_masses, true_coms, GRAVITY)
+
+    joint_angles = rng.uniform(-np.pi, np.pi, (num_samples, nominal.n))
+    efforts = truth.batch_gravity_torques(joint_angles)
+    efforts += rng.normal(0, noise, efforts.shape)
+
+    start = time.perf_counter()
+    result = identify_link_parameters(joint_angles, efforts, nominal)
+    elapsed = time.perf_counter() - start
+
+    identified = DHGravityModel(PIPER_DH_PARAMS, result['link_masses'], result['link_coms'], GRAVITY)
+    test_angles = rng.uniform(-np.pi, np.pi, (2000, nominal.n))
+    model_error = identified.batch_gravity_torques(test_angles) - truth.batch_gravity_torques(test_angles)
+
+    print(f"样本数: {num_samples}, 噪声: {noise} N·m, 拟合耗时: {elapsed*1e3:.1f} ms")
+    print(f"拟合RMS误差 (N·m):   {np.round(result['rms_error'], 4).tolist()}")
+    print(f"先验RMS误差 (N·m):   {np.round(result['rms_error_prior'], 4).tolist()}")
+    print(f"测试集最大力矩误差 (N·m): {np.abs(model_error).max():.4f}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Piper机械臂重力参数离线辨识")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parser_record = subparsers.add_parser('record', help='记录关节角度和力矩样本')
+    parser_record.add_argument('--can_port', default='can0')
+    parser_record.add_argument('--duration', type=float, default=120.0, help='记录时长 (秒)')
+    parser_record.add_argument('--rate', type=float, default=100.0, help='采样频率 (Hz)')
+    parser_record.add_argument('--output', default='gravity_samples.npz')
+
+    parser_fit = subparsers.add_parser('fit', help='从样本辨识参数')
+    parser_fit.add_argument('samples', help='record 生成的npz文件')
+    parser_fit.add_argument('--output', default=None, help='输出JSON文件')
+    parser_fit.add_argument('--prior_weight', type=float, default=1e-3, help='向标称参数的正则权重')
+
+    parser_synthetic = subparsers.add_parser('synthetic', help='用合成数据验证辨识流程')
+    parser_synthetic.add_argument('--samples', type=int, default=20000)
+    parser_synthetic.add_argument('--noise', type=float, default=0.05, help='力矩噪声标准差 (N·m)')
+
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record_samples(args.can_port, args.duration, args.rate, args.output)
+    elif args.command == 'fit':
+        joint_angles, efforts = load_samples(args.samples)
+        start = time.perf_counter()
+        result = identify_link_parameters(joint_angles, efforts, prior_weight=args.prior_weight)
+        simple_params = identify_simple_parameters(joint_angles, efforts)
+        print(f"样本数: {result['num_samples']}, 拟合耗时: {(time.perf_counter() - start)*1e3:.1f} ms")
+        print(f"连杆质量 (kg): {np.round(result['link_masses'], 3).tolist()}")
+        print(f"连杆质心 (m):  {np.round(result['link_coms'], 4).tolist()}")
+        print(f"拟合RMS误差 (N·m): {np.round(result['rms_error'], 4).tolist()}")
+        print(f"先验RMS误差 (N·m): {np.round(result['rms_error_prior'], 4).tolist()}")
+        output = args.output or f"gravity_params_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        save_parameters(output, result, simple_params)
+    elif args.command == 'synthetic':
+        synthetic_check(args.samples, args.noise)
+
+
+if __name__ == "__main__":
+    main()
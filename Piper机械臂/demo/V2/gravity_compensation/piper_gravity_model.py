@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# -*-coding:utf8-*-
+# Piper机械臂重力模型 (向量化正向运动学与重力力矩计算)
+# 只依赖numpy，不需要连接机械臂即可使用
+
+import math
+import numpy as np
+
+# 机械臂DH参数 (根据Piper实际参数设置)
+# [a, alpha, d, theta_offset] for each joint
+PIPER_DH_PARAMS = [
+    [0, 0, 0.1595, 0],               # Joint 1
+    [0, -math.pi/2, 0, -math.pi/2],  # Joint 2
+    [0.2105, 0, 0, 0],               # Joint 3
+    [0.0855, 0, 0.1281, 0],          # Joint 4
+    [0, -math.pi/2, 0, 0],           # Joint 5
+    [0, math.pi/2, 0.0605, 0]        # Joint 6
+]
+
+# 各连杆质量 (kg) - 需要根据实际机械臂参数调整
+PIPER_LINK_MASSES = [1.5, 2.0, 1.8, 0.8, 0.5, 0.3]
+
+# 各连杆质心位置 (相对于该连杆坐标系的位置, m)
+PIPER_LINK_COMS = [
+    [0, 0, 0.08],    # Link 1 质心
+    [0.105, 0, 0],   # Link 2 质心
+    [0.1, 0, 0],     # Link 3 质心
+    [0.04, 0, 0],    # Link 4 质心
+    [0, 0, 0.03],    # Link 5 质心
+    [0, 0, 0.02]     # Link 6 质心
+]
+
+# 重力加速度
+GRAVITY = 9.81  # m/s^2
+
+# 批量计算时每块的样本数 (限制中间变换矩阵的内存占用)
+BATCH_CHUNK_SIZE = 65536
+
+
+class DHGravityModel:
+    """基于DH参数的重力力矩模型
+
+    与逐关节构造4x4矩阵、双重循环求和的实现结果一致，但:
+    - alpha/a/d 相关的常量项在构造时只计算一次
+    - 所有关节的变换矩阵写入预分配的缓冲区
+    - 重力力矩用后缀和一次算出 (等价于质心雅可比转置乘以重力)，复杂度 O(n)
+    """
+
+    def __init__(self, dh_params=PIPER_DH_PARAMS, link_masses=PIPER_LINK_MASSES,
+                 link_coms=PIPER_LINK_COMS, g=GRAVITY):
+        """
+        Args:
+            dh_params: [[a, alpha, d, theta_offset], ...]
+            link_masses: 各连杆质量 (kg)
+            link_coms: 各连杆质心在自身坐标系中的位置 (m)
+            g: 重力加速度 (m/s^2)，重力方向为基座标系 -z
+        """
+        dh = np.asarray(dh_params, dtype=float)
+        self.n = len(dh)
+        self.a = dh[:, 0].copy()
+        self.alpha = dh[:, 1].copy()
+        self.d = dh[:, 2].copy()
+        self.theta_offset = dh[:, 3].copy()
+        self.g = g
+
+        # 常量项: 只与 alpha 相关
+        self._cos_alpha = np.cos(self.alpha)
+        self._sin_alpha = np.sin(self.alpha)
+
+        # 预分配缓冲区
+        n = self.n
+        self._theta = np.empty(n)
+        self._cos = np.empty(n)
+        self._sin = np.empty(n)
+        self._tmp = np.empty(n)
+        # 各关节DH矩阵，常量行只填一次
+        self._A = np.zeros((n, 4, 4))
+        self._A[:, 2, 1] = self._sin_alpha
+        self._A[:, 2, 2] = self._cos_alpha
+        self._A[:, 2, 3] = self.d
+        self._A[:, 3, 3] = 1.0
+        # 各连杆相对基座标系的变换矩阵
+        self._T = np.empty((n, 4, 4))
+        # 关节i的转轴和原点 (关节0为基座标系z轴和原点)
+        self._axes = np.zeros((n, 3))
+        self._axes[0, 2] = 1.0
+        self._origins = np.zeros((n, 3))
+        self._com_global = np.empty((n, 3))
+        self._moments = np.empty((n, 3))
+        self._torques = np.empty(n)
+
+        self.set_parameters(link_masses, link_coms)
+
+    def set_parameters(self, link_masses, link_coms):
+        """更新连杆质量和质心，并重新计算相关常量"""
+        self.link_masses = np.asarray(link_masses, dtype=float).copy()
+        self.link_coms = np.asarray(link_coms, dtype=float).reshape(self.n, 3).copy()
+        # 齐次质心坐标
+        self._com_h = np.ones((self.n, 4))
+        self._com_h[:, :3] = self.link_coms
+        # 后缀质量和: M_i = sum_{j>=i} m_j
+        self._mass_suffix = np.cumsum(self.link_masses[::-1])[::-1].copy()
+
+    def forward_kinematics(self, joint_angles):
+        """
+        计算正向运动学，返回各连杆变换矩阵
+
+        Args:
+            joint_angles: 关节角度 (弧度)
+
+        Returns:
+            np.ndarray: (n, 4, 4) 各连杆相对于基座标系的变换矩阵
+                        (内部缓冲区，下次调用会被覆盖)
+        """
+        theta, c, s, tmp, A, T = self._theta, self._cos, self._sin, self._tmp, self._A, self._T
+        np.add(joint_angles, self.theta_offset, out=theta)
+        np.cos(theta, out=c)
+        np.sin(theta, out=s)
+
+        A[:, 0, 0] = c
+        np.multiply(s, self._cos_alpha, out=tmp)
+        np.negative(tmp, out=A[:, 0, 1])
+        np.multiply(s, self._sin_alpha, out=A[:, 0, 2])
+        np.multiply(self.a, c, out=A[:, 0, 3])
+        A[:, 1, 0] = s
+        np.multiply(c, self._cos_alpha, out=A[:, 1, 1])
+        np.multiply(c, self._sin_alpha, out=tmp)
+        np.negative(tmp, out=A[:, 1, 2])
+        np.multiply(self.a, s, out=A[:, 1, 3])
+
+        T[0] = A[0]
+        for i in range(1, self.n):
+            np.matmul(T[i - 1], A[i], out=T[i])
+        return T
+
+    def gravity_torques(self, joint_angles):
+        """
+        计算重力力矩
+
+        tau_i = z_{i-1} . sum_{j>=i} (c_j - p_{i-1}) x (m_j g)
+              = z_{i-1} . ((S_i - M_i p_{i-1}) x g)
+        其中 S_i = sum_{j>=i} m_j c_j, M_i = sum_{j>=i} m_j
+
+        Args:
+            joint_angles: 关节角度 (弧度)
+
+        Returns:
+            np.ndarray: (n,) 各关节重力力矩 (N·m，内部缓冲区)
+        """
+        T = self.forward_kinematics(joint_angles)
+        axes, origins, moments = self._axes, self._origins, self._moments
+
+        # 各连杆质心在基座标系中的位置
+        np.einsum('nij,nj->ni', T[:, :3, :], self._com_h, out=self._com_global)
+        # S_i: 质量加权质心的后缀和
+        np.multiply(self._com_global, self.link_masses[:, None], out=moments)
+        np.cumsum(moments[::-1], axis=0, out=moments[::-1])
+
+        # 关节i的转轴与原点来自连杆i-1的坐标系
+        axes[1:] = T[:-1, :3, 2]
+        origins[1:] = T[:-1, :3, 3]
+        # S_i - M_i * p_{i-1}
+        moments -= self._mass_suffix[:, None] * origins
+
+        # 重力沿 -z: (m x g) = (-g*m_y, g*m_x, 0)，再投影到转轴
+        tau = self._torques
+        np.multiply(axes[:, 1], moments[:, 0], out=tau)
+        tau -= axes[:, 0] * moments[:, 1]
+        tau *= self.g
+        return tau
+
+    def batch_forward_kinematics(self, joint_angles):
+        """
+        批量正向运动学
+
+        Args:
+            joint_angles: (N, n) 关节角度数组 (弧度)
+
+        Returns:
+            np.ndarray: (N, n, 4, 4) 各组关节角度下各连杆的变换矩阵
+        """
+        q = np.asarray(joint_angles, dtype=float)
+        theta = q + self.theta_offset
+        c = np.cos(theta)
+        s = np.sin(theta)
+
+        A = np.zeros(q.shape + (4, 4))
+        A[..., 0, 0] = c
+        A[..., 0, 1] = -s * self._cos_alpha
+        A[..., 0, 2] = s * self._sin_alpha
+        A[..., 0, 3] = self.a * c
+        A[..., 1, 0] = s
+        A[..., 1, 1] = c * self._cos_alpha
+        A[..., 1, 2] = -c * self._sin_alpha
+        A[..., 1, 3] = self.a * s
+        A[..., 2, 1] = self._sin_alpha
+        A[..., 2, 2] = self._cos_alpha
+        A[..., 2, 3] = self.d
+        A[..., 3, 3] = 1.0
+
+        T = np.empty_like(A)
+        T[:, 0] = A[:, 0]
+        for i in range(1, self.n):
+            np.matmul(T[:, i - 1], A[:, i], out=T[:, i])
+        return T
+
+    def batch_gravity_torques(self, joint_angles, chunk_size=BATCH_CHUNK_SIZE):
+        """
+        批量计算重力力矩
+
+        Args:
+            joint_angles: (N, n) 或 (n,) 关节角度数组 (弧度)
+            chunk_size: 每块样本数，控制中间结果内存占用
+
+        Returns:
+            np.ndarray: 与输入形状相同的重力力矩数组 (N·m)
+        """
+        q = np.asarray(joint_angles, dtype=float)
+        single = q.ndim == 1
+        q = q.reshape(-1, self.n)
+        torques = np.empty_like(q)
+        for start in range(0, len(q), chunk_size):
+            stop = start + chunk_size
+            torques[start:stop] = self._batch_chunk(q[start:stop])
+        return torques[0] if single else torques
+
+    def _batch_chunk(self, q):
+        T = self.batch_forward_kinematics(q)
+        com_global = np.einsum('knij,nj->kni', T[..., :3, :], self._com_h)
+        moments = np.cumsum((com_global * self.link_masses[:, None])[:, ::-1], axis=1)[:, ::-1]
+
+        axes = np.zeros_like(com_global)
+        axes[:, 0, 2] = 1.0
+        axes[:, 1:] = T[:, :-1, :3, 2]
+        origins = np.zeros_like(com_global)
+        origins[:, 1:] = T[:, :-1, :3, 3]
+        moments = moments - self._mass_suffix[:, None] * origins
+
+        return self.g * (axes[..., 1] * moments[..., 0] - axes[..., 0] * moments[..., 1])
+
+    def parameter_vector(self):
+        """
+        重力模型的线性参数向量
+
+        Returns:
+            np.ndarray: (4n,) 每个连杆依次为 [m_j, m_j*cx_j, m_j*cy_j, m_j*cz_j]
+        """
+        params = np.empty((self.n, 4))
+        params[:, 0] = self.link_masses
+        params[:, 1:] = self.link_masses[:, None] * self.link_coms
+        return params.reshape(-1)
+
+    def batch_regressor(self, joint_angles):
+        """
+        重力力矩的线性回归矩阵 Y(q)，满足 tau = Y(q) @ parameter_vector()
+
+        tau_i = sum_{j>=i} g * [z_{i-1} . ((o_j - p_{i-1}) x (-z))] * m_j
+                         + g * [z_{i-1} . ((R_j e_k) x (-z))] * (m_j c_j)_k
+
+        Args:
+            joint_angles: (N, n) 关节角度数组 (弧度)
+
+        Returns:
+            np.ndarray: (N, n, 4n) 回归矩阵
+        """
+        q = np.asarray(joint_angles, dtype=float).reshape(-1, self.n)
+        T = self.batch_forward_kinematics(q)
+        N, n = q.shape
+
+        axes = np.zeros((N, n, 3))
+        axes[:, 0, 2] = 1.0
+        axes[:, 1:] = T[:, :-1, :3, 2]
+        origins = np.zeros((N, n, 3))
+        origins[:, 1:] = T[:, :-1, :3, 3]
+        zx = axes[:, :, None, 0]
+        zy = axes[:, :, None, 1]
+
+        Y = np.zeros((N, n, n, 4))
+        # 质量项: 连杆坐标系原点相对关节原点的力臂 (N, 关节i, 连杆j)
+        diff = T[:, None, :, :3, 3] - origins[:, :, None, :]
+        Y[..., 0] = self.g * (zy * diff[..., 0] - zx * diff[..., 1])
+        # 一阶矩项: 旋转矩阵第k列
+        R = T[:, None, :, :3, :3]
+        Y[..., 1:] = self.g * (zy[..., None] * R[..., 0, :] - zx[..., None] * R[..., 1, :])
+        # 关节i只受连杆j>=i影响
+        Y *= np.triu(np.ones((n, n)))[None, :, :, None]
+        return Y.reshape(N, n, 4 * n)
+
+
+def simple_gravity_coefficients(params, num_joints=6):
+    """
+    简化模型参数转换为每个关节的系数 base_torque * pos_factor
+
+    Args:
+        params: {关节号(1起): {"base_torque": x, "pos_factor": y}}，
+                关节号可以是整数或字符串 (从JSON加载时)，缺少的关节系数为0
+
+    Returns:
+        np.ndarray: (num_joints,) 系数
+    """
+    coefficients = np.zeros(num_joints)
+    for joint_id in range(1, num_joints + 1):
+        joint_params = params.get(joint_id, params.get(str(joint_id)))
+        if joint_params:
+            coefficients[joint_id - 1] = joint_params["base_torque"] * joint_params["pos_factor"]
+    return coefficients
+
+
+def simple_gravity_basis(joint_angles):
+    """
+    简化重力模型的角度项
+
+    关节2 (肩部): sin(q2 + pi/2)
+    关节3 (手臂): sin(q2 + q3)
+    关节4 (前臂): sin(q2 + q3)
+    其他关节: 0
+
+    Args:
+        joint_angles: (..., 6) 关节角度 (弧度)
+
+    Returns:
+        np.ndarray: (..., 6) 各关节的角度项
+    """
+    q = np.asarray(joint_angles, dtype=float)
+    basis = np.zeros_like(q)
+    basis[..., 1] = np.sin(q[..., 1] + math.pi/2)
+    shoulder_elbow = np.sin(q[..., 1] + q[..., 2])
+    basis[..., 2] = shoulder_elbow
+    basis[..., 3] = shoulder_elbow
+    return basis
+
+
+def simple_gravity_torques(joint_angles, params, gain=1.0, max_torque=8.0):
+    """
+    简化重力补偿力矩 (支持单组或批量关节角度)
+
+    torque_i = base_torque_i * pos_factor_i * basis_i(q) * gain，并限制在 ±max_torque
+
+    Args:
+        joint_angles: (6,) 或 (N, 6) 关节角度 (弧度)
+        params: 各关节 base_torque/pos_factor 参数
+        gain: 补偿增益
+        max_torque: 最大力矩 (N·m)
+
+    Returns:
+        np.ndarray: 与输入形状相同的补偿力矩 (N·m)
+    """
+    torques = simple_gravity_basis(joint_angles)
+    torques *= simple_gravity_coefficients(params, torques.shape[-1]) * gain
+    np.clip(torques, -max_torque, max_torque, out=torques)
+    return torques
@@ -7,6 +7,7 @@ import time
 import math
 import numpy as np
 from piper_sdk import *
+from piper_gravity_model import simple_gravity_torques
 
 class GravityCompensationTester:
     def __init__(self, can_port="can0"):
@@ -142,34 +143,11 @@ class GravityCompensationTester:
     
     def calculate_gravity_torques(self, joint_angles):
         """计算重力补偿力矩"""
-        gravity_torques = []
-        
-        for i in range(6):
-            joint_id = i + 1
-            angle = joint_angles[i]
-            
-            if joint_id in self.current_params:
-                params = self.current_params[joint_id]
-                base_torque = params["base_torque"]
-                pos_factor = params["pos_factor"]
-                
-                if joint_id == 2:
-                    torque = base_torque * math.sin(angle + math.pi/2) * pos_factor
-                elif joint_id == 3:
-                    torque = base_torque * math.sin(joint_angles[1] + angle) * pos_factor
-                elif joint_id == 4:
-                    torque = base_torque * math.sin(joint_angles[1] + joint_angles[2]) * pos_factor
-                else:
-                    torque = 0.0
-                
-                torque *= self.current_gain
-                torque = max(-8.0, min(8.0, torque))
-            else:
-                torque = 0.0
-            
-            gravity_torques.append(torque)
-        
-        return gravity_torques
+        return self.calculate_gravity_torques_batch(joint_angles).tolist()
+    
+    def calculate_gravity_torques_batch(self, joint_angles):
+        """批量计算重力补偿力矩 ((N, 6) 关节角度 -> (N, 6) 力矩)"""
+        return simple_gravity_torques(joint_angles, self.current_params, self.current_gain, 8.0)
     
     def apply_gravity_compensation(self, gravity_torques):
         """应用重力补偿力矩"""
@@ -10,6 +10,7 @@ import json
 import os
 from datetime import datetime
 from piper_sdk import *
+from piper_gravity_model import simple_gravity_torques
 
 class RealTimeParameterTuner:
     def __init__(self, can_port="can0"):
@@ -81,30 +82,12 @@ class RealTimeParameterTuner:
     
     def calculate_gravity_torques(self, joint_angles):
         """计算重力补偿力矩"""
-        gravity_torques = []
-        
-        for i in range(6):
-            joint_id = i + 1
-            angle = joint_angles[i]
-            
-            params = self.gravity_compensation_params[joint_id]
-            base_torque = params["base_torque"]
-            pos_factor = params["pos_factor"]
-            
-            if joint_id == 2:
-                torque = base_torque * math.sin(angle + math.pi/2) * pos_factor
-            elif joint_id == 3:
-                torque = base_torque * math.sin(joint_angles[1] + angle) * pos_factor
-            elif joint_id == 4:
-                torque = base_torque * math.sin(joint_angles[1] + joint_angles[2]) * pos_factor
-            else:
-                torque = 0.0
-            
-            torque *= self.compensation_gain
-            torque = max(-self.max_torque, min(self.max_torque, torque))
-            gravity_torques.append(torque)
-        
-        return gravity_torques
+        return self.calculate_gravity_torques_batch(joint_angles).tolist()
+    
+    def calculate_gravity_torques_batch(self, joint_angles):
+        """批量计算重力补偿力矩 ((N, 6) 关节角度 -> (N, 6) 力矩)"""
+        return simple_gravity_torques(joint_angles, self.gravity_compensation_params,
+                                      self.compensation_gain, self.max_torque)
     
     def apply_gravity_compensation(self, gravity_torques):
         """应用重力补偿力矩"""
@@ -6,6 +6,7 @@
 import time
 import math
 from piper_sdk import *
+from piper_gravity_model import simple_gravity_torques
 
 class SimpleGravityCompensation:
     def __init__(self, can_port="can0"):
@@ -69,7 +70,7 @@ class SimpleGravityCompensation:
     def calculate_simple_gravity_torques(self, joint_angles):
         """
         计算简化的重力补偿力矩
-        基于关节角度的简单模型
+        基于关节角度的简单模型 (见 piper_gravity_model.simple_gravity_torques)
         
         Args:
             joint_angles: 当前关节角度 (弧度)
@@ -77,41 +78,20 @@ class SimpleGravityCompensation:
         Returns:
             gravity_torques: 各关节的重力补偿力矩 (N·m)
         """
-        gravity_torques = []
+        return self.calculate_simple_gravity_torques_batch(joint_angles).tolist()
+    
+    def calculate_simple_gravity_torques_batch(self, joint_angles):
+        """
+        批量计算简化的重力补偿力矩
         
-        for i in range(6):
-            joint_id = i + 1
-            angle = joint_angles[i]
-            
-            # 获取该关节的补偿参数
-            params = self.gravity_compensation_params[joint_id]
-            base_torque = params["base_torque"]
-            pos_factor = params["pos_factor"]
-            
-            # 简单的重力补偿模型：
-            # 主要考虑关节2和3，因为它们承受最大的重力影响
-            if joint_id == 2:
-                # 关节2 (肩部): 重力力矩与sin(角度)成正比
-                torque = base_torque * math.sin(angle + math.pi/2) * pos_factor
-            elif joint_id == 3:
-                # 关节3 (手臂): 考虑关节2和3的组合影响
-                torque = base_torque * math.sin(joint_angles[1] + angle) * pos_factor
-            elif joint_id == 4:
-                # 关节4 (前臂): 较小的重力影响
-                torque = base_torque * math.sin(joint_angles[1] + joint_angles[2]) * pos_factor
-            else:
-                # 其他关节基本不受重力影响
-                torque = 0.0
-            
-            # 应用补偿增益
-            torque *= self.compensation_gain
-            
-            # 限制力矩范围
-            torque = max(-self.max_torque, min(self.max_torque, torque))
+        Args:
+            joint_angles: (N, 6) 或 (6,) 关节角度数组 (弧度)
             
-            gravity_torques.append(torque)
-        
-        return gravity_torques
+        Returns:
+            np.ndarray: 与输入形状相同的重力补偿力矩 (N·m)
+        """
+        return simple_gravity_torques(joint_angles, self.gravity_compensation_params,
+                                      self.compensation_gain, self.max_torque)
     
     def apply_gravity_compensation(self, gravity_torques):
         """
@@ -132,6 +132,191 @@ class ArmStatusTool():
     # def __repr__(self):
     #     return f"{self.name}: 0x{self.value:X}"
 
+JOINT_IDS = range(1, 7)
+
+# ANSI 控制序列: 光标回到左上角 / 清除到行尾 / 清除到屏幕末尾 / 隐藏、显示光标
+CURSOR_HOME = "\033[H"
+ERASE_LINE = "\033[K"
+ERASE_BELOW = "\033[J"
+HIDE_CURSOR = "\033[?25l"
+SHOW_CURSOR = "\033[?25h"
+
+class ArmSnapshot():
+    """
+    单次刷新使用的状态快照
+
+    每种反馈消息每帧只读取一次 (每次 Get* 调用都会加锁并复制消息)，
+    同一帧内显示的所有字段来自同一时刻，渲染时不再访问 SDK
+    """
+    def __init__(self, piper):
+        self.firmware_version = piper.GetPiperFirmwareVersion()
+        self.sdk_version = piper.GetCurrentSDKVersion().value
+        self.interface_version = piper.GetCurrentInterfaceVersion().value
+        self.protocol_version = piper.GetCurrentProtocolVersion().value
+        self.arm_status = piper.GetArmStatus()
+        self.joint = piper.GetArmJointMsgs()
+        self.high_spd = piper.GetArmHighSpdInfoMsgs()
+        self.low_spd = piper.GetArmLowSpdInfoMsgs()
+        self.angle_limit_max_spd = piper.GetAllMotorAngleLimitMaxSpd()
+        self.max_acc_limit = piper.GetAllMotorMaxAccLimit()
+        self.crash_protection = piper.GetCrashProtectionLevelFeedback()
+        self.end_pose = piper.GetArmEndPoseMsgs()
+        self.end_vel_acc = piper.GetCurrentEndVelAndAccParam()
+        self.gripper = piper.GetArmGripperMsgs()
+        self.gripper_teaching = piper.GetGripperTeachingPendantParamFeedback()
+        self.can_fps = piper.GetCanFps()
+        self.joint_ctrl = piper.GetArmJointCtrl()
+        self.gripper_ctrl = piper.GetArmGripperCtrl()
+        self.mode_ctrl = piper.GetArmModeCtrl()
+
+def joint_row(label, values):
+    return f"|{label:<16}|" + "".join(f"{value:^15}" for value in values) + "|"
+
+def render_table(can_port, snap):
+    """根据快照生成整帧文本"""
+    status = snap.arm_status.arm_status
+    err_status = status.err_status
+    joint_state = snap.joint.joint_state
+    high_spd = [getattr(snap.high_spd, f"motor_{i}") for i in JOINT_IDS]
+    low_spd = [getattr(snap.low_spd, f"motor_{i}") for i in JOINT_IDS]
+    foc_status = [motor.foc_status for motor in low_spd]
+    limits = [snap.angle_limit_max_spd.all_motor_angle_limit_max_spd.motor[i] for i in JOINT_IDS]
+    max_acc = [snap.max_acc_limit.all_motor_max_acc_limit.motor[i] for i in JOINT_IDS]
+    crash_level = snap.crash_protection.crash_protection_level_feedback
+    end_pose = snap.end_pose.end_pose
+    end_param = snap.end_vel_acc.current_end_vel_acc_param
+    gripper = snap.gripper.gripper_state
+    gripper_foc = gripper.foc_status
+    teaching = snap.gripper_teaching.arm_gripper_teaching_param_feedback
+
+    lines = [
+        time.strftime("%a %b %d %H:%M:%S %Y"),
+        f"+{'='*107}+",
+        f"Firmware Ver : {snap.firmware_version:<10}",
+        f"CAN PORT     : {can_port:<15}  SDK Ver: {snap.sdk_version:<11}",
+        f"Interface Ver: {snap.interface_version:<15}  Protocol Ver: {snap.protocol_version:<15}",
+        f"+{'-'*107}+",
+        f"{'ArmStatus'} :",
+        f"{'ctrl_mode':<15}{ArmStatusTool.CtrlMode.from_value(status.ctrl_mode)}",
+        f"{'arm_status':<15}{ArmStatusTool.ArmStatus.from_value(status.arm_status)}",
+        f"{'mode_feed':<15}{ArmStatusTool.ModeFeed.from_value(status.mode_feed)}",
+        f"{'motion_status':<15}{ArmStatusTool.MotionStatus.from_value(status.motion_status)}",
+        f"+{'-'*107}+",
+        f"|{'JointState':<16}|{'J1':^15}{'J2':^15}{'J3':^15}{'J4':^15}{'J5':^15}{'J6':^15}|",
+        f"+{'-'*16:^16}+{'-'*90:^}+",
+        joint_row('position(°)', [round(getattr(joint_state, f"joint_{i}")*1e-3, 3) for i in JOINT_IDS]),
+        joint_row('position(rad)', [round(motor.pos*1e-3, 3) for motor in high_spd]),
+        joint_row('cur_spd(rad/s)', [round(motor.motor_speed*1e-3, 3) for motor in high_spd]),
+        joint_row('current(A)', [round(motor.current*1e-3, 3) for motor in high_spd]),
+        joint_row('effort(N.m)', [round(motor.effort*1e-3, 3) for motor in high_spd]),
+        joint_row('voltage(V)', [round(motor.vol*1e-1, 1) for motor in low_spd]),
+        joint_row('foc_temp(°C)', [round(motor.foc_temp) for motor in low_spd]),
+        joint_row('motor_temp(°C)', [round(motor.motor_temp) for motor in low_spd]),
+        joint_row('max_spd(rad/s)', [round(limit.max_joint_spd*1e-3, 3) for limit in limits]),
+        joint_row('max_acc(rad/s^2)', [round(acc.max_joint_acc*1e-3, 3) for acc in max_acc]),
+        joint_row('collision_level',
+                  [round(getattr(crash_level, f"joint_{i}_protection_level")) for i in JOINT_IDS]),
+        f"|{'angle_limit(°)':<16}|"
+        + "".join(f"[{round(limit.min_angle_limit*1e-1, 1):<6},{round(limit.max_angle_limit*1e-1, 1):<6}]"
+                  for limit in limits) + "|",
+        f"|{'status----------':<16}|{'-'*90:^}|",
+        joint_row('low_vol_err', [str(foc.voltage_too_low) for foc in foc_status]),
+        joint_row('motor_overheat', [str(foc.motor_overheating) for foc in foc_status]),
+        joint_row('foc_overcurrent', [str(foc.driver_overcurrent) for foc in foc_status]),
+        joint_row('foc_overheat', [str(foc.driver_overheating) for foc in foc_status]),
+        joint_row('collision_status', [str(foc.collision_status) for foc in foc_status]),
+        joint_row('foc_err', [str(foc.driver_error_status) for foc in foc_status]),
+        joint_row('enable_status', [str(foc.driver_enable_status) for foc in foc_status]),
+        joint_row('stall_protection', [str(foc.stall_status) for foc in foc_status]),
+        joint_row('commuciation_err',
+                  [str(getattr(err_status, f"communication_status_joint_{i}")) for i in JOINT_IDS]),
+        joint_row('over_angle', [str(getattr(err_status, f"joint_{i}_angle_limit")) for i in JOINT_IDS]),
+        f"+{'-'*107}+",
+        f"{'End Pose(Euler):':<108}|",
+        f"{'xyz(mm)':<12}"
+        f"{round(end_pose.X_axis*1e-3, 3):<9}"
+        f"{round(end_pose.Y_axis*1e-3, 3):<9}"
+        f"{round(end_pose.Z_axis*1e-3, 3):<9}|"
+        f"{'max_linear_vel':^20}"
+        f"{round(end_param.end_max_linear_vel*1e-3, 3):^7}"
+        f"{'m/s':<5}|"
+        f"{'max_angular_vel':^20}"
+        f"{round(end_param.end_max_angular_vel*1e-3, 3):^7}"
+        f"{'rad/s':<8}|",
+        f"{'rpy(degree)':<12}"
+        f"{round(end_pose.RX_axis*1e-3, 3):<9}"
+        f"{round(end_pose.RY_axis*1e-3, 3):<9}"
+        f"{round(end_pose.RZ_axis*1e-3, 3):<9}|"
+        f"{'max_linear_acc':^20}"
+        f"{round(end_param.end_max_linear_acc*1e-3, 3):^7}"
+        f"{'m/s^2':<5}|"
+        f"{'max_angular_acc':^20}"
+        f"{round(end_param.end_max_angular_acc*1e-3, 3):^7}"
+        f"{'rad/s^2':<8}|",
+        f"+{'-'*107}+",
+        f"{'Gripper&Teaching':<108}|",
+        f"{'gripper_pos(mm)':<21}{round(gripper.grippers_angle*1e-3, 3):<6}|"
+        f"{'Status code :':<59}"
+        f"{'|':>22}",
+        f"{'gripper_effort(N.m)':<21}{round(gripper.grippers_effort*1e-3, 3):<6}|"
+        f"{'voltage_too_low':<23}{str(gripper_foc.voltage_too_low):<6}|"
+        f"{'motor_overheating':<23}{str(gripper_foc.motor_overheating):<6}"
+        f"{'|':>22}",
+        f"{'teaching_per':<21}{teaching.teaching_range_per:<6}|"
+        f"{'driver_overcurrent':<23}{str(gripper_foc.driver_overcurrent):<6}|"
+        f"{'driver_overheating':<23}{str(gripper_foc.driver_overheating):<6}"
+        f"{'|':>22}",
+        f"{'max_range_config(mm)':<21}{teaching.max_range_config:<6}|"
+        f"{'sensor_status':<23}{str(gripper_foc.sensor_status):<6}|"
+        f"{'driver_error_status':<23}{str(gripper_foc.driver_error_status):<6}"
+        f"{'|':>22}",
+        f"{'teaching_friction':<21}{teaching.teaching_friction:<6}|"
+        f"{'driver_enable_status':<23}{str(gripper_foc.driver_enable_status):<6}|"
+        f"{'homing_status':<23}{str(gripper_foc.homing_status):<6}"
+        f"{'|':>22}",
+        # 单独打印 FPS 类
+        f"+{'='*52}FPS{'='*52}+",
+        f"{'All FPS':<15}: {round(snap.can_fps)}",
+        f"{'Arm Status':<15}: {round(snap.arm_status.Hz):<5}  {'End Pose':<15}: {round(snap.end_pose.Hz):<5}",
+        f"{'Gripper Msg':<15}: {round(snap.gripper.Hz):<5}  {'High Spd Info':<15}: {round(snap.high_spd.Hz):<5}",
+        f"{'Low Spd Info':<15}: {round(snap.low_spd.Hz):<5}",
+        f"{'Joint Ctrl':<15}: {round(snap.joint_ctrl.Hz):<5}  {'Gripper Ctrl':<15}: {round(snap.gripper_ctrl.Hz):<5}",
+        f"{'Mode Ctrl':<15}: {round(snap.mode_ctrl.Hz):<5}",
+        "=" * 109,
+        "Press 'q' to quit",
+    ]
+    return lines
+
+def redraw(lines):
+    """
+    原地重绘: 光标回到左上角逐行覆盖，每行清除残留字符，
+    最后清除旧帧多出的行。整帧一次写出，不再每帧启动 clear 进程
+    """
+    sys.stdout.write(CURSOR_HOME + "".join(line + ERASE_LINE + "\n" for line in lines) + ERASE_BELOW)
+    sys.stdout.flush()
+
+def request_params(piper):
+    """主动查询参数类反馈 (限幅、加速度、末端速度/加速度、固件版本)"""
+    piper.SearchAllMotorMaxAngleSpd()
+    piper.SearchAllMotorMaxAccLimit()
+    piper.ArmParamEnquiryAndConfig(param_enquiry=0x02,
+                                param_setting=0x00,
+                                data_feedback_0x48x=0x00,
+                                end_load_param_setting_effective=0x00,
+                                set_end_load=0x03)
+    piper.ArmParamEnquiryAndConfig(param_enquiry=0x04,
+                                param_setting=0x00,
+                                data_feedback_0x48x=0x00,
+                                end_load_param_setting_effective=0x00,
+                                set_end_load=0x03)
+    piper.ArmParamEnquiryAndConfig(param_enquiry=0x01,
+                                param_setting=0x00,
+                                data_feedback_0x48x=0x00,
+                                end_load_param_setting_effective=0x00,
+                                set_end_load=0x03)
+    if(piper.GetPiperFirmwareVersion() == -0x4AF):
+        piper.SearchPiperFirmwareVersion()
+
 def display_table(can_port, refresh_interval):
     global exit_flag
     global args
@@ -139,289 +324,30 @@ def display_table(can_port, refresh_interval):
     listener_thread.start()
     last_time = 0
     hz = 1
-    limit_interval = 1.0 / hz  # 最快 10Hz，即最小间隔 0.1s
-    while not exit_flag:
-        clear_terminal()
-        start_time = time.time()
-
-    # 如果距离上一次执行已超过限制间隔，就执行操作
-        if start_time - last_time >= limit_interval:
-            if(args.req_flag == 1):
-                piper.SearchAllMotorMaxAngleSpd()
-                piper.SearchAllMotorMaxAccLimit()
-                piper.ArmParamEnquiryAndConfig(param_enquiry=0x02,
-                                            param_setting=0x00,
-                                            data_feedback_0x48x=0x00,
-                                            end_load_param_setting_effective=0x00,
-                                            set_end_load=0x03)
-                piper.ArmParamEnquiryAndConfig(param_enquiry=0x04,
-                                            param_setting=0x00,
-                                            data_feedback_0x48x=0x00,
-                                            end_load_param_setting_effective=0x00,
-                                            set_end_load=0x03)
-                piper.ArmParamEnquiryAndConfig(param_enquiry=0x01,
-                                            param_setting=0x00,
-                                            data_feedback_0x48x=0x00,
-                                            end_load_param_setting_effective=0x00,
-                                            set_end_load=0x03)
-                if(piper.GetPiperFirmwareVersion() == -0x4AF):
-                    piper.SearchPiperFirmwareVersion()
-            last_time = start_time
-        print(time.strftime("%a %b %d %H:%M:%S %Y"))
-        # print(f"+{'-'*87}+")
-        print(f"+{'='*107}+")
-        print(f"Firmware Ver : {piper.GetPiperFirmwareVersion():<10}"
-              f"\n"
-              f"CAN PORT     : {can_port:<15}  SDK Ver: {piper.GetCurrentSDKVersion().value:<11}"
-              f"\n"
-              f"Interface Ver: {piper.GetCurrentInterfaceVersion().value:<15}  Protocol Ver: {piper.GetCurrentProtocolVersion().value:<15}"
-              )
-        print(f"+{'-'*107}+\n"
-              f"{'ArmStatus'} :\n"
-              f"{'ctrl_mode':<15}{ArmStatusTool.CtrlMode.from_value(piper.GetArmStatus().arm_status.ctrl_mode)}\n"
-              f"{'arm_status':<15}{ArmStatusTool.ArmStatus.from_value(piper.GetArmStatus().arm_status.arm_status)}\n"
-              f"{'mode_feed':<15}{ArmStatusTool.ModeFeed.from_value(piper.GetArmStatus().arm_status.mode_feed)}\n"
-              f"{'motion_status':<15}{ArmStatusTool.MotionStatus.from_value(piper.GetArmStatus().arm_status.motion_status)}"
-              )
-        ##joint info
-        # print(f"{'-'*50}")
-        # print(f"         degree    angle_limit   max_spd max_acc")
-        # print(f"Joint 1: {round(piper.GetArmJointMsgs().joint_state.joint_1*1e-3, 3):<7} [{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[1].min_angle_limit*1e-1,1):<6},{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[1].max_angle_limit*1e-1, 1):<6}]   {round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[1].max_joint_spd*1e-3, 3):<6}  {round(piper.GetAllMotorMaxAccLimit().all_motor_max_acc_limit.motor[1].max_joint_acc*1e-3, 3):<6}")
-        # print(f"Joint 2: {round(piper.GetArmJointMsgs().joint_state.joint_2*1e-3, 3):<7} [{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[2].min_angle_limit*1e-1,1):<6},{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[2].max_angle_limit*1e-1, 1):<6}]   {round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[2].max_joint_spd*1e-3, 3):<6}  {round(piper.GetAllMotorMaxAccLimit().all_motor_max_acc_limit.motor[2].max_joint_acc*1e-3, 3):<6}")
-        # print(f"Joint 3: {round(piper.GetArmJointMsgs().joint_state.joint_3*1e-3, 3):<7} [{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[3].min_angle_limit*1e-1,1):<6},{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[3].max_angle_limit*1e-1, 1):<6}]   {round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[3].max_joint_spd*1e-3, 3):<6}  {round(piper.GetAllMotorMaxAccLimit().all_motor_max_acc_limit.motor[3].max_joint_acc*1e-3, 3):<6}")
-        # print(f"Joint 4: {round(piper.GetArmJointMsgs().joint_state.joint_4*1e-3, 3):<7} [{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[4].min_angle_limit*1e-1,1):<6},{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[4].max_angle_limit*1e-1, 1):<6}]   {round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[4].max_joint_spd*1e-3, 3):<6}  {round(piper.GetAllMotorMaxAccLimit().all_motor_max_acc_limit.motor[4].max_joint_acc*1e-3, 3):<6}")
-        # print(f"Joint 5: {round(piper.GetArmJointMsgs().joint_state.joint_5*1e-3, 3):<7} [{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[5].min_angle_limit*1e-1,1):<6},{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[5].max_angle_limit*1e-1, 1):<6}]   {round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[5].max_joint_spd*1e-3, 3):<6}  {round(piper.GetAllMotorMaxAccLimit().all_motor_max_acc_limit.motor[5].max_joint_acc*1e-3, 3):<6}")
-        # print(f"Joint 6: {round(piper.GetArmJointMsgs().joint_state.joint_6*1e-3, 3):<7} [{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[6].min_angle_limit*1e-1,1):<6},{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[6].max_angle_limit*1e-1, 1):<6}]   {round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[6].max_joint_spd*1e-3, 3):<6}  {round(piper.GetAllMotorMaxAccLimit().all_motor_max_acc_limit.motor[6].max_joint_acc*1e-3, 3):<6}")
-        print(f"+{'-'*107}+\n"
-              f"|{'JointState':<16}|{'J1':^15}{'J2':^15}{'J3':^15}{'J4':^15}{'J5':^15}{'J6':^15}|\n"
-              f"+{'-'*16:^16}+{'-'*90:^}+\n"
-              f"|{'position(°)':<16}|"
-              f"{round(piper.GetArmJointMsgs().joint_state.joint_1*1e-3, 3):^15}"
-              f"{round(piper.GetArmJointMsgs().joint_state.joint_2*1e-3, 3):^15}"
-              f"{round(piper.GetArmJointMsgs().joint_state.joint_3*1e-3, 3):^15}"
-              f"{round(piper.GetArmJointMsgs().joint_state.joint_4*1e-3, 3):^15}"
-              f"{round(piper.GetArmJointMsgs().joint_state.joint_5*1e-3, 3):^15}"
-              f"{round(piper.GetArmJointMsgs().joint_state.joint_6*1e-3, 3):^15}|\n"
-              f"|{'position(rad)':<16}|"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_1.pos*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_2.pos*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_3.pos*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_4.pos*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_5.pos*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_6.pos*1e-3, 3):^15}|\n"
-              f"|{'cur_spd(rad/s)':<16}|"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_1.motor_speed*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_2.motor_speed*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_3.motor_speed*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_4.motor_speed*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_5.motor_speed*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_6.motor_speed*1e-3, 3):^15}|\n"
-              f"|{'current(A)':<16}|"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_1.current*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_2.current*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_3.current*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_4.current*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_5.current*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_6.current*1e-3, 3):^15}|\n"
-              f"|{'effort(N.m)':<16}|"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_1.effort*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_2.effort*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_3.effort*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_4.effort*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_5.effort*1e-3, 3):^15}"
-              f"{round(piper.GetArmHighSpdInfoMsgs().motor_6.effort*1e-3, 3):^15}|\n"
-              f"|{'voltage(V)':<16}|"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_1.vol*1e-1, 1):^15}"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_2.vol*1e-1, 1):^15}"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_3.vol*1e-1, 1):^15}"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_4.vol*1e-1, 1):^15}"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_5.vol*1e-1, 1):^15}"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_6.vol*1e-1, 1):^15}|\n"
-              f"|{'foc_temp(°C)':<16}|"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_1.foc_temp):^15}"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_2.foc_temp):^15}"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_3.foc_temp):^15}"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_4.foc_temp):^15}"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_5.foc_temp):^15}"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_6.foc_temp):^15}|\n"
-              f"|{'motor_temp(°C)':<16}|"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_1.motor_temp):^15}"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_2.motor_temp):^15}"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_3.motor_temp):^15}"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_4.motor_temp):^15}"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_5.motor_temp):^15}"
-              f"{round(piper.GetArmLowSpdInfoMsgs().motor_6.motor_temp):^15}|\n"
-              f"|{'max_spd(rad/s)':<16}|"
-              f"{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[1].max_joint_spd*1e-3, 3):^15}"
-              f"{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[2].max_joint_spd*1e-3, 3):^15}"
-              f"{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[3].max_joint_spd*1e-3, 3):^15}"
-              f"{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[4].max_joint_spd*1e-3, 3):^15}"
-              f"{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[5].max_joint_spd*1e-3, 3):^15}"
-              f"{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[6].max_joint_spd*1e-3, 3):^15}|\n"
-              f"|{'max_acc(rad/s^2)':<16}|"
-              f"{round(piper.GetAllMotorMaxAccLimit().all_motor_max_acc_limit.motor[1].max_joint_acc*1e-3, 3):^15}"
-              f"{round(piper.GetAllMotorMaxAccLimit().all_motor_max_acc_limit.motor[2].max_joint_acc*1e-3, 3):^15}"
-              f"{round(piper.GetAllMotorMaxAccLimit().all_motor_max_acc_limit.motor[3].max_joint_acc*1e-3, 3):^15}"
-              f"{round(piper.GetAllMotorMaxAccLimit().all_motor_max_acc_limit.motor[4].max_joint_acc*1e-3, 3):^15}"
-              f"{round(piper.GetAllMotorMaxAccLimit().all_motor_max_acc_limit.motor[5].max_joint_acc*1e-3, 3):^15}"
-              f"{round(piper.GetAllMotorMaxAccLimit().all_motor_max_acc_limit.motor[6].max_joint_acc*1e-3, 3):^15}|\n"
-              f"|{'collision_level':<16}|"
-              f"{round(piper.GetCrashProtectionLevelFeedback().crash_protection_level_feedback.joint_1_protection_level):^15}"
-              f"{round(piper.GetCrashProtectionLevelFeedback().crash_protection_level_feedback.joint_2_protection_level):^15}"
-              f"{round(piper.GetCrashProtectionLevelFeedback().crash_protection_level_feedback.joint_3_protection_level):^15}"
-              f"{round(piper.GetCrashProtectionLevelFeedback().crash_protection_level_feedback.joint_4_protection_level):^15}"
-              f"{round(piper.GetCrashProtectionLevelFeedback().crash_protection_level_feedback.joint_5_protection_level):^15}"
-              f"{round(piper.GetCrashProtectionLevelFeedback().crash_protection_level_feedback.joint_6_protection_level):^15}|\n"
-              f"|{'angle_limit(°)':<16}|"
-              f"[{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[1].min_angle_limit*1e-1,1):<6},"
-              f"{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[1].max_angle_limit*1e-1, 1):<6}]"
-              f"[{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[2].min_angle_limit*1e-1,1):<6},"
-              f"{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[2].max_angle_limit*1e-1, 1):<6}]"
-              f"[{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[3].min_angle_limit*1e-1,1):<6},"
-              f"{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[3].max_angle_limit*1e-1, 1):<6}]"
-              f"[{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[4].min_angle_limit*1e-1,1):<6},"
-              f"{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[4].max_angle_limit*1e-1, 1):<6}]"
-              f"[{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[5].min_angle_limit*1e-1,1):<6},"
-              f"{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[5].max_angle_limit*1e-1, 1):<6}]"
-              f"[{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[6].min_angle_limit*1e-1,1):<6},"
-              f"{round(piper.GetAllMotorAngleLimitMaxSpd().all_motor_angle_limit_max_spd.motor[6].max_angle_limit*1e-1, 1):<6}]|\n"
-              f"|{'status----------':<16}|{'-'*90:^}|\n"
-              f"|{'low_vol_err':<16}|"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_1.foc_status.voltage_too_low):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_2.foc_status.voltage_too_low):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_3.foc_status.voltage_too_low):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_4.foc_status.voltage_too_low):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_5.foc_status.voltage_too_low):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_6.foc_status.voltage_too_low):^15}|\n"
-              f"|{'motor_overheat':<16}|"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_1.foc_status.motor_overheating):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_2.foc_status.motor_overheating):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_3.foc_status.motor_overheating):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_4.foc_status.motor_overheating):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_5.foc_status.motor_overheating):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_6.foc_status.motor_overheating):^15}|\n"
-              f"|{'foc_overcurrent':<16}|"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_1.foc_status.driver_overcurrent):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_2.foc_status.driver_overcurrent):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_3.foc_status.driver_overcurrent):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_4.foc_status.driver_overcurrent):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_5.foc_status.driver_overcurrent):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_6.foc_status.driver_overcurrent):^15}|\n"
-              f"|{'foc_overheat':<16}|"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_1.foc_status.driver_overcurrent):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_2.foc_status.driver_overcurrent):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_3.foc_status.driver_overcurrent):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_4.foc_status.driver_overcurrent):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_5.foc_status.driver_overcurrent):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_6.foc_status.driver_overcurrent):^15}|\n"
-              f"|{'collision_status':<16}|"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_1.foc_status.collision_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_2.foc_status.collision_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_3.foc_status.collision_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_4.foc_status.collision_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_5.foc_status.collision_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_6.foc_status.collision_status):^15}|\n"
-              f"|{'foc_err':<16}|"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_1.foc_status.driver_error_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_2.foc_status.driver_error_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_3.foc_status.driver_error_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_4.foc_status.driver_error_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_5.foc_status.driver_error_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_6.foc_status.driver_error_status):^15}|\n"
-              f"|{'enable_status':<16}|"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_1.foc_status.driver_enable_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_2.foc_status.driver_enable_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_3.foc_status.driver_enable_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_4.foc_status.driver_enable_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_5.foc_status.driver_enable_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_6.foc_status.driver_enable_status):^15}|\n"
-              f"|{'stall_protection':<16}|"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_1.foc_status.stall_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_2.foc_status.stall_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_3.foc_status.stall_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_4.foc_status.stall_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_5.foc_status.stall_status):^15}"
-              f"{str(piper.GetArmLowSpdInfoMsgs().motor_6.foc_status.stall_status):^15}|\n"
-              f"|{'commuciation_err':<16}|"
-              f"{str(piper.GetArmStatus().arm_status.err_status.communication_status_joint_1):^15}"
-              f"{str(piper.GetArmStatus().arm_status.err_status.communication_status_joint_2):^15}"
-              f"{str(piper.GetArmStatus().arm_status.err_status.communication_status_joint_3):^15}"
-              f"{str(piper.GetArmStatus().arm_status.err_status.communication_status_joint_4):^15}"
-              f"{str(piper.GetArmStatus().arm_status.err_status.communication_status_joint_5):^15}"
-              f"{str(piper.GetArmStatus().arm_status.err_status.communication_status_joint_6):^15}|\n"
-              f"|{'over_angle':<16}|"
-              f"{str(piper.GetArmStatus().arm_status.err_status.joint_1_angle_limit):^15}"
-              f"{str(piper.GetArmStatus().arm_status.err_status.joint_2_angle_limit):^15}"
-              f"{str(piper.GetArmStatus().arm_status.err_status.joint_3_angle_limit):^15}"
-              f"{str(piper.GetArmStatus().arm_status.err_status.joint_4_angle_limit):^15}"
-              f"{str(piper.GetArmStatus().arm_status.err_status.joint_5_angle_limit):^15}"
-              f"{str(piper.GetArmStatus().arm_status.err_status.joint_6_angle_limit):^15}|\n"
-              f"+{'-'*107}+"
-              )
-        print(
-              f"{'End Pose(Euler):':<108}|"
-              f"\n"
-              f"{'xyz(mm)':<12}"
-              f"{round(piper.GetArmEndPoseMsgs().end_pose.X_axis*1e-3, 3):<9}"
-              f"{round(piper.GetArmEndPoseMsgs().end_pose.Y_axis*1e-3, 3):<9}"
-              f"{round(piper.GetArmEndPoseMsgs().end_pose.Z_axis*1e-3, 3):<9}|"
-              f"{'max_linear_vel':^20}"
-              f"{round(piper.GetCurrentEndVelAndAccParam().current_end_vel_acc_param.end_max_linear_vel*1e-3, 3):^7}"
-              f"{'m/s':<5}|"
-              f"{'max_angular_vel':^20}"
-              f"{round(piper.GetCurrentEndVelAndAccParam().current_end_vel_acc_param.end_max_angular_vel*1e-3, 3):^7}"
-              f"{'rad/s':<8}|"
-              f"\n"
-              f"{'rpy(degree)':<12}"
-              f"{round(piper.GetArmEndPoseMsgs().end_pose.RX_axis*1e-3, 3):<9}"
-              f"{round(piper.GetArmEndPoseMsgs().end_pose.RY_axis*1e-3, 3):<9}"
-              f"{round(piper.GetArmEndPoseMsgs().end_pose.RZ_axis*1e-3, 3):<9}|"
-              f"{'max_linear_acc':^20}"
-              f"{round(piper.GetCurrentEndVelAndAccParam().current_end_vel_acc_param.end_max_linear_acc*1e-3, 3):^7}"
-              f"{'m/s^2':<5}|"
-              f"{'max_angular_acc':^20}"
-              f"{round(piper.GetCurrentEndVelAndAccParam().current_end_vel_acc_param.end_max_angular_acc*1e-3, 3):^7}"
-              f"{'rad/s^2':<8}|"
-              )
-        print(f"+{'-'*107}+\n"
-              f"{'Gripper&Teaching':<108}|"
-              
-              f"\n"
-              f"{'gripper_pos(mm)':<21}{round(piper.GetArmGripperMsgs().gripper_state.grippers_angle*1e-3, 3):<6}|"
-              f"{'Status code :':<59}"
-              f"{'|':>22}"
-              f"\n"
-              f"{'gripper_effort(N.m)':<21}{round(piper.GetArmGripperMsgs().gripper_state.grippers_effort*1e-3, 3):<6}|"
-              f"{'voltage_too_low':<23}{str(piper.GetArmGripperMsgs().gripper_state.foc_status.voltage_too_low):<6}|"
-              f"{'motor_overheating':<23}{str(piper.GetArmGripperMsgs().gripper_state.foc_status.motor_overheating):<6}"
-              f"{'|':>22}"
-              f"\n"
-              f"{'teaching_per':<21}{piper.GetGripperTeachingPendantParamFeedback().arm_gripper_teaching_param_feedback.teaching_range_per:<6}|"
-              f"{'driver_overcurrent':<23}{str(piper.GetArmGripperMsgs().gripper_state.foc_status.driver_overcurrent):<6}|"
-              f"{'driver_overheating':<23}{str(piper.GetArmGripperMsgs().gripper_state.foc_status.driver_overheating):<6}"
-              f"{'|':>22}"
-              f"\n"
-              f"{'max_range_config(mm)':<21}{piper.GetGripperTeachingPendantParamFeedback().arm_gripper_teaching_param_feedback.max_range_config:<6}|"
-              f"{'sensor_status':<23}{str(piper.GetArmGripperMsgs().gripper_state.foc_status.sensor_status):<6}|"
-              f"{'driver_error_status':<23}{str(piper.GetArmGripperMsgs().gripper_state.foc_status.driver_error_status):<6}"
-                f"{'|':>22}"              
-              f"\n"
-              f"{'teaching_friction':<21}{piper.GetGripperTeachingPendantParamFeedback().arm_gripper_teaching_param_feedback.teaching_friction:<6}|"
-              f"{'driver_enable_status':<23}{str(piper.GetArmGripperMsgs().gripper_state.foc_status.driver_enable_status):<6}|"
-              f"{'homing_status':<23}{str(piper.GetArmGripperMsgs().gripper_state.foc_status.homing_status):<6}"
-              f"{'|':>22}"
-              )
-        # 单独打印 FPS 类
-        print(f"+{'='*52}FPS{'='*52}+\n"
-              f"{'All FPS':<15}: {round(piper.GetCanFps())}\n"
-              f"{'Arm Status':<15}: {round(piper.GetArmStatus().Hz):<5}  {'End Pose':<15}: {round(piper.GetArmEndPoseMsgs().Hz):<5}\n"
-              f"{'Gripper Msg':<15}: {round(piper.GetArmGripperMsgs().Hz):<5}  {'High Spd Info':<15}: {round(piper.GetArmHighSpdInfoMsgs().Hz):<5}\n"
-              f"{'Low Spd Info':<15}: {round(piper.GetArmLowSpdInfoMsgs().Hz):<5}\n"
-              f"{'Joint Ctrl':<15}: {round(piper.GetArmJointCtrl().Hz):<5}  {'Gripper Ctrl':<15}: {round(piper.GetArmGripperCtrl().Hz):<5}\n"
-              f"{'Mode Ctrl':<15}: {round(piper.GetArmModeCtrl().Hz):<5}")
-        print("=" * 109)
-        print("Press 'q' to quit")
-        time.sleep(refresh_interval)
+    limit_interval = 1.0 / hz  # 参数查询最快 1Hz，即最小间隔 1s
+    # 只在启动时清屏一次 (Windows 下同时启用控制台的 ANSI 转义支持)
+    clear_terminal()
+    sys.stdout.write(HIDE_CURSOR)
+    next_time = time.perf_counter()
+    try:
+        while not exit_flag:
+            start_time = time.time()
+            # 如果距离上一次执行已超过限制间隔，就执行操作
+            if start_time - last_time >= limit_interval:
+                if(args.req_flag == 1):
+                    request_params(piper)
+                last_time = start_time
+            redraw(render_table(can_port, ArmSnapshot(piper)))
+            # 按绝对时刻调度，渲染耗时不累积到刷新周期里
+            next_time += refresh_interval
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_time = time.perf_counter()
+    finally:
+        sys.stdout.write(SHOW_CURSOR)
+        sys.stdout.flush()
 
 def main():
     hz = clamp_refresh_rate(args.hz)
@@ -1,7 +1,29 @@
 #!/usr/bin/env python3
+import os
+import socket
+import struct
 import subprocess
 import argparse
 
+# rtnetlink 常量 (linux/netlink.h, linux/rtnetlink.h)
+NETLINK_ROUTE = 0
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+NLMSG_ERROR = 2
+NLM_F_REQUEST = 0x1
+NLM_F_ACK = 0x4
+NLM_F_EXCL = 0x200
+NLM_F_CREATE = 0x400
+IFLA_IFNAME = 3
+IFLA_LINKINFO = 18
+IFLA_INFO_KIND = 1
+IFF_UP = 0x1
+ARPHRD_CAN = 280
+NLMSG_HEADER = struct.Struct('=IHHII')    # len, type, flags, seq, pid
+IFINFO_HEADER = struct.Struct('=BxHiII')  # family, type, index, flags, change
+RTATTR_HEADER = struct.Struct('=HH')      # len, type
+SYS_CLASS_NET = '/sys/class/net'
+
 def interface_exists(name: str) -> bool:
     result = subprocess.run(['ip', 'link', 'show', name],
                             stdout=subprocess.DEVNULL,
@@ -73,6 +95,108 @@ def delete_vcan(name: str):
     except subprocess.CalledProcessError as e:
         print(f"[×] 删除失败: {e}")
 
+def rtattr(attr_type: int, payload: bytes) -> bytes:
+    length = RTATTR_HEADER.size + len(payload)
+    return RTATTR_HEADER.pack(length, attr_type) + payload + b'\0' * (-length % 4)
+
+def netlink_batch(requests) -> list:
+    """
+    在一个netlink会话中发送一批请求，全部发出后再统一收取应答
+
+    Args:
+        requests: [(消息类型, 标志, 负载)]
+
+    Returns:
+        list: 每个请求的错误码 (0 表示成功)
+    """
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+    try:
+        sock.bind((0, 0))
+        sock.settimeout(5.0)
+        for seq, (msg_type, flags, payload) in enumerate(requests, 1):
+            sock.send(NLMSG_HEADER.pack(NLMSG_HEADER.size + len(payload), msg_type,
+                                        flags | NLM_F_REQUEST | NLM_F_ACK, seq, 0) + payload)
+        errors = {}
+        while len(errors) < len(requests):
+            data = sock.recv(65536)
+            offset = 0
+            while offset + NLMSG_HEADER.size <= len(data):
+                msg_len, msg_type, _, seq, _ = NLMSG_HEADER.unpack_from(data, offset)
+                if msg_len < NLMSG_HEADER.size:
+                    break
+                if msg_type == NLMSG_ERROR:
+                    errors[seq] = -struct.unpack_from('=i', data, offset + NLMSG_HEADER.size)[0]
+                offset += (msg_len + 3) & ~3
+        return [errors[seq] for seq in range(1, len(requests) + 1)]
+    finally:
+        sock.close()
+
+def is_virtual_can_sysfs(name: str) -> bool:
+    """CAN类型且没有底层设备 (vcan)，只读sysfs"""
+    try:
+        with open(os.path.join(SYS_CLASS_NET, name, 'type')) as f:
+            if int(f.read()) != ARPHRD_CAN:
+                return False
+    except (OSError, ValueError):
+        return False
+    return not os.path.exists(os.path.join(SYS_CLASS_NET, name, 'device'))
+
+def create_links_bulk(names, kind: str = 'vcan') -> list:
+    """批量创建并启动指定类型的接口，返回每个接口的错误码"""
+    info_kind = rtattr(IFLA_INFO_KIND, kind.encode() + b'\0')
+    requests = [(RTM_NEWLINK, NLM_F_CREATE | NLM_F_EXCL,
+                 IFINFO_HEADER.pack(socket.AF_UNSPEC, 0, 0, IFF_UP, IFF_UP)
+                 + rtattr(IFLA_IFNAME, name.encode() + b'\0')
+                 + rtattr(IFLA_LINKINFO, info_kind))
+                for name in names]
+    return netlink_batch(requests)
+
+def create_vcan_bulk(names):
+    """在一个netlink会话中批量创建虚拟 CAN 接口 (已存在的跳过)"""
+    existing = [name for name in names if os.path.exists(os.path.join(SYS_CLASS_NET, name))]
+    for name in existing:
+        print(f"[✓] 接口 {name} 已存在，跳过创建")
+    names = [name for name in names if name not in existing]
+    if not names:
+        return
+
+    if not os.path.isdir('/sys/module/vcan'):
+        try:
+            subprocess.run(['modprobe', 'vcan'], check=False)
+        except OSError as e:
+            print(f"[i] 加载 vcan 模块失败: {e}")
+    for name, error in zip(names, create_links_bulk(names, 'vcan')):
+        if error:
+            print(f"[×] 创建 {name} 失败: {os.strerror(error)}")
+        else:
+            print(f"[+] 成功创建虚拟 CAN 接口: {name}")
+
+def delete_vcan_bulk(names):
+    """在一个netlink会话中批量删除虚拟 CAN 接口 (只删除vcan，实体接口跳过)"""
+    targets = []
+    for name in names:
+        if not os.path.exists(os.path.join(SYS_CLASS_NET, name)):
+            print(f"[×] 接口 {name} 不存在，无法删除")
+        elif not is_virtual_can_sysfs(name):
+            print(f"[⚠️] {name} 不是虚拟 CAN 接口，跳过删除")
+        else:
+            targets.append(name)
+    if not targets:
+        return
+
+    requests = [(RTM_DELLINK, 0,
+                 IFINFO_HEADER.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+                 + rtattr(IFLA_IFNAME, name.encode() + b'\0'))
+                for name in targets]
+    for name, error in zip(targets, netlink_batch(requests)):
+        if error:
+            print(f"[×] 删除 {name} 失败: {os.strerror(error)}")
+        else:
+            print(f"[-] 已删除虚拟 CAN 接口: {name}")
+
+def bulk_names(prefix: str, count: int, start: int) -> list:
+    return [f"{prefix}{i}" for i in range(start, start + count)]
+
 def main():
     parser = argparse.ArgumentParser(description="虚拟CAN接口管理工具")
     subparsers = parser.add_subparsers(dest='command', required=True)
@@ -84,12 +208,26 @@ def main():
     parser_delete = subparsers.add_parser('delete', help='删除虚拟 CAN 接口')
     parser_delete.add_argument('--can_name', required=True)
 
+    parser_create_bulk = subparsers.add_parser('create-bulk', help='批量创建虚拟 CAN 接口 (如 vcan0~vcan15)')
+    parser_create_bulk.add_argument('--prefix', default='vcan')
+    parser_create_bulk.add_argument('--count', type=int, required=True)
+    parser_create_bulk.add_argument('--start', type=int, default=0, help='起始编号')
+
+    parser_delete_bulk = subparsers.add_parser('delete-bulk', help='批量删除虚拟 CAN 接口')
+    parser_delete_bulk.add_argument('--prefix', default='vcan')
+    parser_delete_bulk.add_argument('--count', type=int, required=True)
+    parser_delete_bulk.add_argument('--start', type=int, default=0, help='起始编号')
+
     args = parser.parse_args()
 
     if args.command == 'create':
         create_vcan(args.can_name, args.bitrate)
     elif args.command == 'delete':
         delete_vcan(args.can_name)
+    elif args.command == 'create-bulk':
+        create_vcan_bulk(bulk_names(args.prefix, args.count, args.start))
+    elif args.command == 'delete-bulk':
+        delete_vcan_bulk(bulk_names(args.prefix, args.count, args.start))
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*-coding:utf8-*-
+"""
+Piper机械臂CAN反馈帧模拟器
+
+在 vcan 接口上按设定频率发布与真实机械臂相同格式的反馈帧，用于在没有硬件的
+机器上对遥操作/监控程序做多臂负载测试。每个接口模拟一台机械臂，关节按各自
+相位缓慢往复运动。
+
+    0x2A1          机械臂状态 (控制模式、状态、运动模式、错误码)
+    0x2A2~0x2A4    末端位姿 X/Y, Z/RX, RY/RZ (0.001mm / 0.001°)
+    0x2A5~0x2A7    关节角度 J1/J2, J3/J4, J5/J6 (0.001°)
+    0x2A8          夹爪 (行程 0.001mm, 力矩 0.001N·m, 状态码)
+
+数据均为大端。末端位姿只是与关节同步变化的示意值，不是正运动学结果。
+
+用法:
+    sudo python3 manage_vcan.py create-bulk --prefix vcan --count 8
+    python3 piper_feedback_sim.py --prefix vcan --count 8 --joint_hz 200 --status_hz 200
+"""
+
+import argparse
+import errno
+import math
+import socket
+import struct
+import time
+
+CAN_FRAME = struct.Struct('=IB3x8s')   # can_id, can_dlc, data
+INT32_PAIR = struct.Struct('>ii')
+GRIPPER = struct.Struct('>ihBx')
+ARM_STATUS = struct.Struct('>BBBBBBH')
+
+ID_ARM_STATUS = 0x2A1
+ID_END_POSE = (0x2A2, 0x2A3, 0x2A4)
+ID_JOINT = (0x2A5, 0x2A6, 0x2A7)
+ID_GRIPPER = 0x2A8
+
+# 关节运动中心和幅值 (度)
+JOINT_CENTER = (0.0, 45.0, -40.0, 0.0, 30.0, 0.0)
+JOINT_AMPLITUDE = (30.0, 20.0, 20.0, 45.0, 25.0, 60.0)
+MOTION_FREQUENCY = 0.2   # Hz
+
+STATS_INTERVAL = 1.0
+
+
+def can_frame(can_id: int, data: bytes) -> bytes:
+    return CAN_FRAME.pack(can_id, len(data), data)
+
+
+class SimulatedArm:
+    """一台模拟机械臂及其CAN接口"""
+
+    def __init__(self, can_name: str, index: int):
+        self.can_name = can_name
+        self.phase = index * 0.7
+        self.sock = socket.socket(socket.AF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
+        self.sock.bind((can_name,))
+        self.sock.setblocking(False)
+        self.sent = 0
+        self.dropped = 0
+
+    def close(self):
+        self.sock.close()
+
+    def send(self, frames):
+        for frame in frames:
+            try:
+                self.sock.send(frame)
+                self.sent += 1
+            except BlockingIOError:
+                self.dropped += 1
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:
+                    raise
+                self.dropped += 1
+
+    def joint_angles(self, t: float):
+        """当前关节角度 (度)"""
+        w = 2 * math.pi * MOTION_FREQUENCY
+        return [center + amplitude * math.sin(w * t + self.phase + i * 0.5)
+                for i, (center, amplitude) in enumerate(zip(JOINT_CENTER, JOINT_AMPLITUDE))]
+
+    def joint_frames(self, t: float):
+        raw = [round(angle * 1e3) for angle in self.joint_angles(t)]
+        return [can_frame(can_id, INT32_PAIR.pack(raw[2 * i], raw[2 * i + 1]))
+                for i, can_id in enumerate(ID_JOINT)]
+
+    def end_pose_frames(self, t: float):
+        j1, j2, j3, j4, j5, j6 = (math.radians(angle) for angle in self.joint_angles(t))
+        reach = 250.0 + 80.0 * math.cos(j2 + j3)
+        pose = (reach * math.cos(j1), reach * math.sin(j1), 200.0 + 80.0 * math.sin(j2),
+                math.degrees(j4), math.degrees(j5), math.degrees(j6))
+        raw = [round(value * 1e3) for value in pose]
+        return [can_frame(can_id, INT32_PAIR.pack(raw[2 * i], raw[2 * i + 1]))
+                for i, can_id in enumerate(ID_END_POSE)]
+
+    def gripper_frames(self, t: float):
+        opening = 35.0 + 35.0 * math.sin(2 * math.pi * MOTION_FREQUENCY * 0.5 * t + self.phase)
+        return [can_frame(ID_GRIPPER, GRIPPER.pack(round(opening * 1e3), 500, 0x40))]
+
+    def status_frames(self, t: float):
+        # CAN控制模式, 正常, MOVE_J, 非示教, 到达目标, 轨迹0, 无错误
+        return [can_frame(ID_ARM_STATUS, ARM_STATUS.pack(0x01, 0x00, 0x01, 0x00, 0x00, 0x00, 0))]
+
+
+def run(can_names, rates, duration=None):
+    """
+    按绝对截止时刻发布反馈帧
+
+    Args:
+        can_names: 接口列表，每个接口一台机械臂
+        rates: {'joint': Hz, 'pose': Hz, 'gripper': Hz, 'status': Hz}，0 表示不发送
+        duration: 运行时长 (秒)，None 表示一直运行
+    """
+    arms = [SimulatedArm(name, i) for i, name in enumerate(can_names)]
+    builders = {
+        'joint': SimulatedArm.joint_frames,
+        'pose': SimulatedArm.end_pose_frames,
+        'gripper': SimulatedArm.gripper_frames,
+        'status': SimulatedArm.status_frames,
+    }
+    start = time.perf_counter()
+    groups = [(name, 1.0 / rate, builders[name]) for name, rate in rates.items() if rate > 0]
+    next_due = {name: start for name, _, _ in groups}
+    overruns = 0
+    last_stats = start
+    last_sent = 0
+
+    print(f"模拟 {len(arms)} 台机械臂: {', '.join(can_names)}")
+    print("反馈频率: " + ", ".join(f"{name} {rate}Hz" for name, rate in rates.items()))
+    try:
+        while duration is None or time.perf_counter() - start < duration:
+            now = time.perf_counter()
+            t = now - start
+            for name, period, builder in groups:
+                if now < next_due[name]:
+                    continue
+                for arm in arms:
+                    arm.send(builder(arm, t))
+                next_due[name] += period
+                if now - next_due[name] >= period:
+                    # 落后超过一个周期: 记录并重新对齐，不做补发
+                    overruns += 1
+                    next_due[name] = now + period
+
+            if now - last_stats >= STATS_INTERVAL:
+                sent = sum(arm.sent for arm in arms)
+                dropped = sum(arm.dropped for arm in arms)
+                print(f"发送 {(sent - last_sent) / (now - last_stats):.0f} 帧/秒, "
+                      f"丢弃 {dropped}, 超时 {overruns}")
+                last_sent = sent
+                last_stats = now
+
+            delay = min(next_due.values()) - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for arm in arms:
+            arm.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Piper机械臂CAN反馈帧模拟器")
+    parser.add_argument('--can_names', nargs='+', help='接口列表，如 vcan0 vcan1')
+    parser.add_argument('--prefix', default='vcan', help='未指定 --can_names 时按前缀+编号生成接口名')
+    parser.add_argument('--count', type=int, default=1)
+    parser.add_argument('--start', type=int, default=0, help='起始编号')
+    parser.add_argument('--joint_hz', type=float, default=200.0, help='关节角度反馈频率')
+    parser.add_argument('--pose_hz', type=float, default=200.0, help='末端位姿反馈频率')
+    parser.add_argument('--gripper_hz', type=float, default=200.0, help='夹爪反馈频率')
+    parser.add_argument('--status_hz', type=float, default=200.0, help='机械臂状态反馈频率')
+    parser.add_argument('--duration', type=float, default=None, help='运行时长 (秒)，默认一直运行')
+    args = parser.parse_args()
+
+    can_names = args.can_names or [f"{args.prefix}{i}" for i in range(args.start, args.start + args.count)]
+    rates = {'joint': args.joint_hz, 'pose': args.pose_hz,
+             'gripper': args.gripper_hz, 'status': args.status_hz}
+    run(can_names, rates, args.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+# -*-coding:utf8-*-
+"""
+Piper机械臂仿真接口 (C_PiperInterface_V2 替身)
+
+实现本仓库脚本用到的 C_PiperInterface_V2 方法和反馈消息字段，不需要CAN口和
+硬件即可运行控制循环、做吞吐和延迟测试:
+
+    - 关节/末端位姿/夹爪按一阶惯性跟踪目标 (时间常数可配置)
+    - 命令经过可配置的延迟后才生效 (模拟总线和驱动器延迟)
+    - 反馈按固定频率刷新，time_stamp 为最近一次反馈时刻，Hz 字段与真实SDK含义相同
+    - 控制类消息 (GetArmJointCtrl/GetArmGripperCtrl/GetArmModeCtrl) 的 Hz 统计最近
+      1 秒内实际发出的命令数，可直接用来测控制循环的发送频率
+    - 时钟可注入: 配合 VirtualClock 可以远快于实时地运行
+
+没有运动学: EndPoseCtrl 只驱动末端位姿反馈，JointCtrl/JointMitCtrl 只驱动关节反馈。
+JointMitCtrl 按位置参考跟踪，反馈力矩取前馈力矩。
+
+用法:
+    # 替换 piper_sdk 运行现有脚本
+    python3 piper_sim.py run V2/piper_ctrl_joint.py
+    python3 piper_sim.py run --latency 0.005 detect_arm.py --can_port can0
+
+    # 虚拟时钟下的控制循环基准测试
+    python3 piper_sim.py bench --duration 60 --rate 200
+
+    # 在代码中使用
+    clock = VirtualClock()
+    piper = SimulatedPiperInterface("can0", latency=0.002, clock=clock.now)
+    piper.ConnectPort()
+    ...
+    clock.sleep(0.005)
+"""
+
+import argparse
+import functools
+import math
+import os
+import runpy
+import sys
+import time
+import types
+from collections import deque
+from types import SimpleNamespace
+
+JOINT_IDS = range(1, 7)
+
+JOINT_TIME_CONSTANT = 0.05      # 关节/末端位姿一阶时间常数 (秒)
+GRIPPER_TIME_CONSTANT = 0.1     # 夹爪一阶时间常数 (秒)
+FEEDBACK_RATE = 200.0           # 高速反馈 (关节/位姿/夹爪/状态/高速电机信息) 频率 (Hz)
+LOW_SPEED_RATE = 100.0          # 低速电机信息反馈频率 (Hz)
+HZ_WINDOW = 1.0                 # 频率统计窗口 (秒)
+ARRIVED_TOLERANCE = 100         # 判定到达目标的关节误差 (0.001°)
+
+# 每个反馈周期的CAN帧数: 状态1 + 末端位姿3 + 关节3 + 夹爪1 + 高速电机信息6
+FEEDBACK_FRAMES_PER_TICK = 14
+LOW_SPEED_FRAMES_PER_TICK = 6
+
+# 关节限位 (0.1°) 和最大速度 (0.001 rad/s)，与出厂参数一致
+JOINT_LIMITS = [(-1500, 1500), (0, 1800), (-1700, 0), (-1000, 1000), (-700, 700), (-1200, 1200)]
+MAX_JOINT_SPEED = 3000
+MAX_JOINT_ACC = 10000
+GRIPPER_RANGE = (0, 70000)      # 夹爪行程 (0.001mm)
+
+# 零位时的末端位姿 (0.001mm, 0.001°)
+HOME_END_POSE = [56128, 0, 213266, 0, 85000, 0]
+
+
+class VirtualClock:
+    """虚拟时钟: sleep 只推进时间不等待"""
+
+    def __init__(self, start=0.0):
+        self.time = start
+
+    def now(self):
+        return self.time
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.time += seconds
+
+
+class SimulatedPiperInterface:
+    """C_PiperInterface_V2 的仿真替身"""
+
+    def __init__(self, can_name="can0", judge_flag=True, can_auto_init=True, *,
+                 time_constant=JOINT_TIME_CONSTANT, latency=0.0, feedback_rate=FEEDBACK_RATE,
+                 clock=time.monotonic, **sdk_options):
+        """
+        Args:
+            can_name: CAN接口名 (只用于显示)
+            judge_flag, can_auto_init, sdk_options: 真实SDK的参数，接受但忽略
+            time_constant: 关节/末端位姿一阶时间常数 (秒)
+            latency: 命令从发出到生效的延迟 (秒)
+            feedback_rate: 反馈刷新频率 (Hz)
+            clock: 时钟函数，默认 time.monotonic，可传入 VirtualClock().now
+        """
+        self.can_name = can_name
+        self.time_constant = time_constant
+        self.latency = latency
+        self.feedback_rate = feedback_rate
+        self._clock = clock
+
+        self.connected = False
+        self._connect_time = None
+        self.enabled = False
+        self.emergency_stop = False
+        self.ctrl_mode = 0x00
+        self.move_mode = 0x01
+        self.speed_rate = 0
+        self.mit_mode = 0x00
+
+        # 关节角度 (0.001°)、末端位姿 (0.001mm/0.001°)、夹爪 (0.001mm) 的当前值和目标值
+        self._joints = [0.0] * 6
+        self._joint_targets = [0.0] * 6
+        self._joint_speeds = [0.0] * 6
+        self._efforts = [0.0] * 6
+        self._end_pose = [float(v) for v in HOME_END_POSE]
+        self._end_pose_targets = self._end_pose[:]
+        self._gripper = 0.0
+        self._gripper_target = 0.0
+        self._gripper_effort = 0
+        self._gripper_code = 0x00
+
+        self._sim_time = clock()
+        self._pending = deque()          # (生效时刻, 函数, 参数)
+        self._command_times = {name: deque() for name in ('mode', 'joint', 'end_pose', 'gripper')}
+        self.command_counts = {}
+
+    # ------------------------------------------------------------
+    # 仿真核心
+    # ------------------------------------------------------------
+
+    def _integrate(self, t):
+        dt = t - self._sim_time
+        if dt <= 0:
+            return
+        self._sim_time = t
+        if not self.enabled or self.emergency_stop:
+            self._joint_speeds = [0.0] * 6
+            return
+        alpha = 1.0 - math.exp(-dt / self.time_constant)
+        for i in range(6):
+            delta = (self._joint_targets[i] - self._joints[i]) * alpha
+            self._joints[i] += delta
+            self._joint_speeds[i] = delta / dt
+            self._end_pose[i] += (self._end_pose_targets[i] - self._end_pose[i]) * alpha
+        self._gripper += (self._gripper_target - self._gripper) * (1.0 - math.exp(-dt / GRIPPER_TIME_CONSTANT))
+
+    def _advance(self, t):
+        """推进仿真到时刻 t，途中按生效时刻依次应用延迟的命令"""
+        pending = self._pending
+        while pending and pending[0][0] <= t:
+            apply_time, command, args = pending.popleft()
+            self._integrate(apply_time)
+            command(*args)
+        self._integrate(t)
+
+    def _feedback_time(self):
+        """推进到最近一次反馈时刻并返回该时刻"""
+        now = self._clock()
+        if self._connect_time is None:
+            return now
+        ticks = math.floor((now - self._connect_time) * self.feedback_rate)
+        tick = self._connect_time + ticks / self.feedback_rate
+        self._advance(max(tick, self._sim_time))
+        return tick
+
+    def _command(self, name, command, *args):
+        """记录一条命令，延迟 latency 后生效"""
+        now = self._clock()
+        self.command_counts[name] = self.command_counts.get(name, 0) + 1
+        if name in self._command_times:
+            self._command_times[name].append(now)
+        self._pending.append((now + self.latency, command, args))
+
+    def _command_hz(self, name):
+        times = self._command_times[name]
+        horizon = self._clock() - HZ_WINDOW
+        while times and times[0] < horizon:
+            times.popleft()
+        return len(times) / HZ_WINDOW
+
+    def _feedback_hz(self, rate):
+        if not self.connected:
+            return 0.0
+        return min(self._clock() - self._connect_time, HZ_WINDOW) * rate / HZ_WINDOW
+
+    def _message(self, **fields):
+        return SimpleNamespace(time_stamp=self._feedback_time(), Hz=self._feedback_hz(self.feedback_rate), **fields)
+
+    def _control_message(self, name, **fields):
+        return SimpleNamespace(time_stamp=self._clock(), Hz=self._command_hz(name), **fields)
+
+    # ------------------------------------------------------------
+    # 命令生效
+    # ------------------------------------------------------------
+
+    def _apply_enable(self, enabled):
+        self.enabled = enabled
+        if enabled:
+            self._joint_targets = self._joints[:]
+            self._end_pose_targets = self._end_pose[:]
+
+    def _apply_motion_ctrl_1(self, emergency_stop, track_ctrl, grag_teach_ctrl):
+        if emergency_stop == 0x01:
+            self.emergency_stop = True
+        elif emergency_stop == 0x02:
+            # 恢复后保持当前位置
+            self.emergency_stop = False
+            self._joint_targets = self._joints[:]
+            self._end_pose_targets = self._end_pose[:]
+
+    def _apply_mode(self, ctrl_mode, move_mode, speed_rate, mit_mode):
+        self.ctrl_mode = ctrl_mode
+        self.move_mode = move_mode
+        self.speed_rate = speed_rate
+        self.mit_mode = mit_mode
+
+    def _apply_joint_targets(self, joints):
+        for i, value in enumerate(joints):
+            low, high = JOINT_LIMITS[i]
+            self._joint_targets[i] = min(max(value, low * 100), high * 100)
+
+    def _apply_mit(self, motor_num, pos_ref, vel_ref, kp, kd, t_ref):
+        i = motor_num - 1
+        low, high = JOINT_LIMITS[i]
+        self._joint_targets[i] = min(max(math.degrees(pos_ref) * 1e3, low * 100), high * 100)
+        self._efforts[i] = t_ref * 1e3
+
+    def _apply_end_pose(self, pose):
+        self._end_pose_targets = [float(v) for v in pose]
+
+    def _apply_gripper(self, gripper_angle, gripper_effort, gripper_code, set_zero):
+        self._gripper_code = gripper_code
+        self._gripper_effort = gripper_effort
+        if set_zero == 0xAE:
+            self._gripper = self._gripper_target = 0.0
+        elif gripper_code & 0x01:
+            self._gripper_target = min(max(gripper_angle, GRIPPER_RANGE[0]), GRIPPER_RANGE[1])
+
+    # ------------------------------------------------------------
+    # 连接和使能
+    # ------------------------------------------------------------
+
+    def ConnectPort(self, *args, **kwargs):
+        if not self.connected:
+            self.connected = True
+            self._connect_time = self._clock()
+            self._sim_time = self._connect_time
+        return True
+
+    def DisconnectPort(self, *args, **kwargs):
+        self.connected = False
+
+    def isOk(self):
+        return self.connected
+
+    def EnableArm(self, motor_num=7, enable_flag=0x02):
+        self._command('enable', self._apply_enable, True)
+
+    def DisableArm(self, motor_num=7, enable_flag=0x01):
+        self._command('enable', self._apply_enable, False)
+
+    def EnablePiper(self):
+        """发送使能命令，返回反馈中所有电机是否已使能 (有延迟时前几次返回 False)"""
+        self.EnableArm()
+        self._feedback_time()
+        return self.enabled
+
+    def DisablePiper(self):
+        self.DisableArm()
+        self._feedback_time()
+        return not self.enabled
+
+    # ------------------------------------------------------------
+    # 控制命令
+    # ------------------------------------------------------------
+
+    def MotionCtrl_1(self, emergency_stop=0x00, track_ctrl=0x00, grag_teach_ctrl=0x00):
+        self._command('motion_ctrl_1', self._apply_motion_ctrl_1, emergency_stop, track_ctrl, grag_teach_ctrl)
+
+    def MotionCtrl_2(self, ctrl_mode=0x01, move_mode=0x01, move_spd_rate_ctrl=50, is_mit_mode=0x00,
+                     residence_time=0, installation_pos=0x00):
+        self._command('mode', self._apply_mode, ctrl_mode, move_mode, move_spd_rate_ctrl, is_mit_mode)
+
+    ModeCtrl = MotionCtrl_2
+
+    def JointCtrl(self, joint_1, joint_2, joint_3, joint_4, joint_5, joint_6):
+        self._command('joint', self._apply_joint_targets, (joint_1, joint_2, joint_3, joint_4, joint_5, joint_6))
+
+    def JointMitCtrl(self, motor_num, pos_ref, vel_ref, kp, kd, t_ref):
+        self._command('joint', self._apply_mit, motor_num, pos_ref, vel_ref, kp, kd, t_ref)
+
+    def EndPoseCtrl(self, X, Y, Z, RX, RY, RZ):
+        self._command('end_pose', self._apply_end_pose, (X, Y, Z, RX, RY, RZ))
+
+    def GripperCtrl(self, gripper_angle=0, gripper_effort=0, gripper_code=0, set_zero=0):
+        self._command('gripper', self._apply_gripper, gripper_angle, gripper_effort, gripper_code, set_zero)
+
+    # 参数配置/查询类命令: 仿真中不产生效果
+    def ArmParamEnquiryAndConfig(self, *args, **kwargs):
+        pass
+
+    def CrashProtectionConfig(self, *args, **kwargs):
+        pass
+
+    def EnableFkCal(self, *args, **kwargs):
+        pass
+
+    def SearchAllMotorMaxAngleSpd(self):
+        pass
+
+    def SearchAllMotorMaxAccLimit(self):
+        pass
+
+    def SearchPiperFirmwareVersion(self):
+        pass
+
+    # ------------------------------------------------------------
+    # 反馈
+    # ------------------------------------------------------------
+
+    def GetCanFps(self):
+        """总线帧率: 反馈帧 + 最近 1 秒内发出的控制帧"""
+        commands = sum(self._command_hz(name) for name in self._command_times)
+        return (self._feedback_hz(self.feedback_rate) * FEEDBACK_FRAMES_PER_TICK
+                + self._feedback_hz(LOW_SPEED_RATE) * LOW_SPEED_FRAMES_PER_TICK + commands)
+
+    def GetArmJointMsgs(self):
+        message = self._message()
+        message.joint_state = SimpleNamespace(
+            **{f"joint_{i}": round(self._joints[i - 1]) for i in JOINT_IDS})
+        return message
+
+    def GetArmEndPoseMsgs(self):
+        message = self._message()
+        message.end_pose = SimpleNamespace(
+            **dict(zip(('X_axis', 'Y_axis', 'Z_axis', 'RX_axis', 'RY_axis', 'RZ_axis'),
+                       (round(v) for v in self._end_pose))))
+        return message
+
+    def GetArmGripperMsgs(self):
+        message = self._message()
+        message.gripper_state = SimpleNamespace(
+            grippers_angle=round(self._gripper),
+            grippers_effort=self._gripper_effort if self._gripper_code & 0x01 else 0,
+            status_code=0x40 if self.enabled else 0x00,
+            foc_status=SimpleNamespace(
+                voltage_too_low=False, motor_overheating=False, driver_overcurrent=False,
+                driver_overheating=False, sensor_status=False, driver_error_status=False,
+                driver_enable_status=bool(self._gripper_code & 0x01), homing_status=False))
+        return message
+
+    def GetArmStatus(self):
+        message = self._message()
+        arrived = all(abs(target - joint) < ARRIVED_TOLERANCE
+                      for target, joint in zip(self._joint_targets, self._joints))
+        err_status = {}
+        for i in JOINT_IDS:
+            err_status[f"joint_{i}_angle_limit"] = False
+            err_status[f"communication_status_joint_{i}"] = False
+        message.arm_status = SimpleNamespace(
+            ctrl_mode=self.ctrl_mode,
+            arm_status=0x01 if self.emergency_stop else 0x00,
+            mode_feed=self.move_mode,
+            teach_status=0x00,
+            motion_status=0x00 if arrived else 0x01,
+            trajectory_num=0,
+            err_code=0,
+            err_status=SimpleNamespace(**err_status))
+        return message
+
+    def GetArmHighSpdInfoMsgs(self):
+        message = self._message()
+        for i in JOINT_IDS:
+            setattr(message, f"motor_{i}", SimpleNamespace(
+                can_id=0x250 + i,
+                motor_speed=round(math.radians(self._joint_speeds[i - 1])),   # 0.001 rad/s
+                current=round(self._efforts[i - 1]),
+                pos=round(math.radians(self._joints[i - 1])),                 # 0.001 rad
+                effort=round(self._efforts[i - 1])))
+        return message
+
+    def GetArmLowSpdInfoMsgs(self):
+        message = SimpleNamespace(time_stamp=self._feedback_time(), Hz=self._feedback_hz(LOW_SPEED_RATE))
+        for i in JOINT_IDS:
+            setattr(message, f"motor_{i}", SimpleNamespace(
+                can_id=0x260 + i, vol=240, foc_temp=35, motor_temp=30, bus_current=0,
+                foc_status=SimpleNamespace(
+                    voltage_too_low=False, motor_overheating=False, driver_overcurrent=False,
+                    driver_overheating=False, collision_status=False, driver_error_status=False,
+                    driver_enable_status=self.enabled, stall_status=False)))
+        return message
+
+    def GetArmJointCtrl(self):
+        return self._control_message('joint', joint_ctrl=SimpleNamespace(
+            **{f"joint_{i}": round(self._joint_targets[i - 1]) for i in JOINT_IDS}))
+
+    def GetArmGripperCtrl(self):
+        return self._control_message('gripper', gripper_ctrl=SimpleNamespace(
+            grippers_angle=round(self._gripper_target), grippers_effort=self._gripper_effort,
+            status_code=self._gripper_code, set_zero=0x00))
+
+    def GetArmModeCtrl(self):
+        return self._control_message('mode', ctrl_151=SimpleNamespace(
+            ctrl_mode=self.ctrl_mode, move_mode=self.move_mode, move_spd_rate_ctrl=self.speed_rate,
+            mit_mode=self.mit_mode, residence_time=0, installation_pos=0x00))
+
+    GetArmCtrlCode151 = GetArmModeCtrl
+
+    def GetPiperFirmwareVersion(self):
+        return "S-V1.6-3-SIM"
+
+    def GetCurrentSDKVersion(self):
+        return SimpleNamespace(value="sim")
+
+    def GetCurrentInterfaceVersion(self):
+        return SimpleNamespace(value="V2-sim")
+
+    def GetCurrentProtocolVersion(self):
+        return SimpleNamespace(value="V2-sim")
+
+    def GetAllMotorAngleLimitMaxSpd(self):
+        motors = [SimpleNamespace(motor_num=0, max_angle_limit=0, min_angle_limit=0, max_joint_spd=0)]
+        motors += [SimpleNamespace(motor_num=i, min_angle_limit=JOINT_LIMITS[i - 1][0],
+                                   max_angle_limit=JOINT_LIMITS[i - 1][1], max_joint_spd=MAX_JOINT_SPEED)
+                   for i in JOINT_IDS]
+        return SimpleNamespace(time_stamp=self._clock(), Hz=0.0,
+                               all_motor_angle_limit_max_spd=SimpleNamespace(motor=motors))
+
+    def GetAllMotorMaxAccLimit(self):
+        motors = [SimpleNamespace(joint_motor_num=i, max_joint_acc=MAX_JOINT_ACC if i else 0) for i in range(7)]
+        return SimpleNamespace(time_stamp=self._clock(), Hz=0.0,
+                               all_motor_max_acc_limit=SimpleNamespace(motor=motors))
+
+    def GetCrashProtectionLevelFeedback(self):
+        return SimpleNamespace(time_stamp=self._clock(), Hz=0.0, crash_protection_level_feedback=SimpleNamespace(
+            **{f"joint_{i}_protection_level": 0 for i in JOINT_IDS}))
+
+    def GetCurrentEndVelAndAccParam(self):
+        return SimpleNamespace(time_stamp=self._clock(), Hz=0.0, current_end_vel_acc_param=SimpleNamespace(
+            end_max_linear_vel=0, end_max_angular_vel=0, end_max_linear_acc=0, end_max_angular_acc=0))
+
+    def GetGripperTeachingPendantParamFeedback(self):
+        return SimpleNamespace(time_stamp=self._clock(), Hz=0.0, arm_gripper_teaching_param_feedback=SimpleNamespace(
+            teaching_range_per=100, max_range_config=70, teaching_friction=1))
+
+
+def install(**options):
+    """
+    用仿真接口替换 piper_sdk 模块，之后 `from piper_sdk import *` 得到的
+    C_PiperInterface_V2 即为 SimulatedPiperInterface
+
+    Args:
+        options: 传给 SimulatedPiperInterface 的仿真参数 (time_constant/latency/feedback_rate/clock)
+    """
+    module = types.ModuleType('piper_sdk')
+    module.C_PiperInterface_V2 = functools.partial(SimulatedPiperInterface, **options)
+    module.C_PiperInterface = module.C_PiperInterface_V2
+    sys.modules['piper_sdk'] = module
+    return module
+
+
+def run_script(script, script_args, **options):
+    """替换 piper_sdk 后以 __main__ 身份运行脚本"""
+    install(**options)
+    sys.argv = [script] + list(script_args)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    runpy.run_path(script, run_name='__main__')
+
+
+def benchmark(duration=60.0, rate=200.0, time_constant=JOINT_TIME_CONSTANT, latency=0.0,
+              feedback_rate=FEEDBACK_RATE):
+    """
+    虚拟时钟下运行一个关节位置控制循环: 每周期读取反馈并发送 JointCtrl/GripperCtrl，
+    目标在两组姿态间每 2 秒切换一次
+
+    Returns:
+        dict: 墙钟耗时、加速比、周期耗时、命令频率和阶跃响应的 63% 上升时间
+    """
+    clock = VirtualClock()
+    piper = SimulatedPiperInterface("sim", time_constant=time_constant, latency=latency,
+                                    feedback_rate=feedback_rate, clock=clock.now)
+    piper.ConnectPort()
+    while not piper.EnablePiper():
+        clock.sleep(0.01)
+    piper.MotionCtrl_2(0x01, 0x01, 100, 0x00)
+
+    poses = ([0, 0, 0, 0, 0, 0], [20000, 60000, -60000, 30000, -20000, 45000])
+    period = 1.0 / rate
+    cycles = int(duration * rate)
+    switch_cycles = max(1, round(2.0 * rate))  # 每 2 秒切换一次目标，低频时至少 1 个周期
+    step_start = None
+    rise_times = []
+    joint_hz = []
+
+    wall_start = time.perf_counter()
+    for k in range(cycles):
+        target = poses[(k // switch_cycles) % 2]
+        if k % switch_cycles == 0:
+            step_start = clock.now()
+            start_value = piper.GetArmJointMsgs().joint_state.joint_2
+        piper.JointCtrl(*target)
+        piper.GripperCtrl(abs(target[1]) // 2, 1000, 0x01, 0)
+
+        joint_2 = piper.GetArmJointMsgs().joint_state.joint_2
+        if step_start is not None and target[1] != start_value:
+            progress = (joint_2 - start_value) / (target[1] - start_value)
+            if progress >= 1.0 - math.exp(-1.0):
+                rise_times.append(clock.now() - step_start)
+                step_start = None
+        if k % max(1, int(rate)) == 0:
+            joint_hz.append(piper.GetArmJointCtrl().Hz)
+        clock.sleep(period)
+    wall = time.perf_counter() - wall_start
+
+    return {
+        'cycles': cycles,
+        'wall_s': wall,
+        'speedup': duration / wall,
+        'cycle_us': wall / cycles * 1e6,
+        'joint_ctrl_hz': joint_hz[-1] if joint_hz else 0.0,
+        'can_fps': piper.GetCanFps(),
+        'rise_time_ms': sum(rise_times) / len(rise_times) * 1e3 if rise_times else float('nan'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Piper机械臂仿真接口")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_sim_options(subparser):
+        subparser.add_argument('--time_constant', type=float, default=JOINT_TIME_CONSTANT, help='一阶时间常数 (秒)')
+        subparser.add_argument('--latency', type=float, default=0.0, help='命令生效延迟 (秒)')
+        subparser.add_argument('--feedback_rate', type=float, default=FEEDBACK_RATE, help='反馈频率 (Hz)')
+
+    parser_run = subparsers.add_parser('run', help='用仿真接口运行脚本')
+    add_sim_options(parser_run)
+    parser_run.add_argument('script', help='要运行的脚本')
+    parser_run.add_argument('script_args', nargs=argparse.REMAINDER, help='脚本参数')
+
+    parser_bench = subparsers.add_parser('bench', help='虚拟时钟下的控制循环基准测试')
+    add_sim_options(parser_bench)
+    parser_bench.add_argument('--duration', type=float, default=60.0, help='仿真时长 (秒)')
+    parser_bench.add_argument('--rate', type=float, default=200.0, help='控制频率 (Hz)')
+
+    args = parser.parse_args()
+    options = dict(time_constant=args.time_constant, latency=args.latency, feedback_rate=args.feedback_rate)
+
+    if args.command == 'run':
+        run_script(args.script, args.script_args, **options)
+    elif args.command == 'bench':
+        if args.rate <= 0:
+            parser.error("--rate 必须大于 0")
+        result = benchmark(args.duration, args.rate, **options)
+        print(f"仿真 {args.duration:.0f}s ({result['cycles']} 周期) 墙钟 {result['wall_s']:.2f}s, "
+              f"加速比 {result['speedup']:.0f}x, 每周期 {result['cycle_us']:.1f}us")
+        print(f"JointCtrl 频率 {result['joint_ctrl_hz']:.0f}Hz, CAN 帧率 {result['can_fps']:.0f}, "
+              f"阶跃 63% 上升时间 {result['rise_time_ms']:.1f}ms "
+              f"(时间常数 {args.time_constant*1e3:.0f}ms + 延迟 {args.latency*1e3:.0f}ms)")
+
+
+if __name__ == "__main__":
+    main()
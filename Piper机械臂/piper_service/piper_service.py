@@ -11,9 +11,16 @@ import subprocess
 import threading
 import logging
 import signal
+import socket
+import struct
+import errno
+import shutil
 from pathlib import Path
 from typing import Optional, List, Dict
 import json
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 # 配置日志
 logging.basicConfig(
@@ -26,13 +33,365 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# rtnetlink 常量 (linux/netlink.h, linux/rtnetlink.h, linux/if_arp.h)
+NETLINK_ROUTE = 0
+RTMGRP_LINK = 0x1
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_ACK = 0x4
+NLM_F_DUMP = 0x300
+IFLA_IFNAME = 3
+IFLA_LINKINFO = 18
+IFLA_INFO_KIND = 1
+IFLA_INFO_DATA = 2
+IFLA_INFO_XSTATS = 3
+IFLA_CAN_BITTIMING = 1
+IFLA_CAN_STATE = 4
+IFLA_CAN_BERR_COUNTER = 8
+IFF_UP = 0x1
+ARPHRD_CAN = 280
+NLMSG_HEADER = struct.Struct('=IHHII')    # len, type, flags, seq, pid
+IFINFO_HEADER = struct.Struct('=BxHiII')  # family, type, index, flags, change
+RTATTR_HEADER = struct.Struct('=HH')      # len, type
+CAN_BITTIMING = struct.Struct('=8I')      # bitrate, sample_point, tq, prop_seg, phase_seg1, phase_seg2, sjw, brp
+CAN_DEVICE_STATS = struct.Struct('=6I')   # bus_error, error_warning, error_passive, bus_off, arbitration_lost, restarts
+CAN_BERR_COUNTER = struct.Struct('=HH')   # txerr, rxerr
+CAN_STATES = ('ERROR-ACTIVE', 'ERROR-WARNING', 'ERROR-PASSIVE', 'BUS-OFF', 'STOPPED', 'SLEEPING')
+
+SYS_CLASS_NET = '/sys/class/net'
+# 多臂模式下临时释放接口名称时使用的前缀 (接口名最长15字节)
+TEMP_NAME_PREFIX = 'pipertmp'
+# /sys/class/net/<if>/statistics 中上报的计数器
+INTERFACE_STATISTICS = ('rx_packets', 'tx_packets', 'rx_errors', 'tx_errors',
+                        'rx_dropped', 'tx_dropped', 'rx_over_errors')
+# Piper机械臂反馈帧 (can_id, can_mask): 0x2A1~0x2A8 状态/末端位姿/关节/夹爪，
+# 0x251~0x256 电机高速反馈，0x261~0x266 电机低速反馈
+PIPER_FEEDBACK_FILTERS = ((0x2A0, 0x7F0), (0x250, 0x7F0), (0x260, 0x7F0))
+CAN_FRAME = struct.Struct('=IB3x8s')      # can_id, can_dlc, data
+CAN_FILTER = struct.Struct('=II')         # can_id, can_mask
+SO_TIMESTAMP = 29                         # asm-generic/socket.h，socket模块未导出
+TIMEVAL = struct.Struct('@ll')            # struct timeval: tv_sec, tv_usec
+# 连接测试: 最长等待时间 (秒) 和判定就绪所需的反馈帧数
+PROBE_WINDOW = 0.5
+PROBE_MIN_FRAMES = 50
+# 热插拔事件合并窗口 (秒): USB适配器插入/重置时会连续产生多条链路消息
+HOTPLUG_SETTLE_TIME = 0.2
+
+def list_can_links() -> Dict[int, str]:
+    """
+    从sysfs读取当前所有CAN适配器接口 {ifindex: 名称}，不启动子进程
+    
+    vcan与CAN适配器的链路类型相同 (ARPHRD_CAN)，按是否有 device 链接排除，
+    与 `ip link show type can` 的结果一致
+    """
+    links = {}
+    try:
+        names = os.listdir(SYS_CLASS_NET)
+    except OSError:
+        return links
+    for name in names:
+        try:
+            with open(os.path.join(SYS_CLASS_NET, name, 'type')) as f:
+                if int(f.read()) != ARPHRD_CAN:
+                    continue
+            if not os.path.exists(os.path.join(SYS_CLASS_NET, name, 'device')):
+                continue
+            with open(os.path.join(SYS_CLASS_NET, name, 'ifindex')) as f:
+                links[int(f.read())] = name
+        except (OSError, ValueError):
+            continue
+    return links
+
+def read_sysfs(name: str, attribute: str) -> Optional[str]:
+    """读取 /sys/class/net/<name>/<attribute>，不存在时返回None"""
+    try:
+        with open(os.path.join(SYS_CLASS_NET, name, attribute)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def sysfs_usb_address(name: str) -> Optional[str]:
+    """
+    接口所属USB设备地址 (与 ethtool -i 的 bus-info 相同，如 1-2:1.0)
+    
+    /sys/class/net/<name>/device 指向USB接口设备目录，目录名即总线地址；
+    vcan等虚拟接口没有该链接
+    """
+    device = os.path.join(SYS_CLASS_NET, name, 'device')
+    if not os.path.exists(device):
+        return None
+    return os.path.basename(os.path.realpath(device))
+
+def read_interface_statistics(name: str) -> Dict[str, int]:
+    """读取接口收发/错误计数器"""
+    statistics = {}
+    for counter in INTERFACE_STATISTICS:
+        value = read_sysfs(name, os.path.join('statistics', counter))
+        if value is not None:
+            statistics[counter] = int(value)
+    return statistics
+
+def measure_can_feedback(sock: socket.socket, window: float, min_frames: int) -> Dict:
+    """
+    在已绑定的CAN_RAW套接字上统计反馈帧
+    
+    收到 min_frames 帧后立即返回，否则最多等待 window 秒。延迟为内核收帧
+    时间戳 (SO_TIMESTAMP) 到本进程读到该帧的时间
+    
+    Returns:
+        dict: ok, frames, rate_hz, first_frame_ms, latency_mean_ms, latency_max_ms, elapsed_ms, can_ids
+    """
+    ancillary_size = socket.CMSG_SPACE(TIMEVAL.size)
+    start = time.monotonic()
+    deadline = start + window
+    frames = 0
+    first_frame = last_frame = None
+    latency_sum = latency_max = 0.0
+    latency_count = 0
+    can_ids = set()
+    
+    while frames < min_frames:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        sock.settimeout(remaining)
+        try:
+            data, ancdata, _, _ = sock.recvmsg(CAN_FRAME.size, ancillary_size)
+        except socket.timeout:
+            break
+        received_wall = time.time()
+        received = time.monotonic()
+        if len(data) < CAN_FRAME.size:
+            continue
+        
+        frames += 1
+        if first_frame is None:
+            first_frame = received
+        last_frame = received
+        can_ids.add(CAN_FRAME.unpack(data)[0] & socket.CAN_EFF_MASK)
+        for level, cmsg_type, cmsg_data in ancdata:
+            if level == socket.SOL_SOCKET and cmsg_type == SO_TIMESTAMP and len(cmsg_data) >= TIMEVAL.size:
+                seconds, microseconds = TIMEVAL.unpack_from(cmsg_data)
+                latency = received_wall - (seconds + microseconds * 1e-6)
+                latency_sum += latency
+                latency_max = max(latency_max, latency)
+                latency_count += 1
+    
+    span = (last_frame - first_frame) if frames > 1 else 0.0
+    return {
+        'ok': frames >= min_frames,
+        'frames': frames,
+        'rate_hz': round((frames - 1) / span, 1) if span > 0 else 0.0,
+        'first_frame_ms': round((first_frame - start) * 1e3, 2) if first_frame is not None else None,
+        'latency_mean_ms': round(latency_sum / latency_count * 1e3, 3) if latency_count else None,
+        'latency_max_ms': round(latency_max * 1e3, 3) if latency_count else None,
+        'elapsed_ms': round((time.monotonic() - start) * 1e3, 2),
+        'can_ids': [f"0x{can_id:X}" for can_id in sorted(can_ids)]
+    }
+
+def rtattr(attr_type: int, payload: bytes) -> bytes:
+    """打包一个rtnetlink属性 (4字节对齐)"""
+    length = RTATTR_HEADER.size + len(payload)
+    return RTATTR_HEADER.pack(length, attr_type) + payload + b'\0' * (-length % 4)
+
+def iter_rtattrs(data: bytes, offset: int, end: int):
+    """
+    遍历 [offset, end) 范围内的rtnetlink属性
+    
+    Yields:
+        (属性类型, 数据起始偏移, 数据结束偏移)
+    """
+    while offset + RTATTR_HEADER.size <= end:
+        attr_len, attr_type = RTATTR_HEADER.unpack_from(data, offset)
+        if attr_len < RTATTR_HEADER.size:
+            break
+        yield attr_type & 0x3FFF, offset + RTATTR_HEADER.size, offset + attr_len
+        offset += (attr_len + 3) & ~3
+
+def link_kind(data: bytes, offset: int, end: int) -> Optional[str]:
+    """读取IFLA_LINKINFO属性中的链路种类 (IFLA_INFO_KIND，如 'can'、'vcan')"""
+    for info_type, start, info_end in iter_rtattrs(data, offset, end):
+        if info_type == IFLA_INFO_KIND:
+            return data[start:info_end].split(b'\0', 1)[0].decode()
+    return None
+
+def parse_link_messages(data: bytes):
+    """
+    解析rtnetlink链路消息
+    
+    Yields:
+        (消息类型, ifindex, 链路类型, 接口名称, 链路种类)
+    """
+    offset = 0
+    while offset + NLMSG_HEADER.size <= len(data):
+        msg_len, msg_type, _, _, _ = NLMSG_HEADER.unpack_from(data, offset)
+        if msg_len < NLMSG_HEADER.size:
+            break
+        if msg_type in (RTM_NEWLINK, RTM_DELLINK):
+            body = offset + NLMSG_HEADER.size
+            _, link_type, ifindex, _, _ = IFINFO_HEADER.unpack_from(data, body)
+            ifname = kind = None
+            for attr_type, start, end in iter_rtattrs(data, body + IFINFO_HEADER.size, offset + msg_len):
+                if attr_type == IFLA_IFNAME:
+                    ifname = data[start:end].split(b'\0', 1)[0].decode()
+                elif attr_type == IFLA_LINKINFO:
+                    kind = link_kind(data, start, end)
+            yield msg_type, ifindex, link_type, ifname, kind
+        offset += (msg_len + 3) & ~3
+
+class RtnetlinkBackend:
+    """
+    进程内CAN接口配置 (rtnetlink)
+    
+    与 `ip link set` 发送相同的RTM_NEWLINK请求，省去每次操作的fork/exec和sudo；
+    需要root或CAP_NET_ADMIN，权限不足时请求返回EPERM (OSError)
+    """
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+        self.sock.bind((0, 0))
+        self.sock.settimeout(2.0)
+        self.seq = 0
+        self.lock = threading.Lock()
+    
+    def close(self):
+        self.sock.close()
+    
+    def request(self, msg_type: int, flags: int, payload: bytes) -> List[bytes]:
+        """
+        发送请求并等待应答
+        
+        Returns:
+            List[bytes]: 应答中的数据消息 (dump请求的各条记录)
+        
+        Raises:
+            OSError: 内核返回错误码
+        """
+        with self.lock:
+            self.seq += 1
+            seq = self.seq
+            self.sock.send(NLMSG_HEADER.pack(NLMSG_HEADER.size + len(payload), msg_type,
+                                             flags, seq, 0) + payload)
+            messages = []
+            while True:
+                data = self.sock.recv(65536)
+                offset = 0
+                while offset + NLMSG_HEADER.size <= len(data):
+                    msg_len, reply_type, _, reply_seq, _ = NLMSG_HEADER.unpack_from(data, offset)
+                    if msg_len < NLMSG_HEADER.size:
+                        break
+                    if reply_seq == seq:
+                        if reply_type == NLMSG_ERROR:
+                            error = struct.unpack_from('=i', data, offset + NLMSG_HEADER.size)[0]
+                            if error:
+                                raise OSError(-error, os.strerror(-error))
+                            return messages
+                        if reply_type == NLMSG_DONE:
+                            return messages
+                        messages.append(data[offset:offset + msg_len])
+                    offset += (msg_len + 3) & ~3
+    
+    def set_link(self, ifindex: int, flags: int = 0, change: int = 0, attributes: bytes = b''):
+        """发送RTM_NEWLINK修改接口"""
+        payload = IFINFO_HEADER.pack(socket.AF_UNSPEC, 0, ifindex, flags, change) + attributes
+        self.request(RTM_NEWLINK, NLM_F_REQUEST | NLM_F_ACK, payload)
+    
+    def set_up(self, ifindex: int, up: bool):
+        """启动/停止接口 (ip link set <if> up/down)"""
+        self.set_link(ifindex, IFF_UP if up else 0, IFF_UP)
+    
+    def set_bitrate(self, ifindex: int, bitrate: int):
+        """设置CAN比特率 (ip link set <if> type can bitrate <n>)，接口需处于DOWN状态"""
+        bittiming = CAN_BITTIMING.pack(bitrate, 0, 0, 0, 0, 0, 0, 0)
+        self.set_link(ifindex, attributes=rtattr(
+            IFLA_LINKINFO,
+            rtattr(IFLA_INFO_KIND, b'can\0')
+            + rtattr(IFLA_INFO_DATA, rtattr(IFLA_CAN_BITTIMING, bittiming))))
+    
+    def rename(self, ifindex: int, new_name: str):
+        """重命名接口 (ip link set <if> name <new>)，接口需处于DOWN状态"""
+        self.set_link(ifindex, attributes=rtattr(IFLA_IFNAME, new_name.encode() + b'\0'))
+    
+    def can_link_info(self) -> Dict[int, Dict]:
+        """
+        一次dump读取所有CAN适配器接口的控制器信息 (不含vcan)
+        
+        Returns:
+            {ifindex: {bitrate, can_state, tx_error_counter, rx_error_counter,
+                       bus_error, error_warning, error_passive, bus_off, arbitration_lost, restarts}}
+        """
+        payload = IFINFO_HEADER.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+        links = {}
+        for message in self.request(RTM_GETLINK, NLM_F_REQUEST | NLM_F_DUMP, payload):
+            _, link_type, ifindex, _, _ = IFINFO_HEADER.unpack_from(message, NLMSG_HEADER.size)
+            if link_type != ARPHRD_CAN:
+                continue
+            info = {}
+            for attr_type, start, end in iter_rtattrs(message, NLMSG_HEADER.size + IFINFO_HEADER.size, len(message)):
+                if attr_type != IFLA_LINKINFO or link_kind(message, start, end) != 'can':
+                    continue
+                links[ifindex] = info
+                for info_type, info_start, info_end in iter_rtattrs(message, start, end):
+                    if info_type == IFLA_INFO_XSTATS and info_end - info_start >= CAN_DEVICE_STATS.size:
+                        info.update(zip(('bus_error', 'error_warning', 'error_passive',
+                                         'bus_off', 'arbitration_lost', 'restarts'),
+                                        CAN_DEVICE_STATS.unpack_from(message, info_start)))
+                    if info_type != IFLA_INFO_DATA:
+                        continue
+                    for can_type, can_start, can_end in iter_rtattrs(message, info_start, info_end):
+                        if can_type == IFLA_CAN_BITTIMING and can_end - can_start >= 4:
+                            info['bitrate'] = struct.unpack_from('=I', message, can_start)[0]
+                        elif can_type == IFLA_CAN_STATE and can_end - can_start >= 4:
+                            state = struct.unpack_from('=I', message, can_start)[0]
+                            info['can_state'] = CAN_STATES[state] if state < len(CAN_STATES) else state
+                        elif can_type == IFLA_CAN_BERR_COUNTER and can_end - can_start >= CAN_BERR_COUNTER.size:
+                            info['tx_error_counter'], info['rx_error_counter'] = \
+                                CAN_BERR_COUNTER.unpack_from(message, can_start)
+        return links
+    
+    def can_bitrates(self) -> Dict[int, int]:
+        """所有CAN接口当前比特率 {ifindex: bitrate}"""
+        return {ifindex: info['bitrate'] for ifindex, info in self.can_link_info().items()
+                if 'bitrate' in info}
+
+class StatusRequestHandler(BaseHTTPRequestHandler):
+    """状态接口: GET /status 返回运行中服务的缓存状态 (JSON)"""
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/status':
+            self.send_error(404)
+            return
+        body = json.dumps(self.server.service.get_status(), ensure_ascii=False).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        logger.debug(f"状态接口请求: {format % args}")
+
 class SimplePiperService:
     def __init__(self, config_file: str = "/etc/piper_service.conf"):
         self.config_file = config_file
         self.config = self.load_config()
         self.running = False
         self.current_can_port = None
+        self.arm_states = {}
+        self.arm_states_lock = threading.Lock()
+        # 供状态接口使用的缓存，在接口变化时更新，查询时不重新扫描
+        self.interfaces_cache = []
+        self.last_hotplug_event = None
+        self.hotplug_events = 0
+        self.reconfigure_counts = {}
+        self.probe_results = {}
+        self.status_lock = threading.Lock()
+        self.status_server = None
         self.monitoring_thread = None
+        self.netlink_socket = None
+        self.link_backend = self.open_link_backend()
         
     def load_config(self) -> Dict:
         """加载配置文件"""
@@ -40,7 +399,14 @@ class SimplePiperService:
             "can_name": "can0",
             "bitrate": 1000000,
             "check_interval": 5,
+            "monitor_mode": "netlink",
+            "interface_backend": "netlink",
             "usb_address": None,
+            "arms": [],
+            "status_address": "127.0.0.1",
+            "status_port": 8790,
+            "probe_window": PROBE_WINDOW,
+            "probe_min_frames": PROBE_MIN_FRAMES,
             "log_level": "INFO"
         }
         
@@ -68,17 +434,27 @@ class SimplePiperService:
         except Exception as e:
             logger.error(f"保存配置文件失败: {e}")
     
+    def open_link_backend(self) -> Optional[RtnetlinkBackend]:
+        """按配置创建进程内接口后端，不可用时返回None (使用ip/ethtool命令)"""
+        if self.config.get('interface_backend', 'netlink') != 'netlink':
+            return None
+        try:
+            return RtnetlinkBackend()
+        except (OSError, AttributeError) as e:
+            logger.warning(f"rtnetlink不可用，使用ip命令配置CAN接口: {e}")
+            return None
+    
     def check_dependencies(self) -> bool:
         """检查系统依赖"""
-        dependencies = ['ethtool', 'can-utils']
-        missing = []
-        
-        for dep in dependencies:
-            result = subprocess.run(['dpkg', '-l'], capture_output=True, text=True)
-            if dep not in result.stdout:
-                missing.append(dep)
+        # 包名 -> 用于判断是否安装的可执行文件 (在PATH中查找，不调用dpkg)
+        dependencies = {'ethtool': 'ethtool', 'can-utils': 'cansend'}
+        missing = [dep for dep, executable in dependencies.items() if shutil.which(executable) is None]
         
         if missing:
+            if self.link_backend is not None:
+                # 进程内后端不依赖这些工具，仅在回退到命令行时需要
+                logger.warning(f"缺少依赖包: {missing}，回退到命令行配置时将不可用")
+                return True
             logger.error(f"缺少依赖包: {missing}")
             logger.info("请运行: sudo apt update && sudo apt install " + " ".join(missing))
             return False
@@ -88,6 +464,34 @@ class SimplePiperService:
     
     def find_can_interfaces(self) -> List[Dict]:
         """查找所有CAN接口"""
+        if os.path.isdir(SYS_CLASS_NET):
+            return self.find_can_interfaces_sysfs()
+        return self.find_can_interfaces_subprocess()
+    
+    def find_can_interfaces_sysfs(self) -> List[Dict]:
+        """从sysfs读取CAN接口列表 (类型、状态、USB地址)，比特率经一次rtnetlink dump获取"""
+        bitrates = {}
+        if self.link_backend is not None:
+            try:
+                bitrates = self.link_backend.can_bitrates()
+            except OSError as e:
+                logger.debug(f"读取CAN比特率失败: {e}")
+        
+        interfaces = []
+        for ifindex, iface_name in sorted(list_can_links().items()):
+            flags = read_sysfs(iface_name, 'flags')
+            is_up = flags is not None and int(flags, 16) & IFF_UP
+            interfaces.append({
+                'name': iface_name,
+                'ifindex': ifindex,
+                'usb_address': sysfs_usb_address(iface_name),
+                'status': 'UP' if is_up else 'DOWN',
+                'bitrate': bitrates.get(ifindex)
+            })
+        return interfaces
+    
+    def find_can_interfaces_subprocess(self) -> List[Dict]:
+        """通过ip/ethtool命令查找CAN接口"""
         try:
             result = subprocess.run(['ip', '-br', 'link', 'show', 'type', 'can'], 
                                   capture_output=True, text=True)
@@ -120,12 +524,67 @@ class SimplePiperService:
             logger.error(f"查找CAN接口失败: {e}")
             return []
     
-    def configure_can_interface(self, interface_name: str) -> bool:
-        """配置CAN接口"""
+    def configure_can_interface(self, interface_name: str, can_name: Optional[str] = None,
+                                bitrate: Optional[int] = None) -> bool:
+        """
+        配置CAN接口
+        
+        Args:
+            interface_name: 当前接口名称
+            can_name: 目标名称，默认使用配置中的can_name
+            bitrate: 比特率，默认使用配置中的bitrate
+        """
+        can_name = can_name or self.config['can_name']
+        bitrate = bitrate or self.config['bitrate']
+        if self.link_backend is not None:
+            try:
+                return self.configure_can_interface_netlink(interface_name, can_name, bitrate)
+            except OSError as e:
+                logger.warning(f"rtnetlink配置失败，改用ip命令: {e}")
+        return self.configure_can_interface_subprocess(interface_name, can_name, bitrate)
+    
+    def configure_can_interface_netlink(self, interface_name: str, can_name: str, bitrate: int) -> bool:
+        """
+        通过rtnetlink配置CAN接口
+        
+        接口已是目标名称、已启动且比特率一致时直接跳过，避免无谓的down/up；
+        否则按 down -> 比特率 -> 重命名 -> up 的顺序配置
+        
+        Raises:
+            OSError: rtnetlink请求失败 (由调用方回退到命令行)
+        """
+        backend = self.link_backend
+        
+        ifindex = read_sysfs(interface_name, 'ifindex')
+        if ifindex is None:
+            logger.error(f"CAN接口不存在: {interface_name}")
+            return False
+        ifindex = int(ifindex)
+        
+        flags = read_sysfs(interface_name, 'flags')
+        is_up = flags is not None and int(flags, 16) & IFF_UP
+        if interface_name == can_name and is_up and backend.can_bitrates().get(ifindex) == bitrate:
+            logger.info(f"CAN接口 {can_name} 已按 bitrate: {bitrate} 配置，跳过")
+            return True
+        
+        logger.info(f"配置CAN接口: {interface_name} -> {can_name}, bitrate: {bitrate}")
+        backend.set_up(ifindex, False)
+        backend.set_bitrate(ifindex, bitrate)
+        
+        if interface_name != can_name:
+            try:
+                backend.rename(ifindex, can_name)
+                logger.info(f"接口已重命名: {interface_name} -> {can_name}")
+            except OSError as e:
+                logger.warning(f"重命名接口失败: {e}")
+        
+        backend.set_up(ifindex, True)
+        self.count_reconfigure(can_name)
+        return True
+    
+    def configure_can_interface_subprocess(self, interface_name: str, can_name: str, bitrate: int) -> bool:
+        """通过ip命令配置CAN接口"""
         try:
-            can_name = self.config['can_name']
-            bitrate = self.config['bitrate']
-            
             logger.info(f"配置CAN接口: {interface_name} -> {can_name}, bitrate: {bitrate}")
             
             # 停止接口
@@ -159,14 +618,61 @@ class SimplePiperService:
                                  capture_output=True)
                     logger.info(f"接口已重命名: {interface_name} -> {can_name}")
             
+            self.count_reconfigure(can_name)
             return True
             
         except Exception as e:
             logger.error(f"配置CAN接口失败: {e}")
             return False
     
-    def test_can_connection(self, can_port: str) -> bool:
-        """测试CAN连接（发送测试消息）"""
+    def probe_can_feedback(self, can_port: str) -> Dict:
+        """
+        监听CAN接口上的机械臂反馈帧
+        
+        只读不写，不向总线注入任何帧；内核按 PIPER_FEEDBACK_FILTERS 过滤，
+        其他设备的帧不会唤醒本进程
+        
+        Raises:
+            OSError: 套接字创建或绑定失败
+        """
+        sock = socket.socket(socket.AF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
+        try:
+            sock.setsockopt(socket.SOL_CAN_RAW, socket.CAN_RAW_FILTER,
+                            b''.join(CAN_FILTER.pack(can_id, mask) for can_id, mask in PIPER_FEEDBACK_FILTERS))
+            sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMP, 1)
+            sock.bind((can_port,))
+            return measure_can_feedback(sock, self.config.get('probe_window', PROBE_WINDOW),
+                                        self.config.get('probe_min_frames', PROBE_MIN_FRAMES))
+        finally:
+            sock.close()
+    
+    def test_can_connection(self, can_port: str, log_failure: bool = True) -> bool:
+        """测试CAN连接（确认能收到机械臂反馈帧）"""
+        try:
+            result = self.probe_can_feedback(can_port)
+        except (AttributeError, OSError) as e:
+            if isinstance(e, AttributeError) or e.errno == errno.EAFNOSUPPORT:
+                # 系统不支持SocketCAN套接字，退回到cansend
+                return self.test_can_connection_cansend(can_port)
+            result = {'ok': False, 'error': str(e)}
+        
+        with self.status_lock:
+            self.probe_results[can_port] = dict(result, time=time.time())
+        
+        if result['ok']:
+            logger.info(f"CAN接口 {can_port} 连接正常: 反馈 {result['rate_hz']:.0f} 帧/秒, "
+                        f"首帧 {result['first_frame_ms']:.1f} ms, "
+                        f"接收延迟 平均 {result['latency_mean_ms'] or 0:.3f} ms / 最大 {result['latency_max_ms'] or 0:.3f} ms")
+        elif log_failure:
+            if 'error' in result:
+                logger.warning(f"CAN接口 {can_port} 测试失败: {result['error']}")
+            else:
+                logger.warning(f"CAN接口 {can_port} 在 {result['elapsed_ms']:.0f} ms 内只收到 "
+                               f"{result['frames']} 帧机械臂反馈 (机械臂是否上电、线缆是否连接?)")
+        return result['ok']
+    
+    def test_can_connection_cansend(self, can_port: str) -> bool:
+        """测试CAN连接（发送测试消息，仅在不支持SocketCAN套接字时使用）"""
         try:
             # 发送CAN测试消息
             result = subprocess.run(['cansend', can_port, '123#deadbeef'], 
@@ -174,7 +680,6 @@ class SimplePiperService:
             
             if result.returncode == 0:
                 logger.info(f"CAN接口 {can_port} 连接正常")
-                self.current_can_port = can_port
                 return True
             else:
                 logger.warning(f"CAN接口 {can_port} 测试失败: {result.stderr}")
@@ -187,8 +692,86 @@ class SimplePiperService:
             logger.error(f"测试CAN连接失败: {e}")
             return False
     
+    def open_netlink_socket(self) -> Optional[socket.socket]:
+        """打开订阅链路变化的rtnetlink套接字，失败时返回None"""
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+            sock.bind((0, RTMGRP_LINK))
+            return sock
+        except (OSError, AttributeError) as e:
+            logger.warning(f"无法打开netlink套接字，改用轮询模式: {e}")
+            return None
+    
     def monitor_can_hotplug(self):
         """监控CAN热插拔"""
+        if self.netlink_socket is not None:
+            self.monitor_can_netlink()
+        else:
+            self.monitor_can_polling()
+    
+    def monitor_can_netlink(self):
+        """
+        基于netlink事件监控CAN热插拔
+        
+        内核在接口增删时立即推送RTM_NEWLINK/RTM_DELLINK，稳态下只阻塞在recv上，
+        不启动任何子进程。按ifindex跟踪CAN接口，本服务自身的up/down/重命名
+        只改变已知ifindex的状态，不会被当作插拔
+        """
+        sock = self.netlink_socket
+        known_links = list_can_links()
+        pending_deadline = None
+        next_recheck = time.monotonic() + self.config.get('check_interval', 5)
+        logger.info(f"netlink热插拔监控已启动，当前CAN接口: {sorted(known_links.values())}")
+        
+        while self.running:
+            # 先处理已到期的变化: 超时为0会让套接字变成非阻塞，recv抛出的不是socket.timeout
+            if pending_deadline is not None and time.monotonic() >= pending_deadline:
+                pending_deadline = None
+                self.handle_can_change()
+                continue
+            try:
+                if pending_deadline is None:
+                    sock.settimeout(1.0)
+                else:
+                    sock.settimeout(max(0.001, pending_deadline - time.monotonic()))
+                data = sock.recv(65536)
+            except socket.timeout:
+                if time.monotonic() >= next_recheck:
+                    self.recheck_unready_ports()
+                    next_recheck = time.monotonic() + self.config.get('check_interval', 5)
+                continue
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    # 接收缓冲区溢出丢了事件，按sysfs重新同步
+                    logger.warning("netlink事件溢出，重新扫描CAN接口")
+                    current_links = list_can_links()
+                    if current_links != known_links:
+                        known_links = current_links
+                        pending_deadline = time.monotonic() + HOTPLUG_SETTLE_TIME
+                    continue
+                if not self.running:
+                    break
+                logger.error(f"netlink接收出错: {e}")
+                time.sleep(1)
+                continue
+            
+            for msg_type, ifindex, link_type, ifname, kind in parse_link_messages(data):
+                # vcan的链路类型也是ARPHRD_CAN，按链路种类只跟踪CAN适配器
+                if msg_type == RTM_NEWLINK and link_type == ARPHRD_CAN and kind == 'can':
+                    if ifindex not in known_links:
+                        logger.info(f"检测到新的CAN接口: {ifname}")
+                        self.record_hotplug_event()
+                        pending_deadline = time.monotonic() + HOTPLUG_SETTLE_TIME
+                    known_links[ifindex] = ifname
+                elif msg_type == RTM_DELLINK and ifindex in known_links:
+                    removed = known_links.pop(ifindex)
+                    logger.info(f"检测到移除的CAN接口: {removed}")
+                    self.record_hotplug_event()
+                    self.mark_interface_removed(removed)
+                    pending_deadline = time.monotonic() + HOTPLUG_SETTLE_TIME
+    
+    def monitor_can_polling(self):
+        """轮询方式监控CAN热插拔 (netlink不可用时使用)"""
         last_interfaces = set()
         
         while self.running:
@@ -202,24 +785,64 @@ class SimplePiperService:
                 
                 if new_interfaces:
                     logger.info(f"检测到新的CAN接口: {new_interfaces}")
+                    self.record_hotplug_event()
                     self.handle_can_change()
                 
                 if removed_interfaces:
                     logger.info(f"检测到移除的CAN接口: {removed_interfaces}")
-                    if self.current_can_port in removed_interfaces:
-                        logger.warning("当前使用的CAN接口已断开")
-                        self.current_can_port = None
+                    self.record_hotplug_event()
+                    for removed in removed_interfaces:
+                        self.mark_interface_removed(removed)
                     self.handle_can_change()
                 
                 last_interfaces = current_names
+                self.recheck_unready_ports()
                 time.sleep(self.config.get('check_interval', 5))
                 
             except Exception as e:
                 logger.error(f"监控CAN热插拔出错: {e}")
                 time.sleep(5)
     
+    def record_hotplug_event(self):
+        """记录热插拔事件 (状态接口使用)"""
+        with self.status_lock:
+            self.hotplug_events += 1
+            self.last_hotplug_event = time.time()
+    
+    def count_reconfigure(self, can_name: str):
+        """记录一次实际执行的接口配置"""
+        with self.status_lock:
+            self.reconfigure_counts[can_name] = self.reconfigure_counts.get(can_name, 0) + 1
+    
+    def refresh_interfaces_cache(self):
+        """重新扫描接口并更新状态缓存"""
+        self.interfaces_cache = self.find_can_interfaces()
+    
+    def mark_interface_removed(self, interface_name: str):
+        """记录接口断开"""
+        self.interfaces_cache = [iface for iface in self.interfaces_cache
+                                 if iface['name'] != interface_name]
+        if self.current_can_port == interface_name:
+            logger.warning("当前使用的CAN接口已断开")
+            self.current_can_port = None
+        with self.arm_states_lock:
+            for state in self.arm_states.values():
+                if state['can_name'] == interface_name and state['ready']:
+                    logger.warning(f"机械臂 {interface_name} (USB: {state['usb_address']}) 的CAN接口已断开")
+                    state['ready'] = False
+    
     def handle_can_change(self):
         """处理CAN接口变化"""
+        try:
+            if self.config.get('arms'):
+                self.reconcile_arms()
+            else:
+                self.configure_single_arm()
+        finally:
+            self.refresh_interfaces_cache()
+    
+    def configure_single_arm(self):
+        """单臂模式: 按usb_address或第一个接口配置为can_name"""
         interfaces = self.find_can_interfaces()
         
         if not interfaces:
@@ -253,10 +876,125 @@ class SimplePiperService:
                 # 测试CAN连接
                 can_name = self.config['can_name']
                 if self.test_can_connection(can_name):
+                    self.current_can_port = can_name
                     logger.info("CAN服务已就绪")
                 else:
                     logger.error("CAN连接测试失败")
     
+    def recheck_unready_ports(self):
+        """
+        重新探测已配置但未收到反馈的接口
+        
+        机械臂在适配器之后才上电时不会产生热插拔事件，由监控线程定期调用；
+        探测只读套接字，不启动子进程
+        """
+        if self.config.get('arms'):
+            with self.arm_states_lock:
+                ports = [state['can_name'] for state in self.arm_states.values() if not state['ready']]
+        elif self.current_can_port is None:
+            ports = [self.config['can_name']]
+        else:
+            return
+        
+        for port in ports:
+            if read_sysfs(port, 'ifindex') is None:
+                continue
+            if not self.test_can_connection(port, log_failure=False):
+                continue
+            logger.info(f"CAN接口 {port} 已收到机械臂反馈，标记为就绪")
+            if self.config.get('arms'):
+                with self.arm_states_lock:
+                    for state in self.arm_states.values():
+                        if state['can_name'] == port:
+                            state['ready'] = True
+            else:
+                self.current_can_port = port
+    
+    def reconcile_arms(self):
+        """
+        多臂模式: 按USB地址把每个适配器配置为对应的CAN名称
+        
+        每个检测到的适配器由一个独立线程完成配置和连接测试，
+        集线器重置后所有机械臂并行恢复，而不是逐个串行等待
+        """
+        arms = self.config['arms']
+        interfaces = {iface['usb_address']: iface for iface in self.find_can_interfaces()
+                      if iface['usb_address']}
+        
+        matched = []
+        for arm in arms:
+            iface = interfaces.get(arm['usb_address'])
+            if iface is None:
+                logger.warning(f"未检测到机械臂 {arm['can_name']} 的CAN适配器 (USB: {arm['usb_address']})")
+                with self.arm_states_lock:
+                    state = self.arm_states.setdefault(arm['usb_address'], {
+                        'usb_address': arm['usb_address'], 'can_name': arm['can_name'], 'ready': False})
+                    state['ready'] = False
+                continue
+            matched.append((arm, iface))
+        
+        if not matched:
+            return
+        
+        self.release_conflicting_names([(arm['can_name'], iface) for arm, iface in matched])
+        
+        with ThreadPoolExecutor(max_workers=len(matched), thread_name_prefix='piper-arm') as executor:
+            results = list(executor.map(lambda item: self.configure_arm(*item), matched))
+        logger.info(f"多臂配置完成: {sum(results)}/{len(arms)} 台机械臂就绪")
+    
+    def release_conflicting_names(self, assignments: List):
+        """
+        释放被占用的目标名称
+        
+        重置后内核按枚举顺序分配名称，目标名称可能正被另一个适配器占用，
+        并行重命名会互相冲突。先把占用其他机械臂目标名称的接口改为临时名称
+        
+        Args:
+            assignments: [(目标名称, 接口信息)]
+        """
+        targets = {can_name for can_name, _ in assignments}
+        for index, (can_name, iface) in enumerate(assignments):
+            if iface['name'] == can_name or iface['name'] not in targets:
+                continue
+            temp_name = f"{TEMP_NAME_PREFIX}{iface.get('ifindex', index)}"
+            logger.info(f"释放接口名称: {iface['name']} -> {temp_name}")
+            if self.link_backend is not None and 'ifindex' in iface:
+                try:
+                    self.link_backend.set_up(iface['ifindex'], False)
+                    self.link_backend.rename(iface['ifindex'], temp_name)
+                    iface['name'] = temp_name
+                    continue
+                except OSError as e:
+                    logger.warning(f"rtnetlink重命名失败，改用ip命令: {e}")
+            subprocess.run(['sudo', 'ip', 'link', 'set', iface['name'], 'down'], capture_output=True)
+            result = subprocess.run(['sudo', 'ip', 'link', 'set', iface['name'], 'name', temp_name],
+                                    capture_output=True, text=True)
+            if result.returncode == 0:
+                iface['name'] = temp_name
+            else:
+                logger.warning(f"释放接口名称失败: {result.stderr}")
+    
+    def configure_arm(self, arm: Dict, iface: Dict) -> bool:
+        """单个机械臂的配置线程: 配置接口并测试连接"""
+        can_name = arm['can_name']
+        bitrate = arm.get('bitrate') or self.config['bitrate']
+        logger.info(f"机械臂 {can_name}: 使用CAN接口 {iface['name']} (USB: {iface['usb_address']})")
+        
+        ready = (self.configure_can_interface(iface['name'], can_name, bitrate)
+                 and self.test_can_connection(can_name))
+        if not ready:
+            logger.error(f"机械臂 {can_name} CAN连接测试失败")
+        
+        with self.arm_states_lock:
+            self.arm_states[arm['usb_address']] = {
+                'usb_address': arm['usb_address'],
+                'can_name': can_name,
+                'bitrate': bitrate,
+                'ready': ready,
+                'configured_at': time.time()
+            }
+        return ready
+    
     def start(self):
         """启动服务"""
         logger.info("启动Simple Piper CAN服务")
@@ -266,6 +1004,10 @@ class SimplePiperService:
         
         self.running = True
         
+        # 先订阅链路事件再做初始配置，避免两者之间的插拔被漏掉
+        if self.config.get('monitor_mode', 'netlink') == 'netlink':
+            self.netlink_socket = self.open_netlink_socket()
+        
         # 初始化CAN连接
         self.handle_can_change()
         
@@ -273,6 +1015,8 @@ class SimplePiperService:
         self.monitoring_thread = threading.Thread(target=self.monitor_can_hotplug, daemon=True)
         self.monitoring_thread.start()
         
+        self.start_status_server()
+        
         logger.info("Simple Piper CAN服务已启动")
         return True
     
@@ -284,16 +1028,91 @@ class SimplePiperService:
         if self.monitoring_thread:
             self.monitoring_thread.join(timeout=5)
         
+        if self.status_server is not None:
+            self.status_server.shutdown()
+            self.status_server.server_close()
+            self.status_server = None
+        
+        if self.netlink_socket is not None:
+            self.netlink_socket.close()
+            self.netlink_socket = None
+        
+        if self.link_backend is not None:
+            self.link_backend.close()
+            self.link_backend = None
+        
         logger.info("Simple Piper CAN服务已停止")
     
+    def start_status_server(self):
+        """在本地地址上启动状态接口 (status_port 为0时不启动)"""
+        port = self.config.get('status_port')
+        if not port:
+            return
+        address = self.config.get('status_address', '127.0.0.1')
+        try:
+            self.status_server = ThreadingHTTPServer((address, port), StatusRequestHandler)
+        except OSError as e:
+            logger.warning(f"状态接口启动失败: {e}")
+            return
+        self.status_server.daemon_threads = True
+        self.status_server.service = self
+        threading.Thread(target=self.status_server.serve_forever, daemon=True).start()
+        logger.info(f"状态接口已启动: http://{address}:{port}/status")
+    
+    def query_daemon_status(self) -> Optional[Dict]:
+        """从运行中的服务获取状态，服务未运行时返回None"""
+        port = self.config.get('status_port')
+        if not port:
+            return None
+        address = self.config.get('status_address', '127.0.0.1')
+        if address in ('0.0.0.0', ''):
+            address = '127.0.0.1'
+        try:
+            with urllib.request.urlopen(f"http://{address}:{port}/status", timeout=2) as response:
+                return json.loads(response.read())
+        except (OSError, ValueError):
+            return None
+    
     def get_status(self) -> Dict:
-        """获取服务状态"""
-        interfaces = self.find_can_interfaces()
+        """
+        获取服务状态
+        
+        运行中使用热插拔时缓存的接口列表，只实时读取sysfs计数器和一次
+        rtnetlink dump (CAN控制器状态、bus-off等错误统计)，不启动子进程
+        """
+        interfaces = self.interfaces_cache if self.running else self.find_can_interfaces()
+        
+        link_info = {}
+        if self.link_backend is not None:
+            try:
+                link_info = self.link_backend.can_link_info()
+            except OSError as e:
+                logger.debug(f"读取CAN控制器状态失败: {e}")
+        
+        can_interfaces = []
+        for iface in interfaces:
+            iface = dict(iface)
+            iface['statistics'] = read_interface_statistics(iface['name'])
+            iface.update(link_info.get(iface.get('ifindex'), {}))
+            can_interfaces.append(iface)
+        
+        with self.arm_states_lock:
+            arms = [dict(state) for state in self.arm_states.values()]
+        with self.status_lock:
+            reconfigure_counts = dict(self.reconfigure_counts)
+            probe_results = dict(self.probe_results)
+            last_hotplug_event = self.last_hotplug_event
+            hotplug_events = self.hotplug_events
         
         status = {
             'running': self.running,
-            'can_interfaces': interfaces,
+            'can_interfaces': can_interfaces,
             'current_can_port': self.current_can_port,
+            'arms': arms,
+            'last_hotplug_event': last_hotplug_event,
+            'hotplug_events': hotplug_events,
+            'reconfigure_counts': reconfigure_counts,
+            'probe_results': probe_results,
             'config': self.config
         }
         
@@ -324,7 +1143,8 @@ def main():
     signal.signal(signal.SIGTERM, signal_handler)
     
     if args.status:
-        status = service.get_status()
+        # 优先查询运行中的服务，未运行时才在本进程内扫描
+        status = service.query_daemon_status() or service.get_status()
         print(json.dumps(status, indent=2, ensure_ascii=False))
         return
     
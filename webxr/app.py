@@ -2,9 +2,17 @@ from flask import Flask, render_template, send_from_directory
 from flask_sock import Sock
 from typing import Dict, Any
 import json
+import os
 import socket
 import logging
 import ssl
+import threading
+import time
+from teleop_frame import encode_frame, iter_frames
+from latency_trace import RelayTracer
+from teleop_logging import setup_logging, RateLimitedLog, LogAggregator
+from robot_state import FeedbackChannel, FEEDBACK_RATE, socket_backlog
+from send_rate import SendRateGovernor, MIN_SEND_RATE, MAX_SEND_RATE
 # $ pip install pyopenssl
 
 # 机器狗高度控制
@@ -14,6 +22,7 @@ import ssl
 # 常量配置
 ARM_ADDRESS = ('127.0.0.1', 12345)  # 机械臂地址
 DOG_ADDRESS = ('127.0.0.1', 12346)  # 机器狗地址
+FRAME_LOG_RATE = 1.0  # 每个控制器每秒最多输出的转发日志条数
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -30,21 +39,54 @@ sock = Sock(app)
 arm_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 dog_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
+# 链路延迟追踪 (每秒输出一次各跳延迟分布)
+tracer = RelayTracer()
 
-def handle_controller_data(controller_id: str, data: Dict[str, Any]):
-    """处理控制器数据并转发到对应设备"""
-    message = {
-        'controller_id': controller_id,
-        'data': data
-    }
-    
+# 热路径日志: 逐帧日志按控制器限速，另每秒输出一行转发汇总
+frame_log = RateLimitedLog(logger, FRAME_LOG_RATE)
+frame_summary = LogAggregator(logger, "转发汇总")
+
+# 中枢模式 (--hub) 下的进程内转发器，为 None 时经 UDP 转发
+hub = None
+
+# 机器人状态反馈通道，为 None 时不向XR客户端推送
+feedback = None
+
+# 客户端发送频率协商 (UDP 为阻塞发送，只参考 CPU 占用)
+governor = SendRateGovernor()
+
+
+def forward_frame(controller_id: str, frame, recv_time: float = None):
+    """将已编码的二进制帧附加追踪尾部后转发到对应设备
+
+    Args:
+        controller_id: 控制器名称
+        frame: 单个二进制帧
+        recv_time: 收到该 WebSocket 消息的 time.monotonic()，默认取当前时刻
+    """
+    if hub is not None:
+        hub.forward(controller_id, frame, recv_time)
+        return
+    if recv_time is None:
+        recv_time = time.monotonic()
     # 右手控制器(controller2)控制机械臂，左手控制器(controller1)控制机器狗
     if controller_id == 'controller2':
-        arm_socket.sendto(json.dumps(message).encode(), ARM_ADDRESS)
-        logger.info(f"发送机械臂控制数据: {message}")
+        arm_socket.sendto(tracer.trace(controller_id, frame, recv_time), ARM_ADDRESS)
+        frame_log.info(controller_id, "发送机械臂控制数据: %d 字节", len(frame))
     elif controller_id == 'controller1':
-        dog_socket.sendto(json.dumps(message).encode(), DOG_ADDRESS)
-        logger.info(f"发送机器狗控制数据: {message}")
+        dog_socket.sendto(tracer.trace(controller_id, frame, recv_time), DOG_ADDRESS)
+        frame_log.info(controller_id, "发送机器狗控制数据: %d 字节", len(frame))
+    frame_summary.add(controller_id, len(frame))
+    frame_summary.maybe_flush()
+    trace_lines = tracer.report()
+    if trace_lines:
+        logger.info("链路延迟:\n%s", "\n".join(trace_lines))
+
+
+def handle_controller_data(controller_id: str, data: Dict[str, Any], seq: int = 0,
+                           recv_time: float = None):
+    """处理JSON格式的控制器数据，编码为二进制帧后转发到对应设备"""
+    forward_frame(controller_id, encode_frame(controller_id, data, seq), recv_time)
 
 # 路由配置
 
@@ -54,33 +96,120 @@ def index():
     return render_template('web_paint.html')
 
 
+def send_feedback(ws, send, stop_event):
+    """向单个XR客户端推送机器人状态 (每个连接一个线程)，内核发送队列有积压时跳过推送周期"""
+    try:
+        feedback.new_client().run_thread(send, stop_event, lambda: socket_backlog(ws.sock))
+    except Exception as e:
+        logger.debug("状态推送结束: %s", e)  # 连接已关闭
+
+
 @sock.route('/ws')
 def ws(ws):
+    seq = 0
+    # 推送线程和本线程都会发送，按连接加锁避免帧交错
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            ws.send(message)
+
+    stop_feedback = threading.Event()
+    if feedback is not None:
+        threading.Thread(target=send_feedback, args=(ws, send, stop_feedback), daemon=True).start()
+    client_rate = governor.register()
     try:
+        send(governor.announcement(client_rate))
         while True:
             data = ws.receive()
+            recv_time = time.monotonic()
             if not data:
                 logger.warning("WebSocket 接收到空数据")
                 continue
 
+            announcement = governor.on_message(client_rate)
+            if announcement is not None:
+                send(announcement)
+
+            # 二进制消息: 一个或多个拼接的定长帧，直接按控制器编号转发
+            if isinstance(data, (bytes, bytearray)):
+                for controller_id, frame in iter_frames(data):
+                    forward_frame(controller_id, frame, recv_time)
+                continue
+
+            # 文本消息: 旧版JSON格式回退
             msg = json.loads(data)
             if msg['type'] == 'controllers_state':
                 controller_data = msg['data']
+                seq += 1
                 if 'controller1' in controller_data:
                     handle_controller_data(
-                        'controller1', controller_data['controller1'])
+                        'controller1', controller_data['controller1'], seq, recv_time)
                 if 'controller2' in controller_data:
                     handle_controller_data(
-                        'controller2', controller_data['controller2'])
+                        'controller2', controller_data['controller2'], seq, recv_time)
     except json.JSONDecodeError as je:
         logger.error(f"JSON解析错误: {je}")
     except Exception as e:
         logger.error(f"WebSocket错误: {e}", exc_info=True)
+    finally:
+        stop_feedback.set()
+        governor.unregister(client_rate)
 
 
 if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="WebXR 控制器数据中转服务")
+    parser.add_argument("--engine", choices=['flask', 'asyncio'], default='flask',
+                        help="flask: 开发服务器 (每连接一个线程); asyncio: 单事件循环, 支持多客户端并发")
+    parser.add_argument("--host", default='0.0.0.0', help="监听地址")
+    parser.add_argument("--port", type=int, default=5000, help="监听端口")
+    parser.add_argument("--log_mode", choices=['async', 'sync'], default='async',
+                        help="async: 日志由后台线程格式化和写出; sync: 在请求线程中同步写出")
+    parser.add_argument("--hub", action='store_true',
+                        help="中枢模式: 在本进程内直接控制机械臂和机器狗，不经 UDP 转发")
+    parser.add_argument("--arm", choices=['piper', 'none'], default='piper', help="中枢模式的机械臂适配器")
+    parser.add_argument("--dog", choices=['hand', 'joystick', 'none'], default='hand',
+                        help="中枢模式的机器狗适配器")
+    parser.add_argument("--arm_rate", type=float, default=None, help="中枢模式的机械臂控制频率 (Hz)")
+    parser.add_argument("--feedback_rate", type=float, default=FEEDBACK_RATE,
+                        help="向XR客户端推送机器人状态的频率 (Hz)，0 为不推送")
+    parser.add_argument("--min_send_rate", type=float, default=MIN_SEND_RATE, help="XR客户端发送频率下限 (Hz)")
+    parser.add_argument("--max_send_rate", type=float, default=MAX_SEND_RATE,
+                        help="XR客户端发送频率上限 (Hz)，与下限相同时固定频率")
+    args = parser.parse_args()
+    setup_logging(async_mode=args.log_mode == 'async')
+    governor = SendRateGovernor(args.min_send_rate, args.max_send_rate)
+
+    if args.feedback_rate > 0:
+        feedback = FeedbackChannel(args.feedback_rate)
+
+    if args.hub:
+        import teleop_hub
+        hub = teleop_hub.build_hub(args.arm, args.dog, args.arm_rate)
+
     try:
-        app.run(ssl_context='adhoc', host='0.0.0.0', debug=True)
+        if args.engine == 'asyncio':
+            from werkzeug.serving import generate_adhoc_ssl_context
+            import relay_asyncio
+            relay_asyncio.run(ARM_ADDRESS, DOG_ADDRESS, args.host, args.port,
+                              ssl_context=generate_adhoc_ssl_context(), forwarder=hub, feedback=feedback,
+                              send_rate_range=(args.min_send_rate, args.max_send_rate))
+        else:
+            # 中枢模式下关闭自动重载，重载器的父进程会再打开一次设备
+            use_reloader = hub is None
+            if hub is not None:
+                hub.start_adapters()
+            # 开启自动重载时只在实际服务的子进程中监听状态上报，父进程先绑定会让子进程端口冲突
+            if feedback is not None and (not use_reloader or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+                feedback.listen()
+            app.run(ssl_context='adhoc', host=args.host, port=args.port, debug=True,
+                    use_reloader=use_reloader)
+    except KeyboardInterrupt:
+        pass
     finally:
+        if hub is not None:
+            hub.close()
         arm_socket.close()
-        dog_socket.close()
\ No newline at end of file
+        dog_socket.close()
@@ -1,27 +1,33 @@
 import asyncio
 import sys
 import os
-import json
 import logging
 import time
-from typing import Dict, Any
 
 # 添加 mc_sdk 路径
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "mc_sdk")))
 from py_whl import mc_sdk_py
+from teleop_frame import ControllerFrame, decode_message
+from teleop_logging import setup_logging, RateLimitedLog
+from dog_velocity_stream import VelocityStreamer, STREAM_RATE, SMOOTHING_TIME, DEADMAN_TIMEOUT
+from dog_telemetry import start_telemetry, TELEMETRY_RATE
+from robot_state import StatePublisher, dog_state
 import socket
 import subprocess
 import re
 
 SPEED_RANGE = (-0.4, 0.4)
 UDP_PORT = 12346
+STATS_INTERVAL = 5.0    # 控制帧统计输出间隔 (秒)
+MOVE_LOG_RATE = 2.0     # 每秒最多输出的移动日志条数
+MOVEMENT_INTERVAL = 0.1  # MOVEMENT_SCALE 标定时的帧间隔 (秒)，速度按实际帧间隔换算
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class DogController:
-    def __init__(self, dog_ip, local_ip="192.168.234.1", local_port=43988):
+    def __init__(self, dog_ip, local_ip="192.168.234.1", local_port=43988, stream_rate=STREAM_RATE,
+                 smoothing_time=SMOOTHING_TIME, deadman_timeout=DEADMAN_TIMEOUT, telemetry_rate=TELEMETRY_RATE):
         self.dog_ip = dog_ip
         self.local_ip = local_ip
         self.local_port = local_port
@@ -29,20 +35,48 @@ class DogController:
         self.initialized = False
         self.running = True
         self.udp_transport = None
-        self._params_lock = asyncio.Lock()
+        # 单槽"最新指令"邮箱: 新数据报直接覆盖未处理的旧帧
+        self._latest_frame = ControllerFrame()
+        self._scratch_frame = ControllerFrame()
+        self._frame_pending = False
+        self.frames_received = 0
+        self.frames_applied = 0
+        self.frames_coalesced = 0  # 未被执行就被新帧覆盖的帧数
         self.movement_position = None  # 添加运动控制位置追踪
-        self.MOVEMENT_SCALE = 5.0  # 位置变化到速度的映射系数
+        self.movement_time = None  # 上一帧的客户端时间戳
+        self.MOVEMENT_SCALE = 5.0  # 位置变化到速度的映射系数 (按 MOVEMENT_INTERVAL 帧间隔)
+        # 速度指令流: 执行周期即指令发送周期，手势信号中断时减速停止
+        self.streamer = VelocityStreamer(self._move, stream_rate, smoothing_time, deadman_timeout)
+        # 状态遥测: 机器狗初始化完成后由后台线程采样，0 表示不采样
+        self.telemetry_rate = telemetry_rate
+        self.telemetry = None
+        # 状态上报: 由中转推送给XR客户端
+        self.publisher = StatePublisher()
+        # 热路径日志: 逐帧日志限速
+        self.hot_log = RateLimitedLog(logger, MOVE_LOG_RATE)
+
+    def _move(self, vx, vy, wz):
+        self.app.move(vx, vy, wz)
+
+    def post_frame(self, data: bytes):
+        """将数据报解码到邮箱，只保留最新一帧"""
+        # 先解码到临时位置，非controller1或解析失败时不破坏邮箱中的帧
+        frame = decode_message(data, self._scratch_frame)
+        if frame.controller_id != 'controller1':
+            return
+        self._scratch_frame, self._latest_frame = self._latest_frame, frame
+        self.frames_received += 1
+        if self._frame_pending:
+            self.frames_coalesced += 1
+        self._frame_pending = True
 
     async def init_udp(self):
         class UDPProtocol(asyncio.DatagramProtocol):
             def datagram_received(self_, data, _):
                 try:
-                    message = json.loads(data.decode())
-                    if message['controller_id'] == 'controller1':
-                        asyncio.create_task(
-                            self.handle_controller(message['data']))
+                    self.post_frame(data)
                 except Exception as e:
-                    logger.error(f"数据处理错误: {e}")
+                    self.hot_log.error('frame', "数据处理错误: %s", e)
         loop = asyncio.get_running_loop()
         self.udp_transport, _ = await loop.create_datagram_endpoint(
             lambda: UDPProtocol(),
@@ -61,69 +95,112 @@ class DogController:
                 time.sleep(2)  # 等待站立完成
                 self.initialized = True
                 logger.info(f"机器狗已成功连接到 {self.dog_ip}")
+                self.telemetry = start_telemetry(self.app, self.telemetry_rate)
             except Exception as e:
                 self.initialized = False
                 logger.error(f"连接失败: {e}")
                 raise
 
-    async def _set_parameters_safe(self, vx: float, vy: float, wz: float):
-        async with self._params_lock:
-            if self.app and self.initialized:
-                self.app.move(vx, vy, wz)
-            await asyncio.sleep(0.02)
-
-    async def handle_controller(self, data: Dict[str, Any]):
+    async def handle_controller(self, frame: ControllerFrame):
         if not self.initialized:
             await self.init_robot()
-        if self._params_lock.locked():
-            return
-        buttons = data.get('buttons', [])
-        position = data.get('position', {})
 
         vx, vy, wz = 0.0, 0.0, 0.0
         
-        current_position = [
-            position.get('x', 0),
-            position.get('y', 0),
-            position.get('z', 0)
-        ]
+        current_position = frame.position
         
         # 所有控制都在按钮0按下时生效
-        if buttons and buttons[0]:
+        if frame.button(0):
             # 运动控制
             if self.movement_position is not None:
+                # 帧间隔随客户端发送频率变化，按时间戳差换算成手的速度，增益与频率无关
+                dt = frame.timestamp - self.movement_time
+                if dt <= 0:
+                    return  # 时间戳未前进 (重复或乱序帧)，保持当前目标速度
+                scale = self.MOVEMENT_SCALE * MOVEMENT_INTERVAL / dt
+                
                 # 计算位置变化
                 delta_x = current_position[0] - self.movement_position[0]
                 delta_z = current_position[2] - self.movement_position[2]
                 delta_y = current_position[1] - self.movement_position[1]
                 
                 # 映射到速度命令
-                vx = -delta_z * self.MOVEMENT_SCALE  # 前后移动（z轴变化）
-                vy = delta_y * self.MOVEMENT_SCALE   # 左右移动（y轴变化）
-                wz = -delta_x * self.MOVEMENT_SCALE  # 转向（x轴变化）
+                vx = -delta_z * scale  # 前后移动（z轴变化）
+                vy = delta_y * scale   # 左右移动（y轴变化）
+                wz = -delta_x * scale  # 转向（x轴变化）
                 
                 # 限制速度范围
                 vx = max(SPEED_RANGE[0], min(SPEED_RANGE[1], vx))
                 vy = max(SPEED_RANGE[0], min(SPEED_RANGE[1], vy))
                 wz = max(SPEED_RANGE[0], min(SPEED_RANGE[1], wz))
                 
-                logger.info(f"移动: vx={vx:.2f}m/s, vy={vy:.2f}m/s, wz={wz:.2f}rad/s")
+                self.hot_log.info('move', "移动: vx=%.2fm/s, vy=%.2fm/s, wz=%.2frad/s", vx, vy, wz)
             
-            self.movement_position = current_position
+            self.movement_position = current_position[:]
+            self.movement_time = frame.timestamp
         else:
             self.movement_position = None  # 重置位置追踪
             vx, vy, wz = 0.0, 0.0, 0.0
 
-        await self._set_parameters_safe(vx, vy, wz)
+        self.streamer.set_target(vx, vy, wz)
+
+    def log_frame_stats(self):
+        logger.info(f"控制帧统计: 接收 {self.frames_received}, 执行 {self.frames_applied}, "
+                    f"合并 {self.frames_coalesced}")
+        logger.info(self.streamer.format_stats())
+        self.streamer.reset_stats()
+        if self.telemetry is not None:
+            logger.info(self.telemetry.format_stats())
+            self.telemetry.reset_stats()
+
+    async def actuation_loop(self):
+        """固定周期执行任务: 每个周期只执行邮箱中的最新一帧，并发送一次速度指令"""
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.streamer.rate
+        next_tick = loop.time()
+        next_stats = next_tick + STATS_INTERVAL
+        while self.running:
+            if self._frame_pending:
+                self._frame_pending = False
+                frame = self._latest_frame
+                try:
+                    await self.handle_controller(frame)
+                    self.frames_applied += 1
+                except Exception as e:
+                    self.hot_log.error('actuation', "控制执行错误: %s", e)
+
+            if self.initialized:
+                trips = self.streamer.deadman_trips
+                try:
+                    self.streamer.step()
+                except Exception as e:
+                    self.hot_log.error('move', "发送速度指令错误: %s", e)
+                if self.streamer.deadman_trips != trips:
+                    logger.warning("手势信号超时，减速停止")
+                if self.publisher.due():
+                    self.publisher.publish(dog_state(self.streamer, self.telemetry))
+
+            now = loop.time()
+            if now >= next_stats:
+                self.log_frame_stats()
+                next_stats = now + STATS_INTERVAL
+
+            # 按绝对时刻调度，避免执行耗时累积造成周期漂移
+            next_tick += period
+            if next_tick < now:
+                next_tick = now
+            await asyncio.sleep(next_tick - now)
 
     async def shutdown(self):
         self.running = False
+        if self.telemetry is not None:
+            self.telemetry.stop()
         if self.udp_transport:
             self.udp_transport.close()
         if self.app and self.initialized:
             try:
                 # 停止移动
-                self.app.move(0.0, 0.0, 0.0)
+                self.streamer.stop()
                 time.sleep(1)
                 # 让机器狗进入被动模式
                 self.app.passive()
@@ -131,16 +208,28 @@ class DogController:
             except Exception as e:
                 logger.error(f"关闭时出错: {e}")
 
-    async def run(self):
+    async def run(self, listen_udp=True):
+        """listen_udp 为 False 时不监听UDP端口 (中枢模式下由中转进程投递帧)"""
         try:
-            await self.init_udp()
-            while self.running:
-                await asyncio.sleep(0.1)
+            if listen_udp:
+                await self.init_udp()
+            await self.actuation_loop()
         finally:
+            self.log_frame_stats()
             await self.shutdown()
 
 
 if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="WebXR 手势控制机器狗")
+    parser.add_argument("--stream_rate", type=float, default=STREAM_RATE, help="速度指令发送频率 (Hz)")
+    parser.add_argument("--smoothing", type=float, default=SMOOTHING_TIME, help="速度平滑时间常数 (秒)，0 为不平滑")
+    parser.add_argument("--deadman", type=float, default=DEADMAN_TIMEOUT, help="手势信号超时 (秒)，超时后减速停止")
+    parser.add_argument("--telemetry_rate", type=float, default=TELEMETRY_RATE, help="状态遥测采样频率 (Hz)，0 为不采样")
+    args = parser.parse_args()
+
+    setup_logging()
     # 机器狗网络配置
     dog_ip = '192.168.234.1'  # 机器狗IP地址
     def get_local_234_ip():
@@ -179,7 +268,9 @@ if __name__ == '__main__':
     local_ip = get_local_234_ip()  # 动态获取本机234网段IP
     local_port = 43988  # 本地端口
     
-    controller = DogController(dog_ip=dog_ip, local_ip=local_ip, local_port=local_port)
+    controller = DogController(dog_ip=dog_ip, local_ip=local_ip, local_port=local_port,
+                               stream_rate=args.stream_rate, smoothing_time=args.smoothing,
+                               deadman_timeout=args.deadman, telemetry_rate=args.telemetry_rate)
     try:
         print(f"正在连接到机器狗 ({dog_ip})...")
         print(f"本地地址: {local_ip}:{local_port}")
@@ -1,29 +1,35 @@
 import sys
 import os
-import json
 import logging
 import socket
 import subprocess
 import re
 import time
 import threading
-from typing import Dict, Any
 
 # 添加 mc_sdk 路径
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "mc_sdk")))
 from py_whl import mc_sdk_py
+from teleop_frame import ControllerFrame, decode_message
+from teleop_logging import setup_logging, RateLimitedLog
+from loop_scheduler import LoopScheduler
+from dog_velocity_stream import VelocityStreamer, STREAM_RATE, SMOOTHING_TIME, DEADMAN_TIMEOUT
+from dog_telemetry import start_telemetry, TELEMETRY_RATE
+from robot_state import StatePublisher, dog_state
 
 # --- 配置 ---
 SPEED_RANGE = (-0.4, 0.4)  # 速度映射范围
 UDP_PORT = 12346           # 监听UDP数据的端口
-COMMAND_TIMEOUT = 2.0      # 超过2秒没有收到手柄信号，则停止移动
+MOVE_LOG_RATE = 2.0        # 每秒最多输出的移动命令日志条数
+STATS_INTERVAL = 5.0       # 速度指令流统计输出间隔 (秒)
 
 # --- 日志设置 ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class DogController:
-    def __init__(self, dog_ip: str, local_ip: str, local_port: int):
+    def __init__(self, dog_ip: str, local_ip: str, local_port: int, stream_rate: float = STREAM_RATE,
+                 smoothing_time: float = SMOOTHING_TIME, deadman_timeout: float = DEADMAN_TIMEOUT,
+                 telemetry_rate: float = TELEMETRY_RATE):
         self.dog_ip = dog_ip
         self.local_ip = local_ip
         self.local_port = local_port
@@ -32,10 +38,34 @@ class DogController:
         self.running = False
         self.initialized = False
 
-        # --- 线程安全的共享状态 ---
-        self.state_lock = threading.Lock()
-        self.latest_command = {'vx': 0.0, 'wz': 0.0}
-        self.last_command_time = 0
+        # --- 速度指令流: 目标速度由UDP线程更新 (线程安全)，主循环按固定频率发送 ---
+        self.streamer = VelocityStreamer(self.app.move, stream_rate, smoothing_time, deadman_timeout)
+
+        # --- 状态遥测: 初始化完成后由后台线程采样，0 表示不采样 ---
+        self.telemetry_rate = telemetry_rate
+        self.telemetry = None
+
+        # --- 状态上报: 由中转推送给XR客户端 ---
+        self.publisher = StatePublisher()
+
+        # --- 热路径日志: 逐条日志限速 ---
+        self.hot_log = RateLimitedLog(logger, MOVE_LOG_RATE)
+        self._frame = ControllerFrame()  # 复用的数据帧，解码时原地更新
+        # 中枢模式下 flask 每个连接一个线程调用 post_frame，解码和取值须在锁内完成
+        self._frame_lock = threading.Lock()
+
+    def post_frame(self, data: bytes):
+        """
+        解码一个控制器数据报并更新目标速度 (UDP 监听线程或中枢模式调用，线程安全)。
+        """
+        with self._frame_lock:
+            frame = decode_message(data, self._frame)
+            if frame.controller_id != 'controller1':
+                return
+            # 安全地访问axes数组
+            vx_axis = frame.axis(3)
+            wz_axis = frame.axis(2)
+            self.streamer.set_target(-vx_axis * SPEED_RANGE[1], 0.0, -wz_axis * SPEED_RANGE[1])
 
     def _udp_listener(self):
         """
@@ -56,33 +86,21 @@ class DogController:
         while self.running:
             try:
                 data, _ = udp_socket.recvfrom(1024)
-                message = json.loads(data.decode())
-
-                if message.get('controller_id') == 'controller1':
-                    controller_data = message.get('data', {})
-                    axes = controller_data.get('axes', [0, 0, 0, 0])
-                    
-                    # 安全地访问axes数组
-                    vx_axis = axes[3] if len(axes) > 3 else 0
-                    wz_axis = axes[2] if len(axes) > 2 else 0
-
-                    # 更新共享状态
-                    with self.state_lock:
-                        self.latest_command['vx'] = -vx_axis * SPEED_RANGE[1]
-                        self.latest_command['wz'] = -wz_axis * SPEED_RANGE[1]
-                        self.last_command_time = time.time()
-
+                self.post_frame(data)
             except socket.timeout:
                 continue # 只是为了有机会检查 self.running
             except Exception as e:
-                logger.error(f"处理UDP数据时出错: {e}")
+                self.hot_log.error('udp', "处理UDP数据时出错: %s", e)
         
         udp_socket.close()
         logger.info("UDP监听线程已停止。")
 
-    def run(self):
+    def run(self, listen_udp: bool = True):
         """
         主控制循环。
+
+        Args:
+            listen_udp: 是否启动UDP监听线程；中枢模式下由中转进程直接调用 post_frame
         """
         try:
             # 1. 初始化机器人
@@ -90,42 +108,44 @@ class DogController:
             self.app.initRobot(self.local_ip, self.local_port, self.dog_ip)
             self.initialized = True
             logger.info("机器人初始化完成。")
+            self.telemetry = start_telemetry(self.app, self.telemetry_rate)
 
             # 2. 启动UDP监听线程
             self.running = True
-            udp_thread = threading.Thread(target=self._udp_listener, daemon=True)
-            udp_thread.start()
+            if listen_udp:
+                udp_thread = threading.Thread(target=self._udp_listener, daemon=True)
+                udp_thread.start()
             
             # 3. 让机器狗站起来
             logger.info("命令机器狗站立...")
             self.app.standUp()
             time.sleep(3) # 等待站立完成
             logger.info("机器狗已站立。等待手柄信号...")
-            self.last_command_time = time.time() # 初始化时间戳
 
-            # 4. 进入主控制循环
-            last_sent_command = {'vx': 0.0, 'wz': 0.0}
+            # 4. 进入主控制循环: 按固定频率发送平滑后的速度，手柄信号超时则减速停止
+            streamer = self.streamer
+            scheduler = LoopScheduler(streamer.rate)
+            next_stats = time.monotonic() + STATS_INTERVAL
             while self.running:
-                with self.state_lock:
-                    current_vx = self.latest_command['vx']
-                    current_wz = self.latest_command['wz']
-                    last_time = self.last_command_time
-                
-                # 检查手柄信号是否超时
-                if time.time() - last_time > COMMAND_TIMEOUT:
-                    current_vx = 0.0
-                    current_wz = 0.0
-                    if last_sent_command['vx'] != 0.0 or last_sent_command['wz'] != 0.0:
-                        logger.warning("手柄信号超时，停止移动。")
-
-                # 只有当命令变化时才发送
-                if current_vx != last_sent_command['vx'] or current_wz != last_sent_command['wz']:
-                    self.app.move(current_vx, 0.0, current_wz)
-                    last_sent_command['vx'] = current_vx
-                    last_sent_command['wz'] = current_wz
-                    logger.info(f"发送移动命令: vx={current_vx:.2f} m/s, wz={current_wz:.2f} rad/s")
-
-                time.sleep(0.1) # 控制命令发送频率
+                trips = streamer.deadman_trips
+                if streamer.step():
+                    vx, _, wz = streamer.velocity
+                    self.hot_log.info('move', "发送移动命令: vx=%.2f m/s, wz=%.2f rad/s", vx, wz)
+                if streamer.deadman_trips != trips:
+                    logger.warning("手柄信号超时，减速停止。")
+                if self.publisher.due():
+                    self.publisher.publish(dog_state(streamer, self.telemetry))
+
+                now = time.monotonic()
+                if now >= next_stats:
+                    logger.info(streamer.format_stats())
+                    streamer.reset_stats()
+                    if self.telemetry is not None:
+                        logger.info(self.telemetry.format_stats())
+                        self.telemetry.reset_stats()
+                    next_stats = now + STATS_INTERVAL
+
+                scheduler.wait()
 
         except Exception as e:
             logger.error(f"主循环遇到严重错误: {e}")
@@ -138,11 +158,13 @@ class DogController:
         """
         logger.info("正在关闭程序...")
         self.running = False
+        if self.telemetry is not None:
+            self.telemetry.stop()
         
         if self.initialized:
             try:
                 logger.info("停止移动并进入休息模式...")
-                self.app.move(0.0, 0.0, 0.0)
+                self.streamer.stop()
                 time.sleep(0.5)
                 self.app.passive() # 进入休息模式
                 time.sleep(1.0)
@@ -183,6 +205,16 @@ def get_local_234_ip() -> str:
     return default_ip
 
 if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="WebXR 摇杆控制机器狗")
+    parser.add_argument("--stream_rate", type=float, default=STREAM_RATE, help="速度指令发送频率 (Hz)")
+    parser.add_argument("--smoothing", type=float, default=SMOOTHING_TIME, help="速度平滑时间常数 (秒)，0 为不平滑")
+    parser.add_argument("--deadman", type=float, default=DEADMAN_TIMEOUT, help="手柄信号超时 (秒)，超时后减速停止")
+    parser.add_argument("--telemetry_rate", type=float, default=TELEMETRY_RATE, help="状态遥测采样频率 (Hz)，0 为不采样")
+    args = parser.parse_args()
+
+    setup_logging()
     dog_ip = '192.168.234.1'
     local_ip = get_local_234_ip()
     local_port = 43988
@@ -194,7 +226,9 @@ if __name__ == '__main__':
     print("如需修改，请编辑脚本顶部的配置变量。")
     print("-" * 50)
 
-    controller = DogController(dog_ip=dog_ip, local_ip=local_ip, local_port=local_port)
+    controller = DogController(dog_ip=dog_ip, local_ip=local_ip, local_port=local_port,
+                               stream_rate=args.stream_rate, smoothing_time=args.smoothing,
+                               deadman_timeout=args.deadman, telemetry_rate=args.telemetry_rate)
     
     try:
         controller.run()
@@ -0,0 +1,211 @@
+"""
+机器狗状态遥测采样
+
+后台线程按固定频率调用 mc_sdk_py.HighLevel 的全部状态读取接口 (姿态、机身加速度/
+角速度、世界坐标位置/速度、机身速度、电量)，写入预分配的 NumPy 环形缓冲区。
+控制程序和中转只读缓冲区，不再各自逐个调用 pybind 接口。
+
+缓冲区为结构化数组，字段名见 TELEMETRY_FIELDS (另有 time 字段为采样时刻
+time.monotonic())。环形区除了可查询的 capacity 个样本外还留有 spare 个备用槽位
+(默认与 capacity 相同)，每个样本同时写入 i 和 i + (capacity + spare) 两个位置，
+任意长度不超过 capacity 的最近窗口都是一段连续内存，latest()/window() 返回的都是
+视图，不拷贝。
+
+视图在之后至少 spare 个样本内不会被覆盖 (默认约 TELEMETRY_SECONDS 秒)，
+需要长期保存时请 .copy()。
+
+用法:
+    telemetry = TelemetrySampler(app, rate=50)
+    telemetry.start()
+    sample = telemetry.latest()          # 单个样本 (numpy.void)，sample['battery']
+    recent = telemetry.window(1.0)       # 最近 1 秒，recent['body_vel_x'].mean()
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+
+from loop_scheduler import LoopScheduler
+from teleop_logging import RateLimitedLog
+
+logger = logging.getLogger(__name__)
+
+TELEMETRY_RATE = 50.0       # 采样频率 (Hz)，0 表示不采样
+TELEMETRY_SECONDS = 10.0    # 环形缓冲区保存的时长 (秒)
+
+# (字段名, HighLevel 读取接口)
+TELEMETRY_FIELDS = (
+    ('roll', 'getRoll'),
+    ('pitch', 'getPitch'),
+    ('yaw', 'getYaw'),
+    ('body_acc_x', 'getBodyAccX'),
+    ('body_acc_y', 'getBodyAccY'),
+    ('body_acc_z', 'getBodyAccZ'),
+    ('body_gyro_x', 'getBodyGyroX'),
+    ('body_gyro_y', 'getBodyGyroY'),
+    ('body_gyro_z', 'getBodyGyroZ'),
+    ('pos_world_x', 'getPosWorldX'),
+    ('pos_world_y', 'getPosWorldY'),
+    ('pos_world_z', 'getPosWorldZ'),
+    ('world_vel_x', 'getWorldVelX'),
+    ('world_vel_y', 'getWorldVelY'),
+    ('world_vel_z', 'getWorldVelZ'),
+    ('body_vel_x', 'getBodyVelX'),
+    ('body_vel_y', 'getBodyVelY'),
+    ('body_vel_z', 'getBodyVelZ'),
+    ('battery', 'getBatteryPower'),
+)
+
+TELEMETRY_DTYPE = np.dtype([('time', np.float64)] + [(name, np.float32) for name, _ in TELEMETRY_FIELDS])
+
+
+class TelemetryRing:
+    """单写多读的环形缓冲区，最近的窗口总是连续的视图"""
+
+    def __init__(self, capacity: int, dtype=TELEMETRY_DTYPE, spare: int = None):
+        """
+        Args:
+            capacity: 可查询的最多样本数
+            dtype: 样本类型
+            spare: 备用槽位数，返回的视图在之后 spare 个样本内不会被覆盖，默认与 capacity 相同
+        """
+        if capacity <= 0:
+            raise ValueError(f"无效的缓冲区容量: {capacity}")
+        self.capacity = capacity
+        self.spare = capacity if spare is None else max(1, spare)
+        self._slots = capacity + self.spare
+        self._buffer = np.zeros(2 * self._slots, dtype=dtype)
+        self._next = 0          # 下一个写入位置 (0 ~ _slots-1)
+        self.count = 0          # 累计写入的样本数
+
+    def append(self, row: tuple):
+        """写入一个样本 (仅由采样线程调用)"""
+        index = self._next
+        self._buffer[index] = row
+        self._buffer[index + self._slots] = row
+        self._next = index + 1 if index + 1 < self._slots else 0
+        # 最后更新计数: 读者先读计数再取切片，不会看到写了一半的最新样本
+        self.count += 1
+
+    def latest(self):
+        """最近一个样本的视图，尚无样本时返回 None"""
+        count = self.count
+        if not count:
+            return None
+        return self._buffer[(count - 1) % self._slots + self._slots]
+
+    def last(self, n: int):
+        """最近 n 个样本 (按时间顺序) 的视图，n 超过已有样本数或容量时截断"""
+        count = self.count
+        n = min(n, count, self.capacity)
+        end = (count - 1) % self._slots + self._slots + 1 if count else 0
+        return self._buffer[end - n:end]
+
+
+class TelemetrySampler:
+    """后台线程按固定频率采样 HighLevel 的全部状态量"""
+
+    def __init__(self, app, rate: float = TELEMETRY_RATE, seconds: float = TELEMETRY_SECONDS):
+        """
+        Args:
+            app: mc_sdk_py.HighLevel 对象 (已 initRobot)
+            rate: 采样频率 (Hz)
+            seconds: 缓冲区保存的时长 (秒)
+        """
+        self.rate = rate
+        self.ring = TelemetryRing(max(1, int(rate * seconds)))
+        # 只解析一次绑定方法，采样时不再做属性查找
+        self._getters = [getattr(app, getter) for _, getter in TELEMETRY_FIELDS]
+        self._scheduler = LoopScheduler(rate)
+        self._stop = threading.Event()
+        self._thread = None
+        self._error_log = RateLimitedLog(logger, 0.2)
+        self.errors = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        """清空统计窗口"""
+        self.window_start_count = self.ring.count
+        self.window_start = time.monotonic()
+        self.poll_time_sum = 0.0
+        self.poll_time_max = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='telemetry', daemon=True)
+        self._thread.start()
+        logger.info(f"状态遥测采样已启动: {self.rate:g}Hz, 缓冲 {self.ring.capacity} 个样本")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+
+    def sample(self):
+        """调用一次全部读取接口并写入缓冲区"""
+        start = time.monotonic()
+        try:
+            values = [getter() for getter in self._getters]
+        except Exception as e:
+            self.errors += 1
+            self._error_log.error('sample', "状态读取失败: %s", e)
+            return
+        self.ring.append((start, *values))
+        elapsed = time.monotonic() - start
+        self.poll_time_sum += elapsed
+        if elapsed > self.poll_time_max:
+            self.poll_time_max = elapsed
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._scheduler.wait()
+
+    def latest(self):
+        """最近一个样本 (视图)，尚无样本时返回 None"""
+        return self.ring.latest()
+
+    def window(self, seconds: float):
+        """最近 seconds 秒内的样本 (视图，按时间顺序)"""
+        return self.ring.last(int(round(seconds * self.rate)))
+
+    def stats(self) -> dict:
+        """当前统计窗口的采样指标 (时间单位: 毫秒)"""
+        samples = self.ring.count - self.window_start_count
+        elapsed = time.monotonic() - self.window_start
+        return {
+            'rate_hz': samples / elapsed if elapsed >= 1.0 / self.rate else 0.0,  # 窗口不足一个周期时不计算
+            'poll_mean_ms': self.poll_time_sum / samples * 1e3 if samples else 0.0,
+            'poll_max_ms': self.poll_time_max * 1e3,
+            'errors': self.errors,
+        }
+
+    def format_stats(self) -> str:
+        """一行统计文本 (含最新的电量和机身速度)"""
+        s = self.stats()
+        line = (f"状态遥测: {s['rate_hz']:.1f}Hz, 读取耗时 平均 {s['poll_mean_ms']:.2f}ms "
+                f"最大 {s['poll_max_ms']:.2f}ms, 错误 {s['errors']}")
+        sample = self.latest()
+        if sample is not None:
+            line += (f", 电量 {sample['battery']:.0f}, 机身速度 vx={sample['body_vel_x']:.2f} "
+                     f"vy={sample['body_vel_y']:.2f}, yaw {sample['yaw']:.2f}")
+        return line
+
+
+def start_telemetry(app, rate: float = TELEMETRY_RATE):
+    """
+    创建并启动采样线程，rate 为 0 或 SDK 缺少读取接口时不采样
+
+    Returns:
+        TelemetrySampler: 已启动的采样器，未启动时返回 None
+    """
+    if rate <= 0:
+        return None
+    try:
+        sampler = TelemetrySampler(app, rate)
+    except AttributeError as e:
+        logger.warning(f"当前 mc_sdk 不支持状态读取，已关闭状态遥测: {e}")
+        return None
+    sampler.start()
+    return sampler
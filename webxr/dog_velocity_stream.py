@@ -0,0 +1,150 @@
+"""
+机器狗速度指令流
+
+两个机器狗控制程序共用的 HighLevel.move 发送策略: 按固定频率持续发送速度指令，
+而不是收到帧才发或只在变化时发。
+
+    - 平滑: 目标速度经指数平滑 (时间常数可配置) 后再发送
+    - 看门狗 (deadman): 超过 deadman_timeout 没有新的目标速度，目标视为零，
+      并按 ramp_down 限定的减速度线性减到零，而不是直接发零；减到零后发送一次零速度
+      并暂停发送，直到收到新的目标
+    - 统计: 实际发送频率、发送时目标速度的陈旧度 (距最近一次更新的时间)、看门狗触发次数
+
+用法:
+    streamer = VelocityStreamer(app.move, rate=50)
+    scheduler = LoopScheduler(streamer.rate)
+    while running:
+        streamer.set_target(vx, vy, wz)   # 收到控制帧时 (任意线程)
+        streamer.step()                   # 每个周期调用一次
+        scheduler.wait()
+"""
+
+import math
+import threading
+import time
+
+STREAM_RATE = 50.0          # 指令发送频率 (Hz)
+SMOOTHING_TIME = 0.08       # 速度指数平滑时间常数 (秒)，0 表示不平滑
+DEADMAN_TIMEOUT = 0.3       # 超过该时间没有新目标则减速停止 (秒)
+RAMP_DOWN = 2.0             # 看门狗触发后的减速度 (m/s², rad/s²)
+SNAP_THRESHOLD = 1e-3      # 平滑后与目标相差小于该值时直接取目标，避免无限逼近零
+
+
+class VelocityStreamer:
+    """按固定频率发送平滑后的速度指令，带看门狗减速停止"""
+
+    def __init__(self, move, rate=STREAM_RATE, smoothing_time=SMOOTHING_TIME,
+                 deadman_timeout=DEADMAN_TIMEOUT, ramp_down=RAMP_DOWN, clock=time.monotonic):
+        """
+        Args:
+            move: 速度指令函数 move(vx, vy, wz)，如 mc_sdk_py.HighLevel().move
+            rate: 指令发送频率 (Hz)
+            smoothing_time: 指数平滑时间常数 (秒)
+            deadman_timeout: 看门狗超时 (秒)
+            ramp_down: 看门狗触发后的减速度
+            clock: 时钟函数 (秒)
+        """
+        if rate <= 0:
+            raise ValueError(f"无效的指令频率: {rate}")
+        self.move = move
+        self.rate = rate
+        self.smoothing_time = smoothing_time
+        self.deadman_timeout = deadman_timeout
+        self.ramp_down = ramp_down
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._target = (0.0, 0.0, 0.0)
+        self._target_time = None        # 最近一次 set_target 的时刻
+        self.velocity = [0.0, 0.0, 0.0]  # 最近一次发送的速度
+        self._last_step = None
+        self.deadman_active = True      # 启动时没有目标，视为已停止
+        self.deadman_trips = 0          # 累计看门狗触发次数
+        self.reset_stats()
+
+    def reset_stats(self):
+        """清空统计窗口 (看门狗触发总数不清零)"""
+        self.window_start = self._clock()
+        self.window_commands = 0
+        self.window_trips = 0
+        self.window_tracking = 0        # 跟随目标 (未触发看门狗) 时发送的指令数
+        self.staleness_sum = 0.0
+        self.staleness_max = 0.0
+
+    def set_target(self, vx: float, vy: float, wz: float):
+        """更新目标速度 (线程安全)"""
+        with self._lock:
+            self._target = (vx, vy, wz)
+            self._target_time = self._clock()
+
+    def stop(self):
+        """立即清零目标和当前速度并发送零速度 (退出时使用)"""
+        with self._lock:
+            self._target = (0.0, 0.0, 0.0)
+            self._target_time = None
+        self.velocity = [0.0, 0.0, 0.0]
+        self.deadman_active = True
+        self.move(0.0, 0.0, 0.0)
+
+    def step(self):
+        """
+        计算并发送本周期的速度指令
+
+        Returns:
+            bool: 本周期是否发送了指令 (看门狗停止后不再发送)
+        """
+        now = self._clock()
+        dt = now - self._last_step if self._last_step is not None else 1.0 / self.rate
+        self._last_step = now
+        with self._lock:
+            target, target_time = self._target, self._target_time
+
+        staleness = now - target_time if target_time is not None else math.inf
+        velocity = self.velocity
+        if staleness > self.deadman_timeout:
+            if not self.deadman_active:
+                self.deadman_active = True
+                self.deadman_trips += 1
+                self.window_trips += 1
+            if not any(velocity):
+                return False
+            # 按减速度线性减到零
+            max_delta = self.ramp_down * dt
+            for i, v in enumerate(velocity):
+                velocity[i] = max(v - max_delta, 0.0) if v > 0 else min(v + max_delta, 0.0)
+        else:
+            self.deadman_active = False
+            alpha = 1.0 - math.exp(-dt / self.smoothing_time) if self.smoothing_time > 0 else 1.0
+            for i, (v, t) in enumerate(zip(velocity, target)):
+                v += alpha * (t - v)
+                velocity[i] = t if abs(t - v) < SNAP_THRESHOLD else v
+            self.window_tracking += 1
+            self.staleness_sum += staleness
+            if staleness > self.staleness_max:
+                self.staleness_max = staleness
+
+        self.move(velocity[0], velocity[1], velocity[2])
+        self.window_commands += 1
+        return True
+
+    def stats(self) -> dict:
+        """当前统计窗口的发送指标 (时间单位: 毫秒)"""
+        elapsed = self._clock() - self.window_start
+        tracking = self.window_tracking
+        return {
+            'rate_hz': self.window_commands / elapsed if elapsed > 0 else 0.0,
+            'commands': self.window_commands,
+            'staleness_mean_ms': self.staleness_sum / tracking * 1e3 if tracking else 0.0,
+            'staleness_max_ms': self.staleness_max * 1e3,
+            'deadman_trips': self.window_trips,
+            'total_deadman_trips': self.deadman_trips,
+            'deadman_active': self.deadman_active,
+        }
+
+    def format_stats(self) -> str:
+        """一行统计文本"""
+        s = self.stats()
+        state = "看门狗停止" if s['deadman_active'] else "跟随"
+        return (f"速度指令流 [{state}]: {s['rate_hz']:.1f}Hz, 陈旧度 平均 {s['staleness_mean_ms']:.1f}ms "
+                f"最大 {s['staleness_max_ms']:.1f}ms, 看门狗触发 {s['deadman_trips']} "
+                f"(累计 {s['total_deadman_trips']}), "
+                f"当前 vx={self.velocity[0]:.2f} vy={self.velocity[1]:.2f} wz={self.velocity[2]:.2f}")
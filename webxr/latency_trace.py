@@ -0,0 +1,220 @@
+"""
+遥操作链路延迟追踪
+
+浏览器 → /ws → 中转 → UDP → 控制程序 → CAN 命令，每一跳记录一个时间戳:
+
+    客户端采样      帧内 timestamp 字段 (浏览器墙钟)
+    中转接收        中转收到 WebSocket 消息时的 time.monotonic()
+    中转发送        中转调用 sendto 前的 time.monotonic()
+    控制程序取帧    控制循环从 UDP 套接字取出该帧时的 time.monotonic()
+    命令发出        send_commands 返回时的 time.monotonic()
+
+中转的两个时刻和按控制器递增的追踪编号写在 UDP 数据报末尾的追踪尾部
+(teleop_frame.TRACE_STRUCT)。中转和控制程序在同一台机器上时 CLOCK_MONOTONIC
+跨进程可比，可以直接相减；涉及浏览器墙钟的跳包含头显与本机的时钟偏差，
+未做时间同步时只看分布和抖动。
+
+统计量都很轻: 每个直方图是一个定长计数数组 (对数分桶)，每次记录 O(1)。
+"""
+
+import math
+import threading
+import time
+
+from teleop_frame import append_trace, frame_header
+
+TRACE_INTERVAL = 1.0            # 统计输出间隔 (秒)
+
+# 直方图范围和分辨率: 10us ~ 10s，每个数量级 20 个桶 (相邻桶约差 12%)
+HISTOGRAM_MIN = 1e-5
+HISTOGRAM_MAX = 10.0
+BUCKETS_PER_DECADE = 20
+
+# 序列号回退超过该距离视为发送端重启，而不是乱序
+REORDER_WINDOW = 1024
+
+HOP_LABELS = {
+    'client_to_relay': '客户端→中转 (含时钟偏差)',
+    'client_interval': '客户端发送间隔',
+    'relay': '中转处理',
+    'relay_to_loop': '中转→取帧 (UDP+等待周期)',
+    'loop': '取帧→命令发出',
+    'relay_to_command': '中转接收→命令发出',
+    'client_to_command': '客户端采样→命令发出 (含时钟偏差)',
+}
+
+
+class LatencyHistogram:
+    """对数分桶延迟直方图"""
+
+    def __init__(self, min_value=HISTOGRAM_MIN, max_value=HISTOGRAM_MAX,
+                 buckets_per_decade=BUCKETS_PER_DECADE):
+        self.min_value = min_value
+        self.buckets_per_decade = buckets_per_decade
+        self.bucket_count = math.ceil(math.log10(max_value / min_value) * buckets_per_decade) + 1
+        self.counts = [0] * self.bucket_count
+        self.count = 0
+        self.max = 0.0
+
+    def reset(self):
+        self.counts = [0] * self.bucket_count
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, value: float):
+        """记录一个样本 (秒)，小于下限的计入第一个桶，超过上限的计入最后一个桶"""
+        if value > self.min_value:
+            index = min(int(math.log10(value / self.min_value) * self.buckets_per_decade) + 1,
+                        self.bucket_count - 1)
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """q 分位数 (秒)，取所在桶的上边界"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                return min(self.min_value * 10 ** (index / self.buckets_per_decade), self.max)
+        return self.max
+
+
+class SequenceTracker:
+    """按序列号统计丢失、乱序和重复 (uint32 回绕)"""
+
+    def __init__(self):
+        self.last = None
+        self.received = 0
+        self.dropped = 0
+        self.reordered = 0
+        self.duplicated = 0
+        self.restarts = 0
+
+    def reset_stats(self):
+        self.received = self.dropped = self.reordered = self.duplicated = self.restarts = 0
+
+    def observe(self, seq: int, skipped: int = 0):
+        """
+        Args:
+            seq: 本次收到的序列号
+            skipped: 已知在本次之前被接收端主动跳过的帧数 (如同一周期内被合并的帧)，
+                     不计入丢失
+        """
+        self.received += 1
+        if self.last is None:
+            self.last = seq
+            return
+        distance = (seq - self.last) & 0xFFFFFFFF
+        if distance == 0:
+            self.duplicated += 1
+        elif distance < 0x80000000:
+            self.dropped += max(0, distance - 1 - skipped)
+            self.last = seq
+        elif 0x100000000 - distance <= REORDER_WINDOW:
+            # 迟到的帧: 之前按丢失计数，这里补回
+            self.reordered += 1
+            self.dropped = max(0, self.dropped - 1)
+        else:
+            self.restarts += 1
+            self.last = seq
+
+
+class TraceStats:
+    """一组按跳命名的延迟直方图和序列号统计"""
+
+    def __init__(self, hops):
+        self.histograms = {hop: LatencyHistogram() for hop in hops}
+        self.sequences = {}
+
+    def record(self, hop: str, seconds: float):
+        self.histograms[hop].record(seconds)
+
+    def observe(self, stream: str, seq: int, skipped: int = 0):
+        tracker = self.sequences.get(stream)
+        if tracker is None:
+            tracker = self.sequences[stream] = SequenceTracker()
+        tracker.observe(seq, skipped)
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+        for tracker in self.sequences.values():
+            tracker.reset_stats()
+
+    def format_lines(self, indent: str = '  '):
+        """每跳一行 p50/p95/p99/最大 (毫秒)，每个序列一行丢失/乱序统计"""
+        lines = []
+        for hop, histogram in self.histograms.items():
+            if not histogram.count:
+                continue
+            lines.append(
+                f"{indent}{HOP_LABELS.get(hop, hop)}: n={histogram.count} "
+                f"p50 {histogram.percentile(50) * 1e3:.2f} p95 {histogram.percentile(95) * 1e3:.2f} "
+                f"p99 {histogram.percentile(99) * 1e3:.2f} 最大 {histogram.max * 1e3:.2f} ms")
+        for stream, tracker in sorted(self.sequences.items()):
+            if not tracker.received:
+                continue
+            line = (f"{indent}{stream}: 收到 {tracker.received}, 丢失 {tracker.dropped}, "
+                    f"乱序 {tracker.reordered}, 重复 {tracker.duplicated}")
+            if tracker.restarts:
+                line += f", 重启 {tracker.restarts}"
+            lines.append(line)
+        return lines
+
+
+class RelayTracer:
+    """中转端追踪: 分配追踪编号、附加追踪尾部并统计客户端和中转两跳
+
+    flask 模式下多个连接线程共享同一个实例，统计更新加锁。
+    """
+
+    def __init__(self, interval: float = TRACE_INTERVAL):
+        self.interval = interval
+        self.stats = TraceStats(('client_to_relay', 'client_interval', 'relay'))
+        self._trace_ids = {}
+        self._last_client_timestamp = {}
+        self._lock = threading.Lock()
+        self._last_report = time.monotonic()
+
+    def trace(self, controller_id: str, frame, recv_time: float) -> bytes:
+        """
+        Args:
+            controller_id: 控制器名称
+            frame: 单个二进制帧
+            recv_time: 收到该 WebSocket 消息的 time.monotonic()
+
+        Returns:
+            bytes: 附加了追踪尾部的 UDP 数据报
+        """
+        seq, timestamp = frame_header(frame)
+        with self._lock:
+            trace_id = self._trace_ids.get(controller_id, 0) + 1 & 0xFFFFFFFF
+            self._trace_ids[controller_id] = trace_id
+            stats = self.stats
+            stats.observe(f"{controller_id} 客户端序列号", seq)
+            stats.record('client_to_relay', time.time() - timestamp)
+            last_timestamp = self._last_client_timestamp.get(controller_id)
+            if last_timestamp is not None and timestamp > last_timestamp:
+                stats.record('client_interval', timestamp - last_timestamp)
+            self._last_client_timestamp[controller_id] = timestamp
+            send_time = time.monotonic()
+            stats.record('relay', send_time - recv_time)
+        return append_trace(frame, trace_id, recv_time, send_time)
+
+    def report(self):
+        """到达输出间隔时返回统计行并清空窗口，否则返回 None"""
+        now = time.monotonic()
+        if now - self._last_report < self.interval:
+            return None
+        with self._lock:
+            self._last_report = now
+            lines = self.stats.format_lines()
+            self.stats.reset()
+        return lines
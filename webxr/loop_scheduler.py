@@ -0,0 +1,85 @@
+"""
+固定频率控制循环调度器
+
+按绝对截止时刻 (而不是 "处理完再 sleep 固定时长") 调度每个周期，
+处理耗时不会累积成周期漂移；同时统计超时次数和周期抖动。
+"""
+
+import time
+
+
+class LoopScheduler:
+    """绝对截止时刻调度器
+
+    用法:
+        scheduler = LoopScheduler(200)
+        while running:
+            do_work()
+            scheduler.wait()
+    """
+
+    def __init__(self, rate_hz: float, clock=time.perf_counter, sleep=time.sleep):
+        if rate_hz <= 0:
+            raise ValueError(f"无效的控制频率: {rate_hz}")
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self._clock = clock
+        self._sleep = sleep
+        self.next_deadline = None
+        self.last_tick = None
+        self.ticks = 0
+        self.overruns = 0          # 累计超时 (错过截止时刻) 次数
+        self.reset_stats()
+
+    def reset_stats(self):
+        """清空统计窗口 (超时总数不清零)"""
+        self.window_start = self.last_tick
+        self.window_ticks = 0
+        self.window_overruns = 0
+        self.jitter_sum = 0.0
+        self.jitter_max = 0.0
+
+    def wait(self):
+        """等待到下一个周期的截止时刻
+
+        Returns:
+            float: 本周期开始的时刻
+        """
+        now = self._clock()
+        if self.next_deadline is None:
+            self.next_deadline = now
+        self.next_deadline += self.period
+
+        remaining = self.next_deadline - now
+        if remaining > 0:
+            self._sleep(remaining)
+        elif -remaining >= self.period:
+            # 错过了整个周期: 记录超时并重新对齐，不做补偿性的连续快速执行
+            self.overruns += 1
+            self.window_overruns += 1
+            self.next_deadline = now
+
+        tick = self._clock()
+        if self.window_start is None:
+            self.window_start = tick
+        if self.last_tick is not None:
+            jitter = abs((tick - self.last_tick) - self.period)
+            self.jitter_sum += jitter
+            if jitter > self.jitter_max:
+                self.jitter_max = jitter
+            self.window_ticks += 1
+        self.last_tick = tick
+        self.ticks += 1
+        return tick
+
+    def stats(self) -> dict:
+        """当前统计窗口的调度指标 (时间单位: 毫秒)"""
+        ticks = self.window_ticks
+        elapsed = self.last_tick - self.window_start if ticks else 0.0
+        return {
+            'rate_hz': ticks / elapsed if elapsed > 0 else 0.0,
+            'overruns': self.window_overruns,
+            'total_overruns': self.overruns,
+            'jitter_mean_ms': self.jitter_sum / ticks * 1e3 if ticks else 0.0,
+            'jitter_max_ms': self.jitter_max * 1e3,
+        }
@@ -3,8 +3,11 @@
 
 import time
 import socket
-import json
-from piper_sdk import C_PiperInterface_V2
+from teleop_frame import ControllerFrame, decode_message, read_trace
+from loop_scheduler import LoopScheduler
+from latency_trace import TraceStats
+from robot_state import StatePublisher
+from target_interpolator import TargetInterpolator, LOOKAHEAD, RESTART_GAP
 
 # ================================
 # 常量配置
@@ -14,6 +17,7 @@ ROTATION_SCALE = 40
 AXIS_MAPPING = {'X': -1, 'Y': -1, 'Z': 1}
 UDP_PORT = 12345
 FACTOR = 1000
+CONTROL_RATE = 200          # 控制循环频率 (Hz)
 
 # 校准和限制参数
 CALIBRATION_FRAMES = 10
@@ -23,6 +27,11 @@ MAX_SINGLE_ROTATE = 2000    # 最大单次旋转量 (度/1000)
 # 初始位置
 INITIAL_POSITION = [150.0, 0.0, 200.0, 0.0, 90.0, 0.0, 500.0]
 
+# CAN命令去重参数
+MOTION_MODE = (0x01, 0x00, 100, 0x00)  # MotionCtrl_2 参数: CAN控制, 位置速度模式, 速度100%
+MODE_KEEPALIVE = 1.0        # 模式未变化时 MotionCtrl_2 的重发间隔 (秒)
+COMMAND_KEEPALIVE = 0.1     # 目标未变化时 EndPoseCtrl/GripperCtrl 的重发间隔 (秒)
+
 # ================================
 # 全局状态管理
 # ================================
@@ -32,6 +41,63 @@ button_states = {
     'emergency_stop': False    # 急停状态
 }
 
+# MAX_SINGLE_MOVE/MAX_SINGLE_ROTATE 限幅触发次数 (按轴累计，打印状态后清零)
+clamp_counts = {
+    'move': 0,
+    'rotate': 0
+}
+
+
+class CommandCache:
+    """CAN命令去重缓存
+    
+    记录每类命令上次发送的参数和时间，参数未变化且未到重发间隔时跳过发送，
+    减少共享CAN总线上的重复帧。
+    """
+    
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._last = {}
+        self.sent = {}
+        self.skipped = {}
+    
+    def invalidate(self):
+        """清空缓存，下次调用时所有命令都会重新发送 (急停/恢复/回初始位置后使用)"""
+        self._last.clear()
+    
+    def send(self, name, command, args, keepalive):
+        """参数变化或超过重发间隔时才发送命令
+        
+        Args:
+            name: 命令类别名称
+            command: 机械臂接口方法
+            args: 命令参数元组
+            keepalive: 参数未变化时的重发间隔 (秒)
+            
+        Returns:
+            bool: 是否实际发送
+        """
+        now = self._clock()
+        last = self._last.get(name)
+        if last is not None and last[0] == args and now - last[1] < keepalive:
+            self.skipped[name] = self.skipped.get(name, 0) + 1
+            return False
+        command(*args)
+        self._last[name] = (args, now)
+        self.sent[name] = self.sent.get(name, 0) + 1
+        return True
+    
+    def pop_stats(self):
+        """返回并清空发送/跳过计数"""
+        stats = {name: (self.sent.get(name, 0), self.skipped.get(name, 0))
+                 for name in set(self.sent) | set(self.skipped)}
+        self.sent.clear()
+        self.skipped.clear()
+        return stats
+
+
+command_cache = CommandCache()
+
 # ================================
 # 机械臂控制函数
 # ================================
@@ -42,6 +108,8 @@ def init_piper():
     Returns:
         C_PiperInterface_V2: 机械臂接口对象
     """
+    from piper_sdk import C_PiperInterface_V2
+    
     print("正在连接Piper机械臂...")
     piper = C_PiperInterface_V2("can1")
     piper.ConnectPort()
@@ -90,6 +158,7 @@ def recover_piper(piper):
     try:
         # 执行恢复命令
         piper.MotionCtrl_1(0x02, 0, 0)      # 恢复
+        command_cache.invalidate()
         
         # 重新使能机械臂
         enable_count = 0
@@ -119,6 +188,7 @@ def stop_piper(piper):
     print("正在停止机械臂...")
     try:
         piper.MotionCtrl_1(0x01, 0, 0)  # 急停
+        command_cache.invalidate()
         print("机械臂已停止")
         return True
     except Exception as e:
@@ -138,9 +208,10 @@ def go_to_initial_position(piper, target_pos):
     """
     print("正在回到初始位置...")
     try:
-        piper.MotionCtrl_2(0x01, 0x00, 100, 0x00)
+        piper.MotionCtrl_2(*MOTION_MODE)
         piper.EndPoseCtrl(*[int(x * FACTOR) for x in INITIAL_POSITION[:6]])
         piper.GripperCtrl(500, 1000, 0x01, 0)
+        command_cache.invalidate()
         
         # 更新目标位置
         target_pos[:] = INITIAL_POSITION[:]
@@ -162,11 +233,33 @@ def setup_udp():
     """
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.bind(('127.0.0.1', UDP_PORT))
-    sock.settimeout(0.001)
+    sock.setblocking(False)
     print(f"UDP服务器启动，监听端口{UDP_PORT}...")
     return sock
 
 
+def drain_udp(sock):
+    """非阻塞读取所有待处理的数据报，只保留最新的一个
+    
+    Args:
+        sock: 非阻塞UDP套接字
+        
+    Returns:
+        tuple: (最新数据报或None, 本次读取的数据报数量)
+    """
+    latest = None
+    count = 0
+    while True:
+        try:
+            latest, _ = sock.recvfrom(1024)
+        except (BlockingIOError, InterruptedError):
+            break
+        except ConnectionResetError:
+            continue  # Windows下ICMP不可达会触发，忽略
+        count += 1
+    return latest, count
+
+
 # ================================
 # 运动控制函数
 # ================================
@@ -239,6 +332,9 @@ def update_rotation(target_pos, rotation, last_rotation=None, calibration_mode=F
 def send_commands(piper, target_pos, last_sent_pos=None):
     """发送控制命令到机械臂
     
+    模式只在变化或超过 MODE_KEEPALIVE 时重发；位姿和夹爪只在量化后的整数值
+    变化或超过 COMMAND_KEEPALIVE 时重发。
+    
     Args:
         piper: 机械臂接口对象
         target_pos: 目标位置数组
@@ -255,12 +351,14 @@ def send_commands(piper, target_pos, last_sent_pos=None):
         for i in range(3):
             delta = target_pos[i] - last_sent_pos[i]
             if abs(delta) > MAX_SINGLE_MOVE:
+                clamp_counts['move'] += 1
                 limited_pos[i] = last_sent_pos[i] + (MAX_SINGLE_MOVE if delta > 0 else -MAX_SINGLE_MOVE)
         
         # 限制旋转移动量 (RX, RY, RZ)
         for i in range(3, 6):
             delta = target_pos[i] - last_sent_pos[i]
             if abs(delta) > MAX_SINGLE_ROTATE:
+                clamp_counts['rotate'] += 1
                 limited_pos[i] = last_sent_pos[i] + (MAX_SINGLE_ROTATE if delta > 0 else -MAX_SINGLE_ROTATE)
         
         # 使用限制后的位置
@@ -269,9 +367,9 @@ def send_commands(piper, target_pos, last_sent_pos=None):
     # 转换为整数值并发送命令
     coords = [round(pos * FACTOR) for pos in target_pos]
     
-    piper.MotionCtrl_2(0x01, 0x00, 100, 0x00)
-    piper.EndPoseCtrl(*coords[:6])
-    piper.GripperCtrl(abs(coords[6]), 1000, 0x01, 0)
+    command_cache.send('mode', piper.MotionCtrl_2, MOTION_MODE, MODE_KEEPALIVE)
+    command_cache.send('pose', piper.EndPoseCtrl, tuple(coords[:6]), COMMAND_KEEPALIVE)
+    command_cache.send('gripper', piper.GripperCtrl, (abs(coords[6]), 1000, 0x01, 0), COMMAND_KEEPALIVE)
     
     # 返回实际发送的位置用于下次比较
     return [pos for pos in target_pos]
@@ -280,32 +378,32 @@ def send_commands(piper, target_pos, last_sent_pos=None):
 # 控制器输入处理函数
 # ================================
 
-def control_gripper(target_pos, controller_data):
+def control_gripper(target_pos, frame):
     """控制夹爪
     
     Args:
         target_pos: 目标位置数组
-        controller_data: 控制器数据
+        frame: 控制器数据帧 (ControllerFrame)
     """
-    if 'buttons' in controller_data and len(controller_data['buttons']) > 0:
+    if frame.button_count > 0:
         # 按钮0: 夹爪控制 (按下=关闭, 释放=打开)
-        target_pos[6] = 0 if controller_data['buttons'][0] else 50
+        target_pos[6] = 0 if frame.button(0) else 50
 
 
-def control_buttons(piper, target_pos, controller_data):
+def control_buttons(piper, target_pos, frame):
     """控制其他按钮功能
     
     Args:
         piper: 机械臂接口对象
         target_pos: 目标位置数组
-        controller_data: 控制器数据
+        frame: 控制器数据帧 (ControllerFrame)
     """
     global button_states
     
-    if 'buttons' not in controller_data or len(controller_data['buttons']) < 4:
+    if frame.button_count < 4:
         return
     
-    buttons = controller_data['buttons']
+    buttons = [frame.button(i) for i in range(4)]
     
     # 按钮1：回初始位置
     if buttons[1] and not button_states['button1_pressed']:
@@ -354,105 +452,267 @@ def control_buttons(piper, target_pos, controller_data):
         button_states['button3_pressed'] = False
 
 # ================================
-# 主程序
+# 控制循环
 # ================================
 
-def main():
-    """主程序入口"""
-    # 初始化组件
-    print("=" * 50)
-    print("WebXR Piper机械臂控制系统启动")
-    print("=" * 50)
+class TeleopState:
+    """控制循环状态: 目标位姿、上一帧控制器位姿、校准进度和上次发送的位置"""
     
-    piper = init_piper()
-    udp_socket = setup_udp()
+    def __init__(self, interpolator=None):
+        """
+        Args:
+            interpolator: 目标位姿插值器 (TargetInterpolator)，为 None 时直接发送目标位姿
+        """
+        self.target_position = INITIAL_POSITION[:]
+        self.interpolator = interpolator
+        self.last_controller_position = None
+        self.last_controller_rotation = None
+        self.calibration_counter = 0
+        self.last_sent_position = None
+        self.frame = ControllerFrame()  # 复用的数据帧，解码时原地更新
+    
+    @property
+    def calibrating(self):
+        return self.calibration_counter < CALIBRATION_FRAMES
+    
+    def command_position(self):
+        """本周期要发送的位姿: 插值设定点 + 夹爪目标 (不插值时即目标位姿)"""
+        if self.interpolator is None:
+            return self.target_position
+        return self.interpolator.setpoint() + self.target_position[6:]
+
+
+def handle_message(piper, state, data, sample_time=None):
+    """处理一个控制器数据报 (只处理controller2的数据)
+    
+    Args:
+        piper: 机械臂接口对象
+        state: 控制循环状态 (TeleopState)
+        data: UDP数据报
+        sample_time: 该帧的时间戳 (与插值器时钟同源，如中转接收时刻)，默认为当前时刻
+        
+    Returns:
+        bool: 是否为controller2的数据
+        
+    Raises:
+        ValueError, KeyError: 数据无法解析
+    """
+    frame = state.frame
+    if decode_message(data, frame).controller_id != 'controller2':
+        return False
+    
+    # 提取当前位置和姿态 (复制一份，帧对象会被下一次解码覆盖)
+    current_position = frame.position[:]
+    rotation = frame.rotation[:]
+    
+    # 检查是否在校准模式
+    is_calibrating = state.calibrating
+    
+    if is_calibrating:
+        state.calibration_counter += 1
+        print(f"校准中... ({state.calibration_counter}/{CALIBRATION_FRAMES})")
+    
+    # 更新位置和姿态
+    state.last_controller_position = update_position(
+        state.target_position, current_position, state.last_controller_position, is_calibrating
+    )
+    state.last_controller_rotation = update_rotation(
+        state.target_position, rotation, state.last_controller_rotation, is_calibrating
+    )
+    pose = state.target_position[:6]
+    
+    # 只在非校准模式下控制夹爪和按钮
+    if not is_calibrating:
+        control_gripper(state.target_position, frame)
+        control_buttons(piper, state.target_position, frame)
     
+    if state.interpolator is not None:
+        if state.target_position[:6] != pose:
+            # 按钮回初始位置: 机械臂已直接跳到新目标，插值器跟着跳变
+            state.interpolator.reset(state.target_position[:6])
+        else:
+            state.interpolator.add_sample(pose, sample_time)
+    return True
+
+
+def record_trace(trace_stats, trace, client_timestamp, pickup_time, coalesced):
+    """记录一个已处理帧在中转和控制循环各跳的延迟
+    
+    Args:
+        trace_stats: 延迟统计 (TraceStats)
+        trace: read_trace 返回的 (追踪编号, 中转接收时刻, 中转发送时刻)
+        client_timestamp: 帧内的客户端时间戳 (墙钟)
+        pickup_time: 控制循环取出该帧的 time.monotonic()
+        coalesced: 同一周期内被该帧覆盖的帧数 (不计入丢失)
+    """
+    trace_id, relay_recv_time, relay_send_time = trace
+    command_time = time.monotonic()
+    trace_stats.observe('中转追踪编号', trace_id, coalesced)
+    trace_stats.record('relay_to_loop', pickup_time - relay_send_time)
+    trace_stats.record('loop', command_time - pickup_time)
+    trace_stats.record('relay_to_command', command_time - relay_recv_time)
+    trace_stats.record('client_to_command', time.time() - client_timestamp)
+
+
+def arm_state(piper, state):
+    """机械臂上报给中转的状态字段 (末端位姿取反馈值，单位 mm/度)
+    
+    Args:
+        piper: 机械臂接口对象
+        state: 控制循环状态 (TeleopState)
+        
+    Returns:
+        dict: 字段名 -> 数值，见 robot_state.STATE_FIELDS
+    """
+    end_pose = piper.GetArmEndPoseMsgs().end_pose
+    return {
+        'arm_x': end_pose.X_axis / FACTOR,
+        'arm_y': end_pose.Y_axis / FACTOR,
+        'arm_z': end_pose.Z_axis / FACTOR,
+        'arm_rx': end_pose.RX_axis / FACTOR,
+        'arm_ry': end_pose.RY_axis / FACTOR,
+        'arm_rz': end_pose.RZ_axis / FACTOR,
+        'arm_gripper': state.target_position[6],
+        'arm_estop': button_states['emergency_stop'],
+        'arm_calibrating': state.calibrating,
+    }
+
+
+def control_loop(piper, receive, control_rate=CONTROL_RATE, duration=1000, stop_event=None,
+                 interpolate=True, lookahead=LOOKAHEAD):
+    """固定频率控制循环: 每个周期处理最新一帧、发送命令，每秒打印一次状态
+    
+    启用插值时每个周期发送插值器给出的平滑设定点，没有新帧的周期设定点也会
+    继续移动；提高 control_rate (如 1000Hz) 即可得到更密的设定点序列。
+    
+    Args:
+        piper: 机械臂接口对象
+        receive: 无参函数，返回 (最新数据报或None, 本周期收到的数据报数量)，
+                 如 UDP 模式下的 drain_udp 或中枢模式下的内存邮箱
+        control_rate: 控制循环频率 (Hz)
+        duration: 最长运行时间 (秒)
+        stop_event: threading.Event，置位后退出循环
+        interpolate: 是否对目标位姿插值
+        lookahead: 插值的延迟补偿外推时间 (秒)
+    """
     # 初始化状态变量
-    target_position = INITIAL_POSITION[:]
-    last_controller_position = None
-    last_controller_rotation = None
-    calibration_counter = 0
-    last_sent_position = None
+    state = TeleopState(TargetInterpolator(INITIAL_POSITION[:6], lookahead) if interpolate else None)
+    scheduler = LoopScheduler(control_rate)
+    frames_coalesced = 0  # 同一周期内被更新帧覆盖而未处理的帧数
+    trace_stats = TraceStats(('relay_to_loop', 'loop', 'relay_to_command', 'client_to_command'))
+    publisher = StatePublisher()  # 向中转上报状态，由中转推送给XR客户端
     
     # 设置初始位置
     print("设置机械臂初始位置...")
-    go_to_initial_position(piper, target_position)
+    go_to_initial_position(piper, state.target_position)
     
     print("开始WebXR控制循环...")
     print("按钮功能:")
     print("- 按钮0: 夹爪开合")
     print("- 按钮1: 回初始位置") 
     print("- 按钮3: 急停/恢复切换")
+    print(f"控制频率: {control_rate}Hz")
+    if interpolate:
+        print(f"目标插值: 开启, 延迟补偿 {lookahead * 1e3:.0f}ms")
     print("-" * 50)
     
-    # 主控制循环
-    try:
-        start_time = time.time()
-        last_print_time = 0
+    start_time = time.time()
+    last_print_time = 0
+    
+    while time.time() - start_time < duration:
+        if stop_event is not None and stop_event.is_set():
+            break
+        
+        # 取出本周期内到达的所有数据报，只处理最新的一个
+        data, received = receive()
+        pickup_time = time.monotonic()
+        if received > 1:
+            frames_coalesced += received - 1
         
-        while time.time() - start_time < 1000:  # 运行1000秒
+        trace = None
+        if data is not None:
             try:
-                # 接收并解析UDP数据
-                data, _ = udp_socket.recvfrom(1024)
-                message = json.loads(data.decode())
-                
-                # 只处理controller2的数据
-                if message.get('controller_id') != 'controller2':
-                    continue
-                    
-                controller_data = message['data']
-                
-                # 提取当前位置和姿态
-                pos_data = controller_data['position']
-                current_position = [pos_data['x'], pos_data['y'], pos_data['z']]
-                
-                rot_data = controller_data['rotation']
-                rotation = [rot_data['x'], rot_data['y'], rot_data['z']]
-                
-                # 检查是否在校准模式
-                is_calibrating = calibration_counter < CALIBRATION_FRAMES
-                
-                if is_calibrating:
-                    calibration_counter += 1
-                    print(f"校准中... ({calibration_counter}/{CALIBRATION_FRAMES})")
-                
-                # 更新位置和姿态
-                last_controller_position = update_position(
-                    target_position, current_position, last_controller_position, is_calibrating
-                )
-                last_controller_rotation = update_rotation(
-                    target_position, rotation, last_controller_rotation, is_calibrating
-                )
-                
-                # 只在非校准模式下控制夹爪和按钮
-                if not is_calibrating:
-                    control_gripper(target_position, controller_data)
-                    control_buttons(piper, target_position, controller_data)
-                
-            except (socket.timeout, json.JSONDecodeError, KeyError):
-                pass  # 忽略超时和解析错误，继续循环
+                # 插值以中转接收时刻为样本时间；只有中转与本程序在同一主机时两者的 time.monotonic
+                # 才可比，差值不在 [0, RESTART_GAP) 内 (远程中转或没有追踪尾部) 时用取出时刻
+                frame_trace = read_trace(data)
+                sample_time = pickup_time
+                if frame_trace is not None and 0 <= pickup_time - frame_trace[1] < RESTART_GAP:
+                    sample_time = frame_trace[1]
+                if handle_message(piper, state, data, sample_time):
+                    trace = frame_trace
+            except (ValueError, KeyError):
+                pass  # 忽略解析错误，继续循环
             except Exception as e:
                 print(f"数据处理错误: {e}")
-                continue
 
-            # 发送控制命令
+        # 发送控制命令
+        try:
+            state.last_sent_position = send_commands(piper, state.command_position(), state.last_sent_position)
+        except Exception as e:
+            print(f"控制机械臂时出错: {e}")
+        
+        if trace is not None:
+            record_trace(trace_stats, trace, state.frame.timestamp, pickup_time, received - 1)
+        
+        if publisher.due():
             try:
-                last_sent_position = send_commands(piper, target_position, last_sent_position)
+                publisher.publish(arm_state(piper, state))
             except Exception as e:
-                print(f"控制机械臂时出错: {e}")
-            
-            # 定期打印状态
-            current_time = time.time()
-            if current_time - last_print_time >= 1.0:  # 每秒打印一次
-                coords = [round(pos * FACTOR) for pos in target_position]
-                status = "校准中" if calibration_counter < CALIBRATION_FRAMES else "正常运行"
-                emergency_status = " [急停]" if button_states['emergency_stop'] else ""
-                print(f"[{status}{emergency_status}] Target: X={coords[0]}, Y={coords[1]}, Z={coords[2]}, "
-                      f"RX={coords[3]}, RY={coords[4]}, RZ={coords[5]}, Gripper={coords[6]}")
-                last_print_time = current_time
-            
-            time.sleep(0.01)
+                print(f"上报状态出错: {e}")
+        
+        # 定期打印状态
+        current_time = time.time()
+        if current_time - last_print_time >= 1.0:  # 每秒打印一次
+            coords = [round(pos * FACTOR) for pos in state.target_position]
+            status = "校准中" if state.calibrating else "正常运行"
+            emergency_status = " [急停]" if button_states['emergency_stop'] else ""
+            print(f"[{status}{emergency_status}] Target: X={coords[0]}, Y={coords[1]}, Z={coords[2]}, "
+                  f"RX={coords[3]}, RY={coords[4]}, RZ={coords[5]}, Gripper={coords[6]}")
+            loop_stats = scheduler.stats()
+            print(f"  循环: {loop_stats['rate_hz']:.1f}Hz, 超时 {loop_stats['overruns']} "
+                  f"(累计 {loop_stats['total_overruns']}), 抖动 平均 {loop_stats['jitter_mean_ms']:.3f}ms "
+                  f"最大 {loop_stats['jitter_max_ms']:.3f}ms, 合并帧 {frames_coalesced}")
+            command_stats = command_cache.pop_stats()
+            print("  CAN命令 (发送/跳过): " + ", ".join(
+                f"{name} {sent}/{skipped}" for name, (sent, skipped) in sorted(command_stats.items()))
+                  + f", 限幅 移动 {clamp_counts['move']} 旋转 {clamp_counts['rotate']}")
+            clamp_counts['move'] = clamp_counts['rotate'] = 0
+            if state.interpolator is not None:
+                print("  " + state.interpolator.format_stats())
+                state.interpolator.reset_stats()
+            for line in trace_stats.format_lines():
+                print(line)
+            trace_stats.reset()
+            scheduler.reset_stats()
+            last_print_time = current_time
+        
+        # 等待下一个周期的截止时刻
+        scheduler.wait()
+
+# ================================
+# 主程序
+# ================================
 
+def main(control_rate=CONTROL_RATE, interpolate=True, lookahead=LOOKAHEAD):
+    """主程序入口 (UDP 模式，接收 app.py 转发的数据报)
+    
+    Args:
+        control_rate: 控制循环频率 (Hz)
+        interpolate: 是否对目标位姿插值
+        lookahead: 插值的延迟补偿外推时间 (秒)
+    """
+    # 初始化组件
+    print("=" * 50)
+    print("WebXR Piper机械臂控制系统启动")
+    print("=" * 50)
+    
+    piper = init_piper()
+    udp_socket = setup_udp()
+    
+    # 主控制循环
+    try:
+        control_loop(piper, lambda: drain_udp(udp_socket), control_rate,  # 运行1000秒
+                     interpolate=interpolate, lookahead=lookahead)
     except KeyboardInterrupt:
         print("\n用户中断程序...")
     except Exception as e:
@@ -469,4 +729,12 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="WebXR Piper机械臂控制程序")
+    parser.add_argument("--rate", type=float, default=CONTROL_RATE, help="控制循环频率 (Hz)，插值时可设为 1000")
+    parser.add_argument("--no_interp", action="store_true", help="关闭目标位姿插值，直接发送每帧的目标")
+    parser.add_argument("--lookahead", type=float, default=LOOKAHEAD, help="插值的延迟补偿外推时间 (秒)")
+    args = parser.parse_args()
+    
+    main(args.rate, not args.no_interp, args.lookahead)
@@ -0,0 +1,259 @@
+"""
+asyncio 版 WebXR 中转服务
+
+单个事件循环内同时提供:
+    - /ws              控制器数据 WebSocket (多客户端并发，无需每连接一个线程)
+    - /                web_paint.html 页面
+    - /static/<path>   静态资源
+
+控制器数据通过非阻塞的 UDP DatagramTransport 转发，发送缓冲区积压时
+直接丢弃新帧 (控制数据只有最新值有意义)，不会阻塞事件循环。
+启用状态反馈时，同一个 /ws 连接上按固定频率向客户端推送机器人状态 (robot_state)。
+客户端发送频率由 send_rate 按本进程 CPU 和 UDP 积压协商。
+
+用法:
+    python app.py --engine asyncio
+"""
+
+import asyncio
+import http
+import json
+import logging
+import mimetypes
+import os
+import time
+
+import websockets
+from websockets.datastructures import Headers
+
+from latency_trace import RelayTracer
+from teleop_logging import LogAggregator
+from teleop_frame import encode_frame, iter_frames
+from send_rate import SendRateGovernor, MIN_SEND_RATE, MAX_SEND_RATE
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
+INDEX_TEMPLATE = 'web_paint.html'
+
+# UDP 发送缓冲区高水位 (字节)，超过后暂停写入并丢帧
+UDP_HIGH_WATER = 64 * 1024
+
+
+class _ForwardProtocol(asyncio.DatagramProtocol):
+    """UDP 转发协议，跟踪传输层的流控状态"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.paused = False
+
+    def pause_writing(self):
+        self.paused = True
+        logger.warning("%s UDP 发送缓冲区已满，开始丢帧", self.name)
+
+    def resume_writing(self):
+        self.paused = False
+        logger.info("%s UDP 发送缓冲区已恢复", self.name)
+
+    def error_received(self, exc):
+        # 本地目标端口未监听时会收到 ICMP 不可达，忽略即可
+        logger.debug("%s UDP 错误: %s", self.name, exc)
+
+
+class UdpForwarder:
+    """按控制器编号把帧转发到机械臂/机器狗的 UDP 端口"""
+
+    def __init__(self, arm_address, dog_address):
+        self.addresses = {
+            'controller2': ('机械臂', arm_address),
+            'controller1': ('机器狗', dog_address),
+        }
+        self.endpoints = {}
+        self.sent = 0
+        self.dropped = 0
+        self.tracer = RelayTracer()
+        self.summary = LogAggregator(logger, "转发汇总")
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        for controller_id, (name, address) in self.addresses.items():
+            transport, protocol = await loop.create_datagram_endpoint(
+                lambda name=name: _ForwardProtocol(name),
+                remote_addr=address)
+            transport.set_write_buffer_limits(high=UDP_HIGH_WATER)
+            self.endpoints[controller_id] = (transport, protocol)
+
+    def accepts(self, controller_id: str) -> bool:
+        return controller_id in self.addresses
+
+    def backlog(self):
+        """
+        Returns:
+            tuple: (UDP 发送缓冲区积压字节数, 累计丢帧数)
+        """
+        return sum(transport.get_write_buffer_size() for transport, _ in self.endpoints.values()), self.dropped
+
+    def forward(self, controller_id: str, frame, recv_time: float):
+        endpoint = self.endpoints.get(controller_id)
+        if endpoint is None:
+            return
+        transport, protocol = endpoint
+        # 丢帧前先分配追踪编号，接收端能从编号缺口看到这里的丢帧
+        datagram = self.tracer.trace(controller_id, frame, recv_time)
+        if protocol.paused or transport.is_closing():
+            self.dropped += 1
+            self.summary.add(f"{controller_id} 丢弃")
+        else:
+            transport.sendto(datagram)
+            self.sent += 1
+            self.summary.add(controller_id, len(frame))
+        self.summary.maybe_flush()
+        trace_lines = self.tracer.report()
+        if trace_lines:
+            logger.info("链路延迟:\n%s", "\n".join(trace_lines))
+
+    def close(self):
+        for transport, _ in self.endpoints.values():
+            transport.close()
+        self.endpoints.clear()
+
+
+class AsyncRelayServer:
+    """asyncio 中转服务"""
+
+    def __init__(self, arm_address, dog_address, host='0.0.0.0', port=5000, ssl_context=None,
+                 forwarder=None, feedback=None, send_rate_range=(MIN_SEND_RATE, MAX_SEND_RATE)):
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        # 默认经 UDP 转发；中枢模式传入 teleop_hub.HubForwarder
+        self.forwarder = forwarder or UdpForwarder(arm_address, dog_address)
+        # 机器人状态反馈通道 (robot_state.FeedbackChannel)，为 None 时不推送
+        self.feedback = feedback
+        # 客户端发送频率协商，UDP 模式下同时参考发送缓冲区积压
+        self.governor = SendRateGovernor(*send_rate_range, backlog=getattr(self.forwarder, 'backlog', None))
+        self.clients = set()
+        self._file_cache = {}
+
+    def _read_file(self, path: str):
+        """读取并缓存静态文件内容"""
+        cached = self._file_cache.get(path)
+        if cached is None:
+            with open(path, 'rb') as f:
+                body = f.read()
+            content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            if content_type.startswith('text/'):
+                content_type += '; charset=utf-8'
+            cached = (body, content_type)
+            self._file_cache[path] = cached
+        return cached
+
+    @staticmethod
+    def _safe_join(root: str, relative: str):
+        """拼接路径并确保结果仍在 root 目录内"""
+        path = os.path.realpath(os.path.join(root, relative))
+        if os.path.commonpath([path, os.path.realpath(root)]) != os.path.realpath(root):
+            return None
+        return path
+
+    async def process_request(self, path: str, request_headers):
+        """处理普通 HTTP 请求 (页面与静态资源)，/ws 交给 WebSocket 握手"""
+        path = path.split('?', 1)[0]
+        if path == '/ws':
+            return None
+
+        if path == '/':
+            file_path = os.path.join(TEMPLATE_DIR, INDEX_TEMPLATE)
+        elif path.startswith('/static/'):
+            file_path = self._safe_join(STATIC_DIR, path[len('/static/'):])
+        else:
+            file_path = None
+
+        if file_path is None or not os.path.isfile(file_path):
+            return http.HTTPStatus.NOT_FOUND, Headers(), b'Not Found'
+
+        body, content_type = self._read_file(file_path)
+        headers = Headers({'Content-Type': content_type, 'Content-Length': str(len(body))})
+        return http.HTTPStatus.OK, headers, body
+
+    async def send_feedback(self, websocket):
+        """单个 XR 客户端的状态推送协程，发送缓冲区有积压或发送等待期间到期的推送周期直接跳过"""
+        try:
+            # websocket.send 在缓冲区超过 write_limit (64KiB) 前不会等待，积压按 transport 缓冲区判断
+            await self.feedback.new_client().run_async(websocket.send, websocket.transport.get_write_buffer_size)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def handle_client(self, websocket):
+        """单个 XR 客户端的数据接收协程"""
+        self.clients.add(websocket)
+        logger.info(f"XR客户端已连接: {websocket.remote_address}，当前连接数: {len(self.clients)}")
+        seq = 0
+        feedback_task = asyncio.create_task(self.send_feedback(websocket)) if self.feedback else None
+        client_rate = self.governor.register()
+        try:
+            await websocket.send(self.governor.announcement(client_rate))
+            async for data in websocket:
+                recv_time = time.monotonic()
+                if not data:
+                    logger.warning("WebSocket 接收到空数据")
+                    continue
+
+                announcement = self.governor.on_message(client_rate)
+                if announcement is not None:
+                    await websocket.send(announcement)
+
+                # 二进制消息: 一个或多个拼接的定长帧，直接按控制器编号转发
+                if isinstance(data, bytes):
+                    for controller_id, frame in iter_frames(data):
+                        self.forwarder.forward(controller_id, frame, recv_time)
+                    continue
+
+                # 文本消息: 旧版JSON格式回退
+                try:
+                    msg = json.loads(data)
+                except json.JSONDecodeError as je:
+                    logger.error(f"JSON解析错误: {je}")
+                    continue
+                if msg.get('type') == 'controllers_state':
+                    seq += 1
+                    for controller_id, controller_data in msg['data'].items():
+                        if self.forwarder.accepts(controller_id):
+                            self.forwarder.forward(
+                                controller_id, encode_frame(controller_id, controller_data, seq), recv_time)
+        except websockets.ConnectionClosed:
+            pass
+        except Exception as e:
+            logger.error(f"WebSocket错误: {e}", exc_info=True)
+        finally:
+            if feedback_task is not None:
+                feedback_task.cancel()
+            self.governor.unregister(client_rate)
+            self.clients.discard(websocket)
+            logger.info(f"XR客户端已断开，当前连接数: {len(self.clients)}")
+
+    async def serve_forever(self):
+        await self.forwarder.start()
+        state_transport = await self.feedback.create_endpoint() if self.feedback else None
+        try:
+            async with websockets.serve(self.handle_client, self.host, self.port,
+                                        ssl=self.ssl_context,
+                                        process_request=self.process_request,
+                                        compression=None):
+                scheme = 'https' if self.ssl_context else 'http'
+                logger.info(f"asyncio 中转服务已启动: {scheme}://{self.host}:{self.port}")
+                await asyncio.Future()
+        finally:
+            if state_transport is not None:
+                state_transport.close()
+            self.forwarder.close()
+
+
+def run(arm_address, dog_address, host='0.0.0.0', port=5000, ssl_context=None, forwarder=None,
+        feedback=None, send_rate_range=(MIN_SEND_RATE, MAX_SEND_RATE)):
+    """启动 asyncio 中转服务并阻塞直到退出"""
+    server = AsyncRelayServer(arm_address, dog_address, host, port, ssl_context, forwarder, feedback,
+                              send_rate_range)
+    asyncio.run(server.serve_forever())
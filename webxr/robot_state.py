@@ -0,0 +1,359 @@
+"""
+机器人状态反馈通道
+
+控制程序 → (本机 UDP) → 中转 → /ws → 浏览器，方向与控制器数据相反:
+
+    机械臂/机器狗控制程序用 StatePublisher 按固定频率把自己的状态字段发到
+    STATE_ADDRESS；中转的 FeedbackChannel 合并成一份最新状态，再按配置的频率给每个
+    XR 客户端推送增量帧。
+
+状态帧 (小端): 控制程序上报和推送给浏览器使用同一种格式
+    偏移  类型      字段
+    0     2s        魔数 b'RS'
+    2     uint8     版本号
+    3     uint8     标志 (bit0 = 关键帧，包含全部字段)
+    4     uint32    序列号
+    8     uint8     字段数量 n
+    9     n*(uint8 字段编号, float32 值)
+
+字段编号是 STATE_FIELDS 中的下标。增量帧只包含相对该客户端上次实际发出的值变化
+超过死区的字段，每 KEYFRAME_INTERVAL 秒发一次关键帧。
+
+背压: 每个推送周期先检查该连接发送缓冲区中尚未发出的字节数 (asyncio 模式为
+transport 缓冲区，flask 模式为内核发送队列)，超过 SEND_BACKLOG_LIMIT 时跳过本周期
+并计数；发送本身阻塞 (缓冲区已满) 期间到期的周期同样跳过。恢复后发出的增量仍然
+相对上次实际发出的值计算，不会丢字段，也不会排队发送过期状态。
+flask 模式读取内核发送队列依赖 Linux 的 SIOCOUTQ，其他平台只在发送阻塞时跳过。
+"""
+
+import asyncio
+import logging
+import math
+import socket
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+    import termios
+except ImportError:     # Windows
+    fcntl = None
+
+from teleop_logging import LogAggregator
+
+logger = logging.getLogger(__name__)
+
+STATE_ADDRESS = ('127.0.0.1', 12347)    # 控制程序上报状态的地址
+STATE_PUBLISH_RATE = 20.0               # 控制程序上报频率 (Hz)
+FEEDBACK_RATE = 10.0                    # 推送给 XR 客户端的频率 (Hz)
+KEYFRAME_INTERVAL = 2.0                 # 关键帧间隔 (秒)
+ONLINE_TIMEOUT = 1.0                    # 超过该时间没有上报视为设备离线 (秒)
+SEND_BACKLOG_LIMIT = 512                # 发送缓冲区积压超过该字节数时跳过推送周期
+
+STATE_MAGIC = b'RS'
+STATE_VERSION = 1
+STATE_HEADER = struct.Struct('<2sBBIB')
+STATE_ITEM = struct.Struct('<Bf')
+FLAG_KEYFRAME = 0x01
+
+# (字段名, 增量死区)，字段编号即下标，只能在末尾追加
+STATE_FIELDS = (
+    ('arm_x', 0.1),             # 末端位姿 (mm)
+    ('arm_y', 0.1),
+    ('arm_z', 0.1),
+    ('arm_rx', 0.1),            # 末端姿态 (度)
+    ('arm_ry', 0.1),
+    ('arm_rz', 0.1),
+    ('arm_gripper', 0.1),       # 夹爪目标
+    ('arm_estop', 0.0),         # 急停状态 (0/1)
+    ('arm_calibrating', 0.0),   # 校准中 (0/1)
+    ('arm_online', 0.0),        # 由中转根据上报时间计算 (0/1)
+    ('dog_battery', 0.5),       # 电量
+    ('dog_vx', 0.01),           # 当前速度指令 (m/s, rad/s)
+    ('dog_vy', 0.01),
+    ('dog_wz', 0.01),
+    ('dog_deadman', 0.0),       # 看门狗停止中 (0/1)
+    ('dog_online', 0.0),        # 由中转根据上报时间计算 (0/1)
+)
+FIELD_INDEX = {name: i for i, (name, _) in enumerate(STATE_FIELDS)}
+_ONLINE_FIELDS = {'arm': FIELD_INDEX['arm_online'], 'dog': FIELD_INDEX['dog_online']}
+
+
+def encode_state(items, seq: int = 0, keyframe: bool = False) -> bytes:
+    """
+    Args:
+        items: (字段编号, 值) 序列
+        seq: 序列号
+        keyframe: 是否为关键帧
+
+    Returns:
+        bytes: 状态帧
+    """
+    items = list(items)
+    parts = [STATE_HEADER.pack(STATE_MAGIC, STATE_VERSION, FLAG_KEYFRAME if keyframe else 0,
+                               seq & 0xFFFFFFFF, len(items))]
+    parts.extend(STATE_ITEM.pack(index, value) for index, value in items)
+    return b''.join(parts)
+
+
+def decode_state(payload):
+    """
+    Returns:
+        tuple: (序列号, 是否关键帧, [(字段编号, 值), ...])
+
+    Raises:
+        ValueError: 数据无法解析
+    """
+    if len(payload) < STATE_HEADER.size:
+        raise ValueError(f"状态帧长度不足: {len(payload)} 字节")
+    magic, version, flags, seq, count = STATE_HEADER.unpack_from(payload)
+    if magic != STATE_MAGIC or version != STATE_VERSION:
+        raise ValueError(f"未知的状态帧: magic={magic!r}, version={version}")
+    if len(payload) < STATE_HEADER.size + count * STATE_ITEM.size:
+        raise ValueError(f"状态帧长度不足: {len(payload)} 字节, {count} 个字段")
+    items = [STATE_ITEM.unpack_from(payload, STATE_HEADER.size + i * STATE_ITEM.size) for i in range(count)]
+    return seq, bool(flags & FLAG_KEYFRAME), items
+
+
+class StatePublisher:
+    """控制程序端: 按固定间隔把状态字段发给中转 (非阻塞，中转未运行时静默丢弃)"""
+
+    def __init__(self, address=STATE_ADDRESS, rate: float = STATE_PUBLISH_RATE):
+        self.address = address
+        self.interval = 1.0 / rate
+        self.seq = 0
+        self._last_publish = None
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def due(self, now: float = None) -> bool:
+        """是否到了上报时刻 (避免不需要上报时也去读取状态)"""
+        now = time.monotonic() if now is None else now
+        return self._last_publish is None or now - self._last_publish >= self.interval
+
+    def publish(self, values: dict, now: float = None):
+        """
+        Args:
+            values: 字段名 -> 数值 (bool 按 0/1 发送)
+        """
+        self._last_publish = time.monotonic() if now is None else now
+        self.seq += 1
+        try:
+            self._socket.sendto(encode_state(((FIELD_INDEX[name], float(value)) for name, value in values.items()),
+                                             self.seq, keyframe=True), self.address)
+        except OSError:
+            pass  # 缓冲区满或中转未监听 (Windows 下的 ICMP 不可达)
+
+    def close(self):
+        self._socket.close()
+
+
+class FeedbackChannel:
+    """中转端: 合并控制程序上报的状态，为每个 XR 客户端生成增量帧
+
+    flask 模式下上报线程和各连接的推送线程共享同一个实例，状态读写加锁。
+    """
+
+    def __init__(self, rate: float = FEEDBACK_RATE, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError(f"无效的推送频率: {rate}")
+        self.rate = rate
+        self._clock = clock
+        self._values = [math.nan] * len(STATE_FIELDS)   # nan 表示尚未收到
+        self._last_seen = {group: None for group in _ONLINE_FIELDS}
+        self._lock = threading.Lock()
+        self.updates = 0
+        self.invalid = 0
+        self.summary = LogAggregator(logger, "状态推送汇总", interval=5.0, clock=clock)
+
+    def update(self, payload):
+        """合并一个控制程序上报的状态帧"""
+        try:
+            _, _, items = decode_state(payload)
+        except ValueError:
+            self.invalid += 1
+            return
+        now = self._clock()
+        with self._lock:
+            for index, value in items:
+                if index < len(self._values):
+                    self._values[index] = value
+                    group = STATE_FIELDS[index][0].split('_', 1)[0]
+                    if group in self._last_seen:
+                        self._last_seen[group] = now
+            self.updates += 1
+
+    def snapshot(self):
+        """
+        Returns:
+            tuple: (当前时刻, 完整状态列表，含由上报时间计算的在线字段)
+        """
+        now = self._clock()
+        with self._lock:
+            values = self._values[:]
+            for group, index in _ONLINE_FIELDS.items():
+                last_seen = self._last_seen[group]
+                values[index] = 1.0 if last_seen is not None and now - last_seen < ONLINE_TIMEOUT else 0.0
+        return now, values
+
+    def new_client(self):
+        return FeedbackClient(self)
+
+    def listen(self, address=STATE_ADDRESS):
+        """在后台线程中接收状态上报 (flask 模式使用；asyncio 模式使用 create_endpoint)"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(address)
+
+        def receive():
+            while True:
+                try:
+                    data, _ = sock.recvfrom(1024)
+                except ConnectionResetError:
+                    continue  # Windows下ICMP不可达会触发，忽略
+                except OSError:
+                    break
+                self.update(data)
+
+        threading.Thread(target=receive, name='state-listener', daemon=True).start()
+        logger.info(f"状态反馈: 监听 {address[0]}:{address[1]}, 推送 {self.rate:g}Hz")
+        return sock
+
+    async def create_endpoint(self, address=STATE_ADDRESS):
+        """在当前事件循环中接收状态上报"""
+        channel = self
+
+        class StateProtocol(asyncio.DatagramProtocol):
+            def datagram_received(self, data, _):
+                channel.update(data)
+
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            StateProtocol, local_addr=address)
+        logger.info(f"状态反馈: 监听 {address[0]}:{address[1]}, 推送 {self.rate:g}Hz")
+        return transport
+
+
+def socket_backlog(sock) -> int:
+    """套接字发送队列中尚未被对端确认的字节数 (Linux SIOCOUTQ)，不支持时返回 0"""
+    if fcntl is None:
+        return 0
+    try:
+        return struct.unpack('i', fcntl.ioctl(sock.fileno(), termios.TIOCOUTQ, b'\0' * 4))[0]
+    except (OSError, ValueError):
+        return 0
+
+
+class FeedbackClient:
+    """单个 XR 客户端的推送状态: 上次实际发出的值、序列号和跳过计数"""
+
+    def __init__(self, channel: FeedbackChannel):
+        self.channel = channel
+        self._sent = [math.nan] * len(STATE_FIELDS)
+        self._last_keyframe = None
+        self.seq = 0
+        self.sent = 0
+        self.skipped = 0        # 发送阻塞期间跳过的推送周期
+
+    def next_message(self):
+        """
+        相对上次实际发出的值生成增量帧
+
+        Returns:
+            bytes: 状态帧，没有变化且未到关键帧时间时返回 None
+        """
+        now, values = self.channel.snapshot()
+        keyframe = self._last_keyframe is None or now - self._last_keyframe >= KEYFRAME_INTERVAL
+        items = []
+        sent = self._sent
+        for index, value in enumerate(values):
+            if math.isnan(value):
+                continue
+            # 按 float32 比较，避免精度差异导致重复发送
+            value = STATE_ITEM.unpack(STATE_ITEM.pack(index, value))[1]
+            if keyframe or math.isnan(sent[index]) or abs(value - sent[index]) > STATE_FIELDS[index][1]:
+                items.append((index, value))
+                sent[index] = value
+        if not items and not keyframe:
+            return None
+        if keyframe:
+            self._last_keyframe = now
+        self.seq += 1
+        self.sent += 1
+        return encode_state(items, self.seq, keyframe)
+
+    def _skip_missed(self, next_tick, now, period):
+        """发送阻塞超过一个周期时跳过已过期的周期，返回新的截止时刻"""
+        if now - next_tick >= period:
+            missed = int((now - next_tick) / period)
+            self.skipped += missed
+            self.channel.summary.add('跳过', count=missed)
+            next_tick += missed * period
+        return next_tick
+
+    def _congested(self, backlog):
+        """发送缓冲区积压超过 SEND_BACKLOG_LIMIT 时跳过本周期并计数"""
+        if backlog is None or backlog() <= SEND_BACKLOG_LIMIT:
+            return False
+        self.skipped += 1
+        self.channel.summary.add('跳过')
+        return True
+
+    def _record(self, message):
+        self.channel.summary.add('推送', len(message))
+        self.channel.summary.maybe_flush()
+
+    def run_thread(self, send, stop_event, backlog=None):
+        """阻塞推送循环 (flask 模式，每个连接一个线程)
+
+        Args:
+            send: 发送函数，发送缓冲区满时阻塞
+            stop_event: threading.Event，置位后退出
+            backlog: 无参函数，返回发送缓冲区积压字节数，如 lambda: socket_backlog(ws.sock)
+        """
+        period = 1.0 / self.channel.rate
+        next_tick = time.monotonic()
+        while not stop_event.is_set():
+            message = None if self._congested(backlog) else self.next_message()
+            if message is not None:
+                send(message)
+                self._record(message)
+            next_tick += period
+            now = time.monotonic()
+            next_tick = self._skip_missed(next_tick, now, period)
+            if next_tick > now:
+                stop_event.wait(next_tick - now)
+
+    async def run_async(self, send, backlog=None):
+        """异步推送循环 (asyncio 模式，每个连接一个任务)
+
+        Args:
+            send: 协程函数，发送缓冲区满时等待
+            backlog: 无参函数，返回发送缓冲区积压字节数，如 transport.get_write_buffer_size
+        """
+        period = 1.0 / self.channel.rate
+        next_tick = time.monotonic()
+        while True:
+            message = None if self._congested(backlog) else self.next_message()
+            if message is not None:
+                await send(message)
+                self._record(message)
+            next_tick += period
+            now = time.monotonic()
+            next_tick = self._skip_missed(next_tick, now, period)
+            if next_tick > now:
+                await asyncio.sleep(next_tick - now)
+
+
+def dog_state(streamer, telemetry=None) -> dict:
+    """机器狗控制程序上报的状态字段
+
+    Args:
+        streamer: dog_velocity_stream.VelocityStreamer
+        telemetry: dog_telemetry.TelemetrySampler，为 None 或尚无样本时不上报电量
+    """
+    vx, vy, wz = streamer.velocity
+    values = {'dog_vx': vx, 'dog_vy': vy, 'dog_wz': wz, 'dog_deadman': streamer.deadman_active}
+    sample = telemetry.latest() if telemetry is not None else None
+    if sample is not None:
+        values['dog_battery'] = sample['battery']
+    return values
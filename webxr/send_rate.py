@@ -0,0 +1,138 @@
+"""
+XR 客户端发送频率协商
+
+客户端在 XR 动画帧中发送控制器数据，频率由中转经 /ws 下发的文本消息决定:
+
+    {"type": "send_rate", "rate": 60}
+
+中转每个调整周期测量一次负载并按 AIMD 调整目标频率 (所有客户端共用):
+
+    - 本进程 CPU 占用超过 CPU_HIGH，或 UDP 发送缓冲区有积压/出现丢帧 → 乘性降低
+    - CPU 占用低于 CPU_LOW 且客户端实际频率达到目标的 RATE_REACHED 以上 → 加性提高
+      (客户端受自身帧率限制达不到目标时不再提高)
+
+目标频率限制在 [min_rate, max_rate]，变化后在各客户端下一条消息到达时下发。
+"""
+
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MIN_SEND_RATE = 30.0        # 客户端发送频率下限 (Hz)
+MAX_SEND_RATE = 90.0        # 客户端发送频率上限 (Hz)
+INITIAL_SEND_RATE = 60.0    # 初始目标频率 (Hz)
+ADJUST_INTERVAL = 1.0       # 调整周期 (秒)
+CPU_HIGH = 0.8              # CPU 占用 (单核比例) 超过该值时降低频率
+CPU_LOW = 0.5               # CPU 占用低于该值时允许提高频率
+RATE_DECREASE = 0.7         # 乘性降低系数
+RATE_INCREASE = 10.0        # 加性提高步长 (Hz)
+RATE_REACHED = 0.9          # 客户端实际频率达到目标的该比例才视为跟上
+RATE_ANNOUNCE_DELTA = 1.0   # 目标频率变化超过该值才重新下发 (Hz)
+
+
+class ClientRate:
+    """单个客户端的接收计数和已下发的频率"""
+
+    def __init__(self):
+        self.window_messages = 0
+        self.measured_rate = 0.0
+        self.announced_rate = None
+
+
+class SendRateGovernor:
+    """按中转负载协商客户端发送频率
+
+    flask 模式下多个连接线程共享同一个实例，状态更新加锁。
+    """
+
+    def __init__(self, min_rate: float = MIN_SEND_RATE, max_rate: float = MAX_SEND_RATE,
+                 initial_rate: float = INITIAL_SEND_RATE, backlog=None, interval: float = ADJUST_INTERVAL,
+                 clock=time.monotonic, cpu_clock=time.process_time):
+        """
+        Args:
+            min_rate: 频率下限 (Hz)
+            max_rate: 频率上限 (Hz)
+            initial_rate: 初始目标频率 (Hz)
+            backlog: 无参函数，返回 (UDP 发送缓冲区积压字节数, 累计丢帧数)；为 None 时只看 CPU
+            interval: 调整周期 (秒)
+        """
+        if not 0 < min_rate <= max_rate:
+            raise ValueError(f"无效的频率范围: {min_rate} ~ {max_rate}")
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(initial_rate, min_rate), max_rate)
+        self.interval = interval
+        self._backlog = backlog
+        self._clock = clock
+        self._cpu_clock = cpu_clock
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._last_adjust = clock()
+        self._last_cpu = cpu_clock()
+        self._last_dropped = backlog()[1] if backlog else 0
+        self.cpu = 0.0
+
+    def register(self) -> ClientRate:
+        client = ClientRate()
+        with self._lock:
+            self._clients.add(client)
+        return client
+
+    def unregister(self, client: ClientRate):
+        with self._lock:
+            self._clients.discard(client)
+
+    def on_message(self, client: ClientRate):
+        """
+        记录客户端的一条控制器消息，并在到达调整周期时调整目标频率
+
+        Returns:
+            str: 需要下发给该客户端的频率消息 (JSON 文本)，无需下发时返回 None
+        """
+        client.window_messages += 1
+        if self._clock() - self._last_adjust >= self.interval:
+            self._adjust()
+        return self.announcement(client)
+
+    def announcement(self, client: ClientRate):
+        """目标频率与该客户端已下发的值不同时返回频率消息，否则返回 None"""
+        rate = self.rate
+        if client.announced_rate is not None and abs(rate - client.announced_rate) < RATE_ANNOUNCE_DELTA:
+            return None
+        client.announced_rate = rate
+        return json.dumps({'type': 'send_rate', 'rate': round(rate)})
+
+    def _adjust(self):
+        with self._lock:
+            now = self._clock()
+            elapsed = now - self._last_adjust
+            if elapsed < self.interval:
+                return  # 其他线程刚刚调整过
+            self._last_adjust = now
+            cpu_now = self._cpu_clock()
+            self.cpu = (cpu_now - self._last_cpu) / elapsed
+            self._last_cpu = cpu_now
+
+            for client in self._clients:
+                client.measured_rate = client.window_messages / elapsed
+                client.window_messages = 0
+
+            queued, dropped = self._backlog() if self._backlog else (0, 0)
+            new_drops = dropped - self._last_dropped
+            self._last_dropped = dropped
+
+            rate = self.rate
+            reached = all(client.measured_rate >= rate * RATE_REACHED for client in self._clients)
+            if self.cpu > CPU_HIGH or queued > 0 or new_drops > 0:
+                rate = max(self.min_rate, rate * RATE_DECREASE)
+            elif self.cpu < CPU_LOW and reached and self._clients:
+                rate = min(self.max_rate, rate + RATE_INCREASE)
+            if rate != self.rate:
+                logger.info(
+                    "客户端发送频率 %.0fHz → %.0fHz (CPU %.0f%%, 积压 %d 字节, 丢帧 %d, 客户端实际 %s)",
+                    self.rate, rate, self.cpu * 100, queued, new_drops,
+                    ", ".join(f"{client.measured_rate:.1f}Hz" for client in self._clients) or "无")
+                self.rate = rate
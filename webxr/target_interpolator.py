@@ -0,0 +1,169 @@
+"""
+机械臂目标位姿插值
+
+控制器帧按头显发送频率 (30~90Hz) 到达，update_position/update_rotation 每帧把
+目标位姿跳变一次；控制循环 (200Hz 或更高) 在两帧之间只会重复发送同一个目标，
+机械臂收到的是阶梯状的 EndPoseCtrl 序列。
+
+插值器记录带时间戳的目标样本，每个控制周期给出平滑的中间设定点:
+
+    - 每到一个新样本，从当前设定点 (位置和速度都连续) 到外推目标规划一段三次
+      Hermite 曲线，时长为平均采样间隔 (限制在 [MIN_HORIZON, MAX_HORIZON])
+    - 外推目标 = 新样本 + 估计速度 × (段终点时刻 - 样本时刻 + lookahead)，
+      即补偿中转到控制循环已经过去的时间，再向前看 lookahead (客户端到中转的
+      估计延迟)，外推时长不超过 MAX_EXTRAPOLATION
+    - 段结束后仍没有新样本时按估计速度继续外推，速度按 EXTRAPOLATION_DECAY
+      指数衰减，设定点平滑地停在有限距离内，不需要等待下一帧
+
+速度估计对采样间隔抖动做了限制 (间隔按平均值的 MIN_DT_RATIO 下限计算)。
+超过 RESTART_GAP 没有新样本 (客户端断开或停顿) 时，设定点用 SETTLE_TIME 平滑
+回到最后一个样本，不会停留在外推出的位置；之后的第一个样本速度视为零。
+
+用法:
+    interpolator = TargetInterpolator(INITIAL_POSITION[:6])
+    interpolator.add_sample(target_position[:6], relay_recv_time)   # 收到新帧时
+    pose = interpolator.setpoint()                                  # 每个控制周期
+"""
+
+import math
+import time
+
+LOOKAHEAD = 0.03            # 延迟补偿的额外外推时间 (秒)，约为客户端到中转的延迟
+MAX_EXTRAPOLATION = 0.1     # 单个样本最长外推时间 (秒)
+EXTRAPOLATION_DECAY = 0.05  # 段结束后继续外推的速度衰减时间常数 (秒)
+DEFAULT_INTERVAL = 1 / 60   # 初始平均采样间隔 (秒)
+MIN_HORIZON = 0.005         # 插值段最短时长 (秒)
+MAX_HORIZON = 0.05          # 插值段最长时长 (秒)
+INTERVAL_SMOOTHING = 0.2    # 平均采样间隔的指数平滑系数
+VELOCITY_SMOOTHING = 0.5    # 速度估计的指数平滑系数
+MIN_DT_RATIO = 0.5          # 速度估计使用的采样间隔下限 (相对平均间隔)
+RESTART_GAP = 0.25          # 采样间隔超过该值时视为重新开始 (秒)
+SETTLE_TIME = 0.2           # 停顿后回到最后一个样本的时长 (秒)
+
+
+class TargetInterpolator:
+    """由稀疏的目标样本生成控制频率的平滑设定点 (三次 Hermite + 外推)"""
+
+    def __init__(self, pose, lookahead: float = LOOKAHEAD, clock=time.monotonic):
+        """
+        Args:
+            pose: 初始位姿 (X, Y, Z, RX, RY, RZ)
+            lookahead: 延迟补偿的额外外推时间 (秒)
+            clock: 时钟函数 (秒)，样本时间戳必须与之同源
+        """
+        self.lookahead = lookahead
+        self._clock = clock
+        self.interval = DEFAULT_INTERVAL
+        self.reset(pose)
+        self.reset_stats()
+
+    def reset(self, pose):
+        """立即跳到 pose 并清零速度 (回初始位置等目标跳变后使用)"""
+        pose = list(pose)
+        zeros = [0.0] * len(pose)
+        self.velocity = zeros[:]
+        self._last_sample = None    # (样本时刻, 样本位姿)
+        self._settled = True        # 已规划回到最后一个样本的段
+        self._segment = (self._clock(), MIN_HORIZON, pose, zeros, pose, zeros)
+
+    def reset_stats(self):
+        """清空统计窗口"""
+        self.window_samples = 0
+        self.window_coasting = 0    # 段已结束仍没有新样本的设定点数
+        self.window_setpoints = 0
+        self.extrapolation_max = 0.0
+
+    def add_sample(self, pose, sample_time: float = None):
+        """
+        记录一个新的目标样本并规划下一段曲线
+
+        Args:
+            pose: 目标位姿 (X, Y, Z, RX, RY, RZ)
+            sample_time: 样本时刻 (如中转接收时刻)，默认为当前时刻
+        """
+        now = self._clock()
+        if sample_time is None:
+            sample_time = now
+        last = self._last_sample
+        if last is None or sample_time - last[0] > RESTART_GAP:
+            velocity = [0.0] * len(pose)
+        else:
+            dt = sample_time - last[0]
+            self.interval += INTERVAL_SMOOTHING * (dt - self.interval)
+            # 同一批到达的帧时间戳几乎相同，按平均间隔限制下限，避免速度估计爆炸
+            dt = max(dt, self.interval * MIN_DT_RATIO)
+            velocity = [v + VELOCITY_SMOOTHING * ((p - q) / dt - v)
+                        for v, p, q in zip(self.velocity, pose, last[1])]
+        self.velocity = velocity
+        self._last_sample = (sample_time, list(pose))
+        self._settled = False
+
+        start, start_velocity = self._evaluate(now)
+        horizon = min(max(self.interval, MIN_HORIZON), MAX_HORIZON)
+        reach = min(max(now + horizon - sample_time + self.lookahead, 0.0), MAX_EXTRAPOLATION)
+        end = [p + v * reach for p, v in zip(pose, velocity)]
+        self._segment = (now, horizon, start, start_velocity, end, velocity)
+
+        self.window_samples += 1
+        if reach > self.extrapolation_max:
+            self.extrapolation_max = reach
+
+    def _evaluate(self, now):
+        """当前段在 now 时刻的 (位置, 速度)"""
+        t0, duration, p0, v0, p1, v1 = self._segment
+        u = (now - t0) / duration
+        if u <= 0.0:
+            return p0[:], v0[:]
+        if u >= 1.0:
+            # 段已结束: 按段终点速度继续外推，速度指数衰减
+            decay = math.exp((1.0 - u) * duration / EXTRAPOLATION_DECAY)
+            travel = EXTRAPOLATION_DECAY * (1.0 - decay)
+            return [p + v * travel for p, v in zip(p1, v1)], [v * decay for v in v1]
+        u2 = u * u
+        u3 = u2 * u
+        h00 = 2 * u3 - 3 * u2 + 1
+        h10 = (u3 - 2 * u2 + u) * duration
+        h01 = 3 * u2 - 2 * u3
+        h11 = (u3 - u2) * duration
+        # 速度为位置对时间的导数
+        d00 = (6 * u2 - 6 * u) / duration
+        d10 = 3 * u2 - 4 * u + 1
+        d11 = 3 * u2 - 2 * u
+        position = [h00 * a + h10 * b + h01 * c + h11 * d for a, b, c, d in zip(p0, v0, p1, v1)]
+        velocity = [d00 * (a - c) + d10 * b + d11 * d for a, b, c, d in zip(p0, v0, p1, v1)]
+        return position, velocity
+
+    def setpoint(self):
+        """
+        Returns:
+            list: 当前时刻的设定点位姿 (X, Y, Z, RX, RY, RZ)
+        """
+        now = self._clock()
+        self.window_setpoints += 1
+        if not self._settled and now - self._last_sample[0] > RESTART_GAP:
+            # 长时间没有新样本: 从当前设定点平滑回到最后一个样本并停住
+            start, start_velocity = self._evaluate(now)
+            pose = self._last_sample[1]
+            self.velocity = [0.0] * len(pose)
+            self._segment = (now, SETTLE_TIME, start, start_velocity, pose, self.velocity)
+            self._settled = True
+        t0, duration = self._segment[:2]
+        if now - t0 >= duration:
+            self.window_coasting += 1
+        return self._evaluate(now)[0]
+
+    def stats(self) -> dict:
+        """当前统计窗口的插值指标 (时间单位: 毫秒)"""
+        return {
+            'samples': self.window_samples,
+            'setpoints': self.window_setpoints,
+            'coasting': self.window_coasting,
+            'interval_ms': self.interval * 1e3,
+            'extrapolation_max_ms': self.extrapolation_max * 1e3,
+        }
+
+    def format_stats(self) -> str:
+        """一行统计文本"""
+        s = self.stats()
+        return (f"插值: 样本 {s['samples']}, 设定点 {s['setpoints']} (无新样本外推 {s['coasting']}), "
+                f"平均采样间隔 {s['interval_ms']:.1f}ms, 最长外推 {s['extrapolation_max_ms']:.1f}ms")
@@ -0,0 +1,258 @@
+"""
+WebXR 遥操作控制器数据帧格式
+
+浏览器 → /ws → UDP → 机械臂/机器狗控制程序 全链路使用同一种定长二进制帧，
+中转程序只需按控制器编号路由，无需反复 JSON 解析/序列化。
+JSON 格式作为兼容回退继续支持。
+
+帧布局 (小端, 共 62 字节):
+    偏移  类型      字段
+    0     2s        魔数 b'XR'
+    2     uint8     版本号
+    3     uint8     控制器编号 (1=controller1, 2=controller2)
+    4     uint32    序列号
+    8     float64   发送端时间戳 (秒)
+    16    3*float32 位置 x, y, z
+    28    3*float32 旋转 x, y, z (欧拉角, 弧度)
+    40    uint32    按钮位掩码 (bit i = buttons[i].pressed)
+    44    uint8     按钮数量
+    45    uint8     摇杆轴数量 (最多 4)
+    46    4*float32 摇杆轴
+
+中转转发到 UDP 时在帧后附加追踪尾部 (小端, 共 22 字节，解码帧时忽略):
+    0     2s        魔数 b'TR'
+    2     uint32    追踪编号 (按控制器独立递增)
+    6     float64   中转收到消息的时刻 (time.monotonic)
+    14    float64   中转发出数据报的时刻 (time.monotonic)
+"""
+
+import json
+import struct
+import time
+
+FRAME_MAGIC = b'XR'
+FRAME_VERSION = 1
+FRAME_STRUCT = struct.Struct('<2sBBId3f3fIBB4f')
+FRAME_SIZE = FRAME_STRUCT.size
+FRAME_HEADER = struct.Struct('<2sBBId')
+TRACE_MAGIC = b'TR'
+TRACE_STRUCT = struct.Struct('<2sIdd')
+TRACE_SIZE = TRACE_STRUCT.size
+MAX_AXES = 4
+MAX_BUTTONS = 32
+
+CONTROLLER_IDS = ('controller1', 'controller2')
+_CONTROLLER_INDEX = {name: i + 1 for i, name in enumerate(CONTROLLER_IDS)}
+
+
+class ControllerFrame:
+    """单个控制器的一帧状态
+
+    解码时原地更新已有对象的字段，接收端可以复用同一个实例，
+    每帧不再创建新的 dict/list。
+    """
+
+    __slots__ = ('controller_id', 'seq', 'timestamp', 'position', 'rotation',
+                 'buttons', 'button_count', 'axes', 'axes_count')
+
+    def __init__(self):
+        self.controller_id = None
+        self.seq = 0
+        self.timestamp = 0.0
+        self.position = [0.0, 0.0, 0.0]
+        self.rotation = [0.0, 0.0, 0.0]
+        self.buttons = 0
+        self.button_count = 0
+        self.axes = [0.0] * MAX_AXES
+        self.axes_count = 0
+
+    def button(self, index: int) -> bool:
+        """按钮 index 是否按下"""
+        return index < self.button_count and bool(self.buttons >> index & 1)
+
+    def axis(self, index: int) -> float:
+        """摇杆轴 index 的值，不存在时返回 0"""
+        return self.axes[index] if index < self.axes_count else 0.0
+
+    def to_dict(self) -> dict:
+        """转换为与旧 JSON 消息中 data 字段相同的结构"""
+        return {
+            'position': dict(zip('xyz', self.position)),
+            'rotation': dict(zip('xyz', self.rotation)),
+            'buttons': [self.button(i) for i in range(self.button_count)],
+            'axes': self.axes[:self.axes_count],
+        }
+
+
+def encode_frame(controller_id: str, data: dict, seq: int = 0, timestamp: float = None,
+                 buffer=None, offset: int = 0):
+    """将 JSON 结构的控制器数据编码为二进制帧
+
+    Args:
+        controller_id: 'controller1' 或 'controller2'
+        data: 与 web_paint.html 发送的 JSON 相同结构的控制器数据
+        seq: 序列号
+        timestamp: 时间戳 (秒)，默认取当前时间
+        buffer: 可选的预分配缓冲区 (bytearray)，提供时原地写入
+        offset: 写入缓冲区的偏移
+
+    Returns:
+        bytes: 编码后的帧 (提供 buffer 时返回 None)
+    """
+    position = data.get('position') or {}
+    rotation = data.get('rotation') or {}
+    buttons = data.get('buttons') or []
+    axes = list(data.get('axes') or [])[:MAX_AXES]
+
+    mask = 0
+    for i, pressed in enumerate(buttons[:MAX_BUTTONS]):
+        if pressed:
+            mask |= 1 << i
+    axes_count = len(axes)
+    axes += [0.0] * (MAX_AXES - axes_count)
+
+    values = (
+        FRAME_MAGIC, FRAME_VERSION, _CONTROLLER_INDEX[controller_id],
+        seq & 0xFFFFFFFF, time.time() if timestamp is None else timestamp,
+        position.get('x', 0.0), position.get('y', 0.0), position.get('z', 0.0),
+        rotation.get('x', 0.0), rotation.get('y', 0.0), rotation.get('z', 0.0),
+        mask, min(len(buttons), MAX_BUTTONS), axes_count, *axes
+    )
+    if buffer is not None:
+        FRAME_STRUCT.pack_into(buffer, offset, *values)
+        return None
+    return FRAME_STRUCT.pack(*values)
+
+
+def is_binary_frame(payload, offset: int = 0) -> bool:
+    """判断 payload 在 offset 处是否为本格式的二进制帧"""
+    return (len(payload) - offset >= FRAME_SIZE
+            and payload[offset:offset + 2] == FRAME_MAGIC
+            and payload[offset + 2] == FRAME_VERSION)
+
+
+def frame_controller_id(payload, offset: int = 0):
+    """只读取帧头中的控制器编号，用于中转路由
+
+    Returns:
+        str: 控制器名称，编号无效时返回 None
+    """
+    index = payload[offset + 3]
+    if 1 <= index <= len(CONTROLLER_IDS):
+        return CONTROLLER_IDS[index - 1]
+    return None
+
+
+def frame_header(payload, offset: int = 0):
+    """只读取帧头中的序列号和发送端时间戳
+
+    Returns:
+        (int, float): 序列号, 时间戳 (秒)
+    """
+    _, _, _, seq, timestamp = FRAME_HEADER.unpack_from(payload, offset)
+    return seq, timestamp
+
+
+def append_trace(frame, trace_id: int, recv_time: float, send_time: float) -> bytes:
+    """在单个帧后附加追踪尾部，返回新的 UDP 数据报"""
+    return bytes(frame) + TRACE_STRUCT.pack(TRACE_MAGIC, trace_id & 0xFFFFFFFF, recv_time, send_time)
+
+
+def read_trace(payload):
+    """读取 UDP 数据报末尾的追踪尾部
+
+    Returns:
+        tuple: (追踪编号, 中转接收时刻, 中转发送时刻)，没有追踪尾部时返回 None
+    """
+    if (len(payload) != FRAME_SIZE + TRACE_SIZE
+            or payload[FRAME_SIZE:FRAME_SIZE + 2] != TRACE_MAGIC):
+        return None
+    _, trace_id, recv_time, send_time = TRACE_STRUCT.unpack_from(payload, FRAME_SIZE)
+    return trace_id, recv_time, send_time
+
+
+def decode_frame(payload, frame: ControllerFrame = None, offset: int = 0) -> ControllerFrame:
+    """解码二进制帧到 ControllerFrame (原地更新)
+
+    Raises:
+        ValueError: 魔数、版本或控制器编号无效
+    """
+    if not is_binary_frame(payload, offset):
+        raise ValueError("无效的控制器数据帧")
+    controller_id = frame_controller_id(payload, offset)
+    if controller_id is None:
+        raise ValueError(f"无效的控制器编号: {payload[offset + 3]}")
+    if frame is None:
+        frame = ControllerFrame()
+
+    (_, _, _, frame.seq, frame.timestamp,
+     px, py, pz, rx, ry, rz,
+     frame.buttons, frame.button_count, axes_count,
+     a0, a1, a2, a3) = FRAME_STRUCT.unpack_from(payload, offset)
+
+    frame.controller_id = controller_id
+    position = frame.position
+    position[0], position[1], position[2] = px, py, pz
+    rotation = frame.rotation
+    rotation[0], rotation[1], rotation[2] = rx, ry, rz
+    axes = frame.axes
+    axes[0], axes[1], axes[2], axes[3] = a0, a1, a2, a3
+    frame.axes_count = min(axes_count, MAX_AXES)
+    return frame
+
+
+def decode_json_message(message: dict, frame: ControllerFrame = None) -> ControllerFrame:
+    """解码旧版 JSON 消息 {'controller_id': ..., 'data': {...}} 到 ControllerFrame"""
+    if frame is None:
+        frame = ControllerFrame()
+    data = message['data']
+    position = data.get('position') or {}
+    rotation = data.get('rotation') or {}
+    buttons = data.get('buttons') or []
+    axes = data.get('axes') or []
+
+    frame.controller_id = message['controller_id']
+    frame.seq = message.get('seq', 0)
+    frame.timestamp = message.get('timestamp', 0.0)
+    for i, key in enumerate('xyz'):
+        frame.position[i] = position.get(key, 0.0)
+        frame.rotation[i] = rotation.get(key, 0.0)
+
+    mask = 0
+    for i, pressed in enumerate(buttons[:MAX_BUTTONS]):
+        if pressed:
+            mask |= 1 << i
+    frame.buttons = mask
+    frame.button_count = min(len(buttons), MAX_BUTTONS)
+
+    frame.axes_count = min(len(axes), MAX_AXES)
+    for i in range(MAX_AXES):
+        frame.axes[i] = axes[i] if i < frame.axes_count else 0.0
+    return frame
+
+
+def decode_message(payload: bytes, frame: ControllerFrame = None) -> ControllerFrame:
+    """解码一个 UDP 数据报，自动识别二进制帧或 JSON 回退格式
+
+    Raises:
+        ValueError: 数据无法解析 (json.JSONDecodeError 也是 ValueError)
+        KeyError: JSON 消息缺少必要字段
+    """
+    if is_binary_frame(payload):
+        return decode_frame(payload, frame)
+    return decode_json_message(json.loads(payload), frame)
+
+
+def iter_frames(payload):
+    """遍历 WebSocket 二进制消息中拼接的多个帧
+
+    Yields:
+        (controller_id, memoryview): 控制器名称和对应帧的只读切片
+    """
+    view = memoryview(payload)
+    for offset in range(0, len(payload) - FRAME_SIZE + 1, FRAME_SIZE):
+        if not is_binary_frame(payload, offset):
+            break
+        controller_id = frame_controller_id(payload, offset)
+        if controller_id is not None:
+            yield controller_id, view[offset:offset + FRAME_SIZE]
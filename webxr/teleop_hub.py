@@ -0,0 +1,268 @@
+"""
+遥操作中枢模式 (单进程)
+
+默认部署中 app.py 把帧经 UDP 转发到 127.0.0.1:12345 / 12346，机械臂和机器狗
+控制程序各自是独立进程。中枢模式下中转进程直接持有设备适配器，帧经内存邮箱
+投递，省去每帧一次 sendto/recvfrom 和内核往返；远程部署仍使用 UDP 模式。
+
+    controller2 → 机械臂适配器 (piper)
+    controller1 → 机器狗适配器 (hand / joystick)
+
+适配器是任意带有下列成员的对象，可以按需替换或新增:
+
+    name            日志中显示的设备名称
+    start()         启动设备控制 (通常在后台线程中运行控制循环)
+    submit(data)    投递一个数据报 (二进制帧 + 追踪尾部)，在中转线程/事件循环中调用，
+                    必须立即返回
+    stop()          停止控制循环并让设备进入安全状态
+
+机器狗适配器另有 telemetry 属性 (dog_telemetry.TelemetrySampler，未初始化时为 None)，
+中转可以直接读取状态遥测缓冲区。
+
+用法:
+    python app.py --hub                          # 机械臂 + 手势控制机器狗
+    python app.py --engine asyncio --hub --dog joystick
+    python app.py --hub --dog none               # 只接机械臂
+"""
+
+import asyncio
+import logging
+import threading
+import time
+
+from latency_trace import RelayTracer
+from teleop_logging import LogAggregator
+
+logger = logging.getLogger(__name__)
+
+DOG_IP = '192.168.234.1'    # 机器狗IP地址
+DOG_LOCAL_PORT = 43988      # 本地端口
+STOP_TIMEOUT = 5.0          # 停止适配器时等待控制线程退出的时间 (秒)
+
+
+class FrameMailbox:
+    """单槽邮箱: 只保留最新一个数据报，与 drain_udp 的返回值含义相同"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._count = 0
+
+    def put(self, data: bytes):
+        with self._lock:
+            self._data = data
+            self._count += 1
+
+    def drain(self):
+        """
+        Returns:
+            tuple: (最新数据报或None, 上次取出后投递的数据报数量)
+        """
+        with self._lock:
+            data, count = self._data, self._count
+            self._data = None
+            self._count = 0
+        return data, count
+
+
+class PiperArmAdapter:
+    """机械臂适配器: 在后台线程中运行 piper_controller_joystick 的控制循环"""
+
+    name = '机械臂'
+
+    def __init__(self, control_rate: float = None):
+        import piper_controller_joystick as arm
+        self.arm = arm
+        self.control_rate = control_rate or arm.CONTROL_RATE
+        self.mailbox = FrameMailbox()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='arm', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        arm = self.arm
+        try:
+            piper = arm.init_piper()
+        except Exception as e:
+            logger.error(f"机械臂初始化失败: {e}")
+            return
+        try:
+            arm.control_loop(piper, self.mailbox.drain, self.control_rate,
+                             duration=float('inf'), stop_event=self._stop)
+        except Exception as e:
+            logger.error(f"机械臂控制循环出错: {e}", exc_info=True)
+        finally:
+            arm.stop_piper(piper)
+
+    def submit(self, data: bytes):
+        self.mailbox.put(data)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(STOP_TIMEOUT)
+
+
+def _dog_addresses(dog_ip, local_ip):
+    if local_ip is None:
+        from dog_controller_joystick_MC import get_local_234_ip
+        local_ip = get_local_234_ip()
+    return dog_ip, local_ip
+
+
+class HandDogAdapter:
+    """手势控制机器狗适配器: dog_controller_hand_mc 的执行循环运行在独立线程的事件循环中"""
+
+    name = '机器狗 (手势)'
+
+    def __init__(self, dog_ip: str = DOG_IP, local_ip: str = None, local_port: int = DOG_LOCAL_PORT):
+        from dog_controller_hand_mc import DogController
+        dog_ip, local_ip = _dog_addresses(dog_ip, local_ip)
+        self.controller = DogController(dog_ip=dog_ip, local_ip=local_ip, local_port=local_port)
+        self._loop = None
+        self._thread = None
+
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name='dog', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._loop.run_until_complete(self.controller.run(listen_udp=False))
+        except Exception as e:
+            logger.error(f"机器狗控制循环出错: {e}", exc_info=True)
+        finally:
+            self._loop.close()
+
+    def _post(self, data: bytes):
+        try:
+            self.controller.post_frame(data)
+        except Exception as e:
+            self.controller.hot_log.error('frame', "数据处理错误: %s", e)
+
+    def submit(self, data: bytes):
+        # 邮箱只能在机器狗的事件循环中修改，经 call_soon_threadsafe 投递
+        try:
+            self._loop.call_soon_threadsafe(self._post, data)
+        except (AttributeError, RuntimeError):
+            pass  # 未启动或已关闭
+
+    @property
+    def telemetry(self):
+        return self.controller.telemetry
+
+    def stop(self):
+        self.controller.running = False
+        if self._thread is not None:
+            self._thread.join(STOP_TIMEOUT)
+
+
+class JoystickDogAdapter:
+    """摇杆控制机器狗适配器: dog_controller_joystick_MC 的主循环运行在后台线程中"""
+
+    name = '机器狗 (摇杆)'
+
+    def __init__(self, dog_ip: str = DOG_IP, local_ip: str = None, local_port: int = DOG_LOCAL_PORT):
+        from dog_controller_joystick_MC import DogController
+        dog_ip, local_ip = _dog_addresses(dog_ip, local_ip)
+        self.controller = DogController(dog_ip=dog_ip, local_ip=local_ip, local_port=local_port)
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.controller.run, kwargs={'listen_udp': False},
+                                        name='dog', daemon=True)
+        self._thread.start()
+
+    def submit(self, data: bytes):
+        # post_frame 在锁内更新最新命令，直接在中转线程中调用
+        try:
+            self.controller.post_frame(data)
+        except Exception as e:
+            self.controller.hot_log.error('frame', "数据处理错误: %s", e)
+
+    @property
+    def telemetry(self):
+        return self.controller.telemetry
+
+    def stop(self):
+        self.controller.running = False
+        if self._thread is not None:
+            self._thread.join(STOP_TIMEOUT)
+
+
+ARM_ADAPTERS = {
+    'piper': PiperArmAdapter,
+}
+
+DOG_ADAPTERS = {
+    'hand': HandDogAdapter,
+    'joystick': JoystickDogAdapter,
+}
+
+
+class HubForwarder:
+    """中枢模式转发器: 接口与 relay_asyncio.UdpForwarder 相同，帧直接投递到进程内适配器"""
+
+    def __init__(self, adapters):
+        """
+        Args:
+            adapters: 控制器编号 -> 适配器，如 {'controller2': PiperArmAdapter()}
+        """
+        self.adapters = adapters
+        self.sent = 0
+        self.tracer = RelayTracer()
+        self.summary = LogAggregator(logger, "投递汇总")
+
+    def accepts(self, controller_id: str) -> bool:
+        return controller_id in self.adapters
+
+    def start_adapters(self):
+        for controller_id, adapter in self.adapters.items():
+            adapter.start()
+            logger.info(f"中枢模式: {controller_id} → {adapter.name}")
+
+    async def start(self):
+        self.start_adapters()
+
+    def forward(self, controller_id: str, frame, recv_time: float = None):
+        adapter = self.adapters.get(controller_id)
+        if adapter is None:
+            return
+        if recv_time is None:
+            recv_time = time.monotonic()
+        # 仍然附加追踪尾部，控制循环的逐跳延迟统计与 UDP 模式一致
+        adapter.submit(self.tracer.trace(controller_id, frame, recv_time))
+        self.sent += 1
+        self.summary.add(controller_id, len(frame))
+        self.summary.maybe_flush()
+        trace_lines = self.tracer.report()
+        if trace_lines:
+            logger.info("链路延迟:\n%s", "\n".join(trace_lines))
+
+    def close(self):
+        for adapter in self.adapters.values():
+            adapter.stop()
+
+
+def build_hub(arm: str = 'piper', dog: str = 'hand', arm_rate: float = None):
+    """
+    按名称创建中枢转发器
+
+    Args:
+        arm: 机械臂适配器名称 (ARM_ADAPTERS 的键) 或 'none'
+        dog: 机器狗适配器名称 (DOG_ADAPTERS 的键) 或 'none'
+        arm_rate: 机械臂控制循环频率 (Hz)，默认与 piper_controller_joystick 相同
+
+    Returns:
+        HubForwarder: 尚未启动适配器的转发器
+    """
+    adapters = {}
+    if arm != 'none':
+        adapters['controller2'] = ARM_ADAPTERS[arm](arm_rate)
+    if dog != 'none':
+        adapters['controller1'] = DOG_ADAPTERS[dog]()
+    return HubForwarder(adapters)
@@ -0,0 +1,171 @@
+"""
+遥操作热路径日志
+
+中转和控制程序每帧都可能打日志，同步格式化和写 stderr 会占用请求线程/事件循环
+并带来抖动。这里提供三件工具:
+
+    setup_logging     根 logger 只挂一个 QueueHandler，入队时不格式化，消息拼接和
+                      写出都由 QueueListener 后台线程完成；队列满时丢弃并计数
+    RateLimitedLog    按键 (如控制器编号) 限速的热路径日志，被省略的条数附在
+                      下一条输出中
+    LogAggregator     按间隔汇总热路径事件 (帧数、字节数)，每个间隔输出一行
+
+热路径日志请使用延迟格式化 logger.info("... %s", value)，参数只传不可变的值
+(数字、字符串、元组)，后台线程格式化时复用对象可能已被改写。
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_QUEUE_SIZE = 10000          # 日志队列容量，写出跟不上时丢弃新记录
+AGGREGATE_INTERVAL = 1.0        # 汇总输出间隔 (秒)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """不在调用线程格式化的 QueueHandler"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # 默认实现会在这里调用 format() 拼接消息，改为原样入队，由后台线程格式化
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level=logging.INFO, fmt=None, async_mode=True):
+    """
+    配置根 logger (会替换已有的处理器)
+
+    Args:
+        level: 日志级别
+        fmt: 日志格式，默认 LOG_FORMAT
+        async_mode: True 时经由队列由后台线程写出，False 时与 logging.basicConfig 相同
+
+    Returns:
+        QueueListener: 异步模式下的后台写出线程 (退出时自动停止并写完队列)，同步模式返回 None
+    """
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(fmt or LOG_FORMAT))
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.setLevel(level)
+
+    if not async_mode:
+        root.addHandler(stream_handler)
+        return None
+
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+class RateLimitedLog:
+    """按键限速的日志 (令牌桶)
+
+    用法:
+        move_log = RateLimitedLog(logger, rate=1.0)
+        move_log.info('controller1', "移动: vx=%.2f", vx)
+    """
+
+    def __init__(self, logger, rate=1.0, burst=1, clock=time.monotonic):
+        """
+        Args:
+            logger: 目标 logger
+            rate: 每个键每秒允许的条数
+            burst: 每个键允许的突发条数
+        """
+        self.logger = logger
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._buckets = {}        # 键 -> [令牌数, 上次更新时刻, 已省略条数]
+
+    def log(self, key, level, msg, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        now = self._clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.burst), now, 0]
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if bucket[0] < 1.0:
+            bucket[2] += 1
+            return
+        bucket[0] -= 1.0
+        if bucket[2]:
+            msg += " (省略 %d 条)"
+            args += (bucket[2],)
+            bucket[2] = 0
+        self.logger.log(level, msg, *args)
+
+    def debug(self, key, msg, *args):
+        self.log(key, logging.DEBUG, msg, *args)
+
+    def info(self, key, msg, *args):
+        self.log(key, logging.INFO, msg, *args)
+
+    def warning(self, key, msg, *args):
+        self.log(key, logging.WARNING, msg, *args)
+
+    def error(self, key, msg, *args):
+        self.log(key, logging.ERROR, msg, *args)
+
+
+class LogAggregator:
+    """按键累计事件数和字节数，每个间隔输出一行汇总
+
+    flask 模式下多个连接线程共享同一个实例，计数加锁。
+    """
+
+    def __init__(self, logger, name, interval=AGGREGATE_INTERVAL, clock=time.monotonic):
+        self.logger = logger
+        self.name = name
+        self.interval = interval
+        self._clock = clock
+        self._counts = {}
+        self._bytes = {}
+        self._lock = threading.Lock()
+        self._last_flush = clock()
+
+    def add(self, key, nbytes=0, count=1):
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + count
+            self._bytes[key] = self._bytes.get(key, 0) + nbytes
+
+    def maybe_flush(self):
+        """到达输出间隔时输出一行汇总并清零"""
+        now = self._clock()
+        if now - self._last_flush < self.interval:
+            return
+        with self._lock:
+            elapsed = now - self._last_flush
+            if elapsed < self.interval:
+                return  # 其他线程刚刚输出过
+            counts, self._counts = self._counts, {}
+            total_bytes, self._bytes = self._bytes, {}
+            self._last_flush = now
+        if counts:
+            parts = []
+            for key, count in sorted(counts.items()):
+                part = f"{key} {count / elapsed:.1f}/s"
+                if total_bytes[key]:
+                    part += f" {total_bytes[key] / elapsed:.0f}B/s"
+                parts.append(part)
+            self.logger.info("%s: %s", self.name, ", ".join(parts))
@@ -0,0 +1,314 @@
+"""
+机械臂遥操作会话录制/回放工具
+
+record: 代替 piper_controller_joystick.py 监听 UDP 端口，把 app.py 转发来的原始
+        控制器数据报连同接收时刻写入紧凑的二进制日志。
+replay: 把日志中的数据报按原始节奏 (1x)、N 倍速或最大速度送入
+        piper_controller_joystick 的控制循环，机械臂换成只记录调用的替身对象，
+        不需要头显和硬件即可重复对比控制循环的改动。
+
+日志格式 (小端):
+    文件头  4s 魔数 b'XRRL' | uint8 版本 | 3x | float64 录制开始的墙钟时间
+    每条    float64 相对第一帧的接收时刻 (秒) | uint16 长度 | 原始数据报
+
+回放报告: 帧到达 → 本周期命令发出的端到端延迟分位数、每周期处理耗时、
+各类 CAN 命令的速率、MAX_SINGLE_MOVE/MAX_SINGLE_ROTATE 限幅次数，以及相邻两次
+EndPoseCtrl 之间末端位置的最大变化 (衡量目标插值的平滑程度)。
+
+用法:
+    python teleop_replay.py record session.xrlog --duration 60
+    python teleop_replay.py replay session.xrlog              # 1x
+    python teleop_replay.py replay session.xrlog --speed 4    # 4 倍速
+    python teleop_replay.py replay session.xrlog --max        # 虚拟时钟，不等待
+"""
+
+import argparse
+import socket
+import struct
+import time
+
+import piper_controller_joystick as controller
+from loop_scheduler import LoopScheduler
+from target_interpolator import TargetInterpolator
+
+LOG_MAGIC = b'XRRL'
+LOG_VERSION = 1
+LOG_HEADER = struct.Struct('<4sB3xd')
+LOG_RECORD = struct.Struct('<dH')
+
+# 最后一帧之后继续运行的控制周期数，让最后一帧的命令也能发出
+TAIL_CYCLES = 2
+
+
+class StandInArm:
+    """替身机械臂: 实现控制循环用到的接口，只统计调用次数和末端位置的最大单次变化"""
+
+    def __init__(self):
+        self.calls = {}
+        self.last_pose = None
+        self.max_step = 0  # 相邻两次 EndPoseCtrl 之间 X/Y/Z 的最大变化 (mm/1000)
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def EnablePiper(self):
+        self._count('EnablePiper')
+        return True
+
+    def MotionCtrl_1(self, *args):
+        self._count('MotionCtrl_1')
+
+    def MotionCtrl_2(self, *args):
+        self._count('MotionCtrl_2')
+
+    def EndPoseCtrl(self, *args):
+        self._count('EndPoseCtrl')
+        if self.last_pose is not None:
+            step = max(abs(a - b) for a, b in zip(args[:3], self.last_pose[:3]))
+            if step > self.max_step:
+                self.max_step = step
+        self.last_pose = args
+
+    def GripperCtrl(self, *args):
+        self._count('GripperCtrl')
+
+
+# ================================
+# 日志读写
+# ================================
+
+def record(filename, port=controller.UDP_PORT, duration=None):
+    """
+    监听 UDP 端口并录制收到的数据报 (Ctrl+C 或到达时长后结束)
+
+    Args:
+        filename: 输出日志文件
+        port: 监听端口，默认与 piper_controller_joystick.py 相同
+        duration: 录制时长 (秒)，None 表示直到 Ctrl+C
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', port))
+    sock.settimeout(0.5)
+    print(f"录制 UDP 端口 {port} -> {filename} (Ctrl+C 结束)")
+
+    count = 0
+    total_bytes = 0
+    first = None
+    begin = time.perf_counter()
+    last_print = begin
+    try:
+        with open(filename, 'wb') as f:
+            f.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, time.time()))
+            while duration is None or time.perf_counter() - begin < duration:
+                try:
+                    data, _ = sock.recvfrom(65535)
+                except socket.timeout:
+                    continue
+                except ConnectionResetError:
+                    continue  # Windows下ICMP不可达会触发，忽略
+                now = time.perf_counter()
+                if first is None:
+                    first = now
+                f.write(LOG_RECORD.pack(now - first, len(data)))
+                f.write(data)
+                count += 1
+                total_bytes += len(data)
+                if now - last_print >= 1.0:
+                    print(f"已录制 {count} 帧, {total_bytes / 1024:.1f} KB")
+                    last_print = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+    print(f"录制结束: {count} 帧, 时长 {0.0 if first is None else time.perf_counter() - first:.1f}s")
+
+
+def load_log(filename):
+    """
+    读取录制日志
+
+    Returns:
+        (float, list): 录制开始的墙钟时间, [(相对接收时刻, 数据报), ...]
+
+    Raises:
+        ValueError: 文件格式无效
+    """
+    with open(filename, 'rb') as f:
+        content = f.read()
+    if len(content) < LOG_HEADER.size:
+        raise ValueError(f"无效的录制日志: {filename}")
+    magic, version, start_wall = LOG_HEADER.unpack_from(content)
+    if magic != LOG_MAGIC or version != LOG_VERSION:
+        raise ValueError(f"无效的录制日志: {filename}")
+
+    records = []
+    offset = LOG_HEADER.size
+    while offset + LOG_RECORD.size <= len(content):
+        t, length = LOG_RECORD.unpack_from(content, offset)
+        offset += LOG_RECORD.size
+        if offset + length > len(content):
+            break  # 录制被中断时最后一条可能不完整
+        records.append((t, content[offset:offset + length]))
+        offset += length
+    return start_wall, records
+
+
+# ================================
+# 回放
+# ================================
+
+def percentile(sorted_values, q):
+    """已排序序列的 q 分位数 (最近秩)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def replay(records, speed=1.0, control_rate=controller.CONTROL_RATE, interpolate=True):
+    """
+    把录制的数据报送入控制循环
+
+    控制循环与 piper_controller_joystick.main 相同: 每周期只处理已到达数据报中
+    最新的一个，然后调用 send_commands。N 倍速时帧时间轴和控制频率一起压缩，
+    每个周期看到的输入与 1x 相同；speed=None 时使用虚拟时钟，不做任何等待。
+
+    Args:
+        records: load_log 返回的 [(相对接收时刻, 数据报), ...]
+        speed: 回放倍速，None 表示最大速度
+        control_rate: 控制循环频率 (Hz, 会话时间)
+        interpolate: 是否对目标位姿插值 (样本时间为录制的接收时刻)
+
+    Returns:
+        dict: 回放统计
+    """
+    period = 1.0 / control_rate
+    piper = StandInArm()
+    cycles = 0
+
+    if speed is None:
+        def session_clock():
+            return cycles * period
+        scheduler = None
+    else:
+        begin = time.perf_counter()
+
+        def session_clock():
+            return (time.perf_counter() - begin) * speed
+        scheduler = LoopScheduler(control_rate * speed)
+    interpolator = None
+    if interpolate:
+        interpolator = TargetInterpolator(controller.INITIAL_POSITION[:6], clock=session_clock)
+    state = controller.TeleopState(interpolator)
+
+    # 控制程序的全局状态按会话时间重新初始化
+    controller.command_cache = controller.CommandCache(clock=session_clock)
+    controller.button_states.update(button1_pressed=False, button3_pressed=False, emergency_stop=False)
+    controller.clamp_counts.update(move=0, rotate=0)
+    controller.go_to_initial_position(piper, state.target_position)
+    piper.calls.clear()
+    piper.max_step = 0
+
+    latencies = []
+    busy_times = []
+    frames_coalesced = 0
+    parse_errors = 0
+    next_index = 0
+    end_time = (records[-1][0] if records else 0.0) + TAIL_CYCLES * period
+    wall_start = time.perf_counter()
+
+    while session_clock() <= end_time:
+        now = session_clock()
+        cycle_start = time.perf_counter()
+
+        # 取出本周期之前到达的所有数据报，只处理最新的一个
+        latest = None
+        while next_index < len(records) and records[next_index][0] <= now:
+            if latest is not None:
+                frames_coalesced += 1
+            latest = next_index
+            next_index += 1
+
+        if latest is not None:
+            try:
+                controller.handle_message(piper, state, records[latest][1], records[latest][0])
+            except (ValueError, KeyError):
+                parse_errors += 1
+
+        state.last_sent_position = controller.send_commands(
+            piper, state.command_position(), state.last_sent_position)
+
+        busy_times.append(time.perf_counter() - cycle_start)
+        if latest is not None:
+            latencies.append(session_clock() - records[latest][0])
+
+        cycles += 1
+        if scheduler is not None:
+            scheduler.wait()
+
+    wall_elapsed = time.perf_counter() - wall_start
+    session_elapsed = session_clock()
+    latencies.sort()
+    return {
+        'frames': len(records),
+        'frames_processed': len(latencies),
+        'frames_coalesced': frames_coalesced,
+        'parse_errors': parse_errors,
+        'cycles': cycles,
+        'session_s': session_elapsed,
+        'wall_s': wall_elapsed,
+        'latency_ms': {q: percentile(latencies, q) * 1e3 for q in (50, 95, 99, 100)},
+        'busy_mean_us': sum(busy_times) / len(busy_times) * 1e6 if busy_times else 0.0,
+        'busy_max_us': max(busy_times, default=0.0) * 1e6,
+        'command_rates': {name: count / session_elapsed for name, count in sorted(piper.calls.items())},
+        'clamps': dict(controller.clamp_counts),
+        'pose_step_max_mm': piper.max_step / controller.FACTOR,
+    }
+
+
+def print_report(stats):
+    latency = stats['latency_ms']
+    print("-" * 50)
+    print(f"帧: {stats['frames']}, 处理 {stats['frames_processed']}, 合并 {stats['frames_coalesced']}, "
+          f"解析错误 {stats['parse_errors']}")
+    print(f"会话时长 {stats['session_s']:.2f}s ({stats['cycles']} 周期), 墙钟 {stats['wall_s']:.2f}s, "
+          f"实际倍速 {stats['session_s'] / stats['wall_s']:.1f}x")
+    print(f"端到端延迟 (ms, 会话时间): p50 {latency[50]:.2f}, p95 {latency[95]:.2f}, "
+          f"p99 {latency[99]:.2f}, 最大 {latency[100]:.2f}")
+    print(f"周期处理耗时: 平均 {stats['busy_mean_us']:.1f}us, 最大 {stats['busy_max_us']:.1f}us")
+    print("命令速率 (Hz): " + ", ".join(f"{name} {rate:.1f}" for name, rate in stats['command_rates'].items()))
+    print(f"限幅次数: 移动 {stats['clamps']['move']}, 旋转 {stats['clamps']['rotate']}")
+    print(f"末端位置最大单次变化: {stats['pose_step_max_mm']:.2f}mm")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="机械臂遥操作会话录制/回放")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parser_record = subparsers.add_parser('record', help='录制 UDP 控制器数据报')
+    parser_record.add_argument('output', help='输出日志文件')
+    parser_record.add_argument('--port', type=int, default=controller.UDP_PORT, help='监听端口')
+    parser_record.add_argument('--duration', type=float, default=None, help='录制时长 (秒)')
+
+    parser_replay = subparsers.add_parser('replay', help='回放日志到控制循环')
+    parser_replay.add_argument('log', help='record 生成的日志文件')
+    parser_replay.add_argument('--speed', type=float, default=1.0, help='回放倍速')
+    parser_replay.add_argument('--max', action='store_true', help='最大速度回放 (虚拟时钟)')
+    parser_replay.add_argument('--rate', type=float, default=controller.CONTROL_RATE, help='控制循环频率 (Hz)')
+    parser_replay.add_argument('--no_interp', action='store_true', help='关闭目标位姿插值')
+
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args.output, args.port, args.duration)
+    elif args.command == 'replay':
+        if not args.max and args.speed <= 0:
+            parser.error("--speed 必须大于 0")
+        _, records = load_log(args.log)
+        print(f"回放 {args.log}: {len(records)} 帧, 时长 {records[-1][0] if records else 0.0:.1f}s, "
+              f"{'最大速度' if args.max else f'{args.speed}x'}")
+        print_report(replay(records, None if args.max else args.speed, args.rate, not args.no_interp))
+
+
+if __name__ == '__main__':
+    main()